@@ -6,19 +6,41 @@ This module contains code related to generating and representing alloys.
 """
 
 from dataclasses import dataclass
-from copy import deepcopy
 import numpy as np
 
+from B8_project import utils
 from B8_project.crystal import UnitCell
 
 
 @dataclass
-class SuperCell:
+class SuperCell(UnitCell):
     """
     Super cell
     ==========
 
-    A class that groups functions related to generating super cells from unit cells.
+    A class to represent a super cell, together with functions related to generating
+    super cells from unit cells.
+
+    A super cell generated by `new_super_cell` is a perfect periodic repeat of a unit
+    cell. The unit cell and the number of repetitions in each direction are stored
+    alongside the atoms, so that diffraction calculations can exploit the periodicity
+    of the super cell. The atoms of a super cell should not be modified in place, as
+    this would break the periodicity; use `apply_disorder` instead, which returns a
+    new `SuperCell`.
+
+    A super cell generated by `apply_disorder` stores the super cell that the disorder
+    was applied to. The atoms of both super cells are stored in the same order, so that
+    diffraction calculations only need to account for the substituted atoms.
+
+    Attributes
+    ----------
+    unit_cell : UnitCell | None
+        The unit cell which is repeated to generate the super cell.
+    side_lengths : tuple[int, int, int] | None
+        The number of repetitions of the unit cell in the x, y and z directions.
+    ordered_super_cell : UnitCell | None
+        The super cell that disorder was applied to, if the super cell was generated
+        by `apply_disorder`.
 
     Methods
     -------
@@ -26,8 +48,31 @@ class SuperCell:
         Returns the position vector of each unit cell in the super cell.
     new_super_cell
         Generates a new super cell.
+    interpolate_lattice_constants
+        Calculates the lattice constants of a disordered super cell.
+    apply_disorder
+        Randomly substitutes atoms in a super cell.
     """
 
+    unit_cell: UnitCell | None = None
+    side_lengths: tuple[int, int, int] | None = None
+    ordered_super_cell: UnitCell | None = None
+
+    def __post_init__(self):
+        super().__post_init__()
+        if (self.unit_cell is None) != (self.side_lengths is None):
+            raise ValueError(
+                "unit_cell and side_lengths must either both be specified or both be "
+                "None."
+            )
+        if self.ordered_super_cell is not None and not np.array_equal(
+            self.ordered_super_cell.atoms["positions"], self.atoms["positions"]
+        ):
+            raise ValueError(
+                "The atomic positions of ordered_super_cell must be the same as the "
+                "atomic positions of the super cell."
+            )
+
     @staticmethod
     def _get_lattice_vectors(side_lengths: tuple[int, int, int]):
         """
@@ -84,6 +129,12 @@ class SuperCell:
         material : str
             The name of the material. The default value is the same name as the original
             crystal.
+
+        Returns
+        -------
+        SuperCell
+            An object representing the super cell. The super cell stores the original
+            unit cell and the side lengths.
         """
         if material == "":
             material = unit_cell.material
@@ -96,8 +147,10 @@ class SuperCell:
 
         lattice_constants = np.array(side_lengths) * unit_cell.lattice_constants
 
-        atomic_numbers = unit_cell.atoms["atomic_numbers"]
-        atomic_positions = unit_cell.atoms["positions"]
+        # Get every atom in the conventional unit cell.
+        unit_cell_atoms = unit_cell.get_conventional_atoms()
+        atomic_numbers = unit_cell_atoms["atomic_numbers"]
+        atomic_positions = unit_cell_atoms["positions"]
 
         # For each unit cell copy, duplicates all of the atoms and shifts their
         # positions.
@@ -114,7 +167,40 @@ class SuperCell:
         atoms["atomic_numbers"] = atomic_numbers
         atoms["positions"] = atomic_positions.reshape(-1, 3)
 
-        return UnitCell(material, lattice_constants, atoms)
+        return cls(
+            material,
+            lattice_constants,
+            atoms,
+            unit_cell=unit_cell,
+            side_lengths=(
+                int(side_lengths[0]),
+                int(side_lengths[1]),
+                int(side_lengths[2]),
+            ),
+        )
+
+    @staticmethod
+    def interpolate_lattice_constants(
+        lattice_constants: np.ndarray,
+        concentration: float,
+        lattice_constants_no_substitution: np.ndarray,
+        lattice_constants_full_substitution: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Interpolate lattice constants
+        =============================
+
+        Uses a linear interpolation (Vegard's law) to calculate the lattice constants of
+        a super cell with a specified concentration of substitute atoms, given the
+        lattice constants of the super cell with 0% substitution, and the lattice
+        constants of the unit cells with 0% and 100% substitution.
+        """
+        # Calculate the side lengths of the super cell.
+        side_lengths = lattice_constants / lattice_constants_no_substitution
+
+        return lattice_constants + concentration * side_lengths * (
+            lattice_constants_full_substitution - lattice_constants_no_substitution
+        )
 
     @staticmethod
     def apply_disorder(
@@ -125,13 +211,15 @@ class SuperCell:
         lattice_constants_no_substitution: np.ndarray,
         lattice_constants_full_substitution: np.ndarray,
         material_name: str,
+        rng: np.random.Generator | int | None = None,
     ):
         """
         Apply disorder
         ==============
 
         Randomly replaces target atoms in a super cell with substitute atoms until a
-        specified concentration is reached. The new disordered super cell is returned.
+        specified concentration is reached. The new disordered super cell is returned,
+        and stores the original super cell as `ordered_super_cell`.
 
         The lattice constants of the ordered crystal with 0% substitution and the
         ordered crystal with 100% substitution must be specified. For example, if you
@@ -141,6 +229,10 @@ class SuperCell:
         `lattice_constants_full_substitution` parameter. A linear interpolation is then
         used to estimate the lattice constants of In(x)Ga(1-x)As.
 
+        The substituted atoms are chosen using `rng`, which can be a NumPy random number
+        generator, an integer seed, or None (see `utils.get_random_number_generator`).
+        Passing the same seed always gives the same disordered super cell.
+
         Parameters
         ----------
         TODO: add parameters.
@@ -153,34 +245,39 @@ class SuperCell:
         if concentration < 0 or concentration > 1:
             raise ValueError("concentration must be between 0 and 1")
 
-        # Get a list of target atoms, and shuffle the list.
-        atoms = deepcopy(super_cell.atoms)
-        target_atoms = atoms[atoms["atomic_numbers"] == target_atomic_number]
-        np.random.shuffle(target_atoms)
-
-        # Calculate the number of substitute atoms.
-        num_substitute_atoms = int(np.ceil(concentration * len(target_atoms)))
+        rng = utils.get_random_number_generator(rng)
 
-        # Replace the correct number of atoms in target_atoms with the substitute atoms.
-        for i in range(num_substitute_atoms):
-            target_atoms["atomic_numbers"][i] = substitute_atomic_number
+        # Get a random permutation of the indices of the target atoms. Only the atomic
+        # numbers are changed, so the order of the atomic positions is the same as in
+        # the original super cell.
+        atoms = super_cell.atoms.copy()
+        target_indices = rng.permutation(
+            np.flatnonzero(atoms["atomic_numbers"] == target_atomic_number)
+        )
 
-        # Add the substituted atoms back into atoms
-        atoms[atoms["atomic_numbers"] == target_atomic_number] = target_atoms
+        # Calculate the number of substitute atoms.
+        num_substitute_atoms = int(np.ceil(concentration * len(target_indices)))
 
-        # Calculate the side lengths of the super cell.
-        side_lengths = super_cell.lattice_constants / lattice_constants_no_substitution
+        # Replace the correct number of target atoms with the substitute atoms.
+        atoms["atomic_numbers"][target_indices[:num_substitute_atoms]] = (
+            substitute_atomic_number
+        )
 
         # Calculate the concentration of substitute atoms.
-        actual_concentration = float(num_substitute_atoms) / float(len(target_atoms))
+        actual_concentration = float(num_substitute_atoms) / float(len(target_indices))
 
         # Use a linear interpolation to calculate the lattice constants of the
         # disordered super cell.
-        lattice_constants = (
-            super_cell.lattice_constants
-            + actual_concentration
-            * side_lengths
-            * (lattice_constants_full_substitution - lattice_constants_no_substitution)
+        lattice_constants = SuperCell.interpolate_lattice_constants(
+            super_cell.lattice_constants,
+            actual_concentration,
+            lattice_constants_no_substitution,
+            lattice_constants_full_substitution,
         )
 
-        return UnitCell(material_name, lattice_constants, atoms)
+        return SuperCell(
+            material_name,
+            lattice_constants,
+            atoms,
+            ordered_super_cell=super_cell,
+        )
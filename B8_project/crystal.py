@@ -11,10 +11,10 @@ Classes
 """
 
 from dataclasses import dataclass
+from fractions import Fraction
+import math
 import numpy as np
 
-import B8_project.utils as utils
-
 
 @dataclass
 class UnitCell:
@@ -35,19 +35,32 @@ class UnitCell:
     atoms : ndarray
         A list of the atoms in the unit cell, represented as a structured NumPy array.
         This array must have fields "atomic_numbers" and "positions".
+    centering_translations : ndarray | None
+        If None (default), `atoms` contains every atom in the conventional unit cell.
+        Otherwise, `atoms` only contains the primitive basis, and
+        `centering_translations` is an array of shape (m, 3) containing the lattice
+        centering translations (in terms of the lattice constants). The conventional
+        unit cell then consists of the primitive basis shifted by each translation.
 
     Methods
     -------
     _validate_crystal_parameters
         Takes lattice and basis parameters as inputs, and raises an error if the
         parameters are invalid. This function has no returns.
+    _get_centering_translations
+        Returns the centering translations associated with a Bravais lattice type.
     new_unit_cell
         Converts lattice and basis parameters to a unit cell.
+    _apply_centering_translations
+        Duplicates a list of atoms once for each centering translation.
+    get_conventional_atoms
+        Returns every atom in the conventional unit cell.
     """
 
     material: str
     lattice_constants: np.ndarray
     atoms: np.ndarray
+    centering_translations: np.ndarray | None = None
 
     def __post_init__(self):
         if not (
@@ -65,6 +78,14 @@ class UnitCell:
             raise ValueError(
                 f"atoms must be a structured numpy array with fields {required_fields}."
             )
+        if self.centering_translations is not None and not (
+            isinstance(self.centering_translations, np.ndarray)
+            and self.centering_translations.ndim == 2
+            and self.centering_translations.shape[1] == 3
+        ):
+            raise ValueError(
+                "centering_translations must be None or a numpy array of shape (m, 3)."
+            )
 
     @staticmethod
     def _validate_crystal_parameters(
@@ -123,11 +144,45 @@ class UnitCell:
                     "Base centred lattice type is not permitted for a tetragonal unit cell"
                 )
 
+    @staticmethod
+    def _get_centering_translations(lattice_type: int) -> np.ndarray:
+        """
+        Get centering translations
+        ==========================
+
+        Returns the centering translations of a Bravais lattice type as an array of
+        shape (m, 3), where m is the number of lattice points in the conventional unit
+        cell. The translations are given in terms of the lattice constants.
+        """
+        # Simple lattice
+        if lattice_type == 1:
+            return np.array([[0, 0, 0]], dtype=float)
+
+        # Body centred lattice
+        if lattice_type == 2:
+            return np.array([[0, 0, 0], [0.5, 0.5, 0.5]])
+
+        # Face centred lattice
+        if lattice_type == 3:
+            return np.array([[0, 0, 0], [0.5, 0.5, 0], [0.5, 0, 0.5], [0, 0.5, 0.5]])
+
+        # Base centred lattice
+        if lattice_type == 4:
+            # Implement base centred lattice logic here.
+
+            raise ValueError(
+                """Base centred lattice logic not implemented yet. Please choose a 
+                different lattice type."""
+            )
+
+        raise ValueError("lattice_type should be an integer between 1 and 4 inclusive")
+
     @classmethod
     def new_unit_cell(
         cls,
         basis: tuple[list[int], list[tuple[float, float, float]]],
         lattice: tuple[str, int, tuple[float, float, float]],
+        keep_primitive_basis: bool = False,
     ):
         """
         New unit cell
@@ -153,6 +208,12 @@ class UnitCell:
                 basis.
             - atomic_positions : list[tuple[float, float, float]].  The position of
             each atom in the basis.
+        keep_primitive_basis : bool
+            If False (default), the basis is duplicated once for every lattice point in
+            the conventional unit cell. If True, only the basis is stored, together with
+            the centering translations of the lattice. Diffraction calculations can then
+            evaluate the centering analytically, which avoids the cost of the duplicate
+            atoms.
 
         Returns
         -------
@@ -176,52 +237,71 @@ class UnitCell:
         except ValueError as exc:
             raise ValueError(f"Invalid parameters: {exc}") from exc
 
-        # Body centered lattice
-        if lattice_type == 2:
-            # Duplicates every atom in the unit cell two times, as the conventional
-            # unit cell contains two lattice points.
-            atomic_numbers = utils.duplicate_elements(atomic_numbers, 2)
-            atomic_positions = utils.duplicate_elements(atomic_positions, 2)
+        # Amount that duplicate atoms are shifted by.
+        centering_translations = cls._get_centering_translations(lattice_type)
 
-            # Amount that duplicate atoms are shifted by.
-            shifts = [(0, 0, 0), (0.5, 0.5, 0.5)]
+        # Define a custom datatype to represent atoms.
+        dtype = np.dtype([("atomic_numbers", "i4"), ("positions", "3f8")])
 
-            # Apply shifts to the positions of the atoms.
-            for i, position in enumerate(atomic_positions):
-                atomic_positions[i] = utils.add_tuples(position, shifts[i % 2])
+        # Create a structured NumPy array to store the atoms in the basis.
+        atoms = np.empty(len(atomic_numbers), dtype=dtype)
+        atoms["atomic_numbers"] = np.array(atomic_numbers)
+        atoms["positions"] = np.array(atomic_positions, dtype=float).reshape(-1, 3)
+
+        if keep_primitive_basis and lattice_type != 1:
+            return cls(
+                material_type,
+                np.array(lattice_constants),
+                atoms,
+                centering_translations,
+            )
 
-        # Face centred lattice
-        elif lattice_type == 3:
-            # Duplicates every atom in the unit cell four times, as the conventional
-            # unit cell contains four lattice points.
-            atomic_numbers = utils.duplicate_elements(atomic_numbers, 4)
-            atomic_positions = utils.duplicate_elements(atomic_positions, 4)
+        # Duplicates every atom in the basis once for every lattice point in the
+        # conventional unit cell, and shifts the positions of the duplicates.
+        atoms = cls._apply_centering_translations(atoms, centering_translations)
 
-            # Amount that duplicate atoms are shifted by
-            shifts = [(0, 0, 0), (0.5, 0.5, 0), (0.5, 0, 0.5), (0, 0.5, 0.5)]
+        return cls(material_type, np.array(lattice_constants), atoms)
 
-            # Apply shifts to the positions of the atoms.
-            for i, position in enumerate(atomic_positions):
-                atomic_positions[i] = utils.add_tuples(position, shifts[i % 4])
+    @staticmethod
+    def _apply_centering_translations(
+        atoms: np.ndarray, centering_translations: np.ndarray
+    ) -> np.ndarray:
+        """
+        Apply centering translations
+        ============================
 
-        # Base centred lattice
-        elif lattice_type == 4:
-            # Implement base centred lattice logic here.
+        Duplicates every atom in a structured NumPy array of atoms once for each
+        centering translation, and shifts the position of each duplicate by the
+        corresponding translation. The duplicates of each atom are placed next to the
+        original atom.
+        """
+        num_translations = centering_translations.shape[0]
 
-            raise ValueError(
-                """Base centred lattice logic not implemented yet. Please choose a 
-                different lattice type."""
-            )
+        expanded_atoms = np.empty(len(atoms) * num_translations, dtype=atoms.dtype)
+        expanded_atoms["atomic_numbers"] = np.repeat(
+            atoms["atomic_numbers"], num_translations
+        )
+        expanded_atoms["positions"] = (
+            atoms["positions"][:, np.newaxis, :] + centering_translations
+        ).reshape(-1, 3)
 
-        # Define a custom datatype to represent atoms.
-        dtype = np.dtype([("atomic_numbers", "i4"), ("positions", "3f8")])
+        return expanded_atoms
 
-        # Create a structured NumPy array to store the atoms.
-        atoms = np.empty(len(atomic_numbers), dtype=dtype)
-        atoms["atomic_numbers"] = np.array(atomic_numbers)
-        atoms["positions"] = np.array(atomic_positions)
+    def get_conventional_atoms(self) -> np.ndarray:
+        """
+        Get conventional atoms
+        ======================
 
-        return cls(material_type, np.array(lattice_constants), atoms)
+        Returns a structured NumPy array containing every atom in the conventional unit
+        cell. If the unit cell stores centering translations, the primitive basis is
+        duplicated once for each translation.
+        """
+        if self.centering_translations is None:
+            return self.atoms
+
+        return self._apply_centering_translations(
+            self.atoms, self.centering_translations
+        )
 
 
 class ReciprocalSpace:
@@ -237,6 +317,15 @@ class ReciprocalSpace:
     get_reciprocal_lattice_vectors
         Finds all the reciprocal lattice vectors with a magnitude in between a specified
         minimum and maximum magnitude.
+    generate_reciprocal_lattice_vectors
+        Yields the reciprocal lattice vectors with a magnitude in between a specified
+        minimum and maximum magnitude, in chunks.
+    generate_shell_miller_indices
+        Yields the Miller indices of the reciprocal lattice vectors with a magnitude in
+        between a specified minimum and maximum magnitude.
+    get_shell_keys
+        Returns an integer key for each reciprocal lattice vector, which is shared by
+        all reciprocal lattice vectors of the same magnitude.
     rlv_magnitudes_from_deflection_angles
         Calculates the magnitudes of the reciprocal lattice vectors associated with a
         range of given deflection angles.
@@ -267,8 +356,88 @@ class ReciprocalSpace:
             vector.
             - 'components': An ndarray representing the components of the reciprocal
             lattice vector.
+            - 'shell_keys': An integer which labels the shell of the reciprocal lattice
+            vector. Two reciprocal lattice vectors have the same shell key if and only
+            if they have the same magnitude (see `get_shell_keys`).
+        """
+        ReciprocalSpace._check_magnitude_range(
+            min_magnitude, max_magnitude, lattice_constants
+        )
+
+        # Generate the Miller indices inside the spherical shell.
+        miller_indices = np.concatenate(
+            [np.empty((0, 3), dtype=int)]
+            + list(
+                ReciprocalSpace.generate_shell_miller_indices(
+                    min_magnitude, max_magnitude, lattice_constants
+                )
+            )
+        )
+
+        return ReciprocalSpace._new_reciprocal_lattice_vectors(
+            miller_indices, min_magnitude, max_magnitude, lattice_constants
+        )
+
+    @staticmethod
+    def generate_reciprocal_lattice_vectors(
+        min_magnitude: float,
+        max_magnitude: float,
+        lattice_constants: np.ndarray,
+        rlvs_per_chunk: int = 2**16,
+    ):
+        """
+        Generate reciprocal lattice vectors
+        ===================================
+
+        A generator which yields the reciprocal lattice vectors with a magnitude in
+        between a specified minimum and maximum magnitude, as structured NumPy arrays
+        with the same format as `get_reciprocal_lattice_vectors`.
+
+        The Miller indices are generated shell by shell (see
+        `generate_shell_miller_indices`), and are yielded in chunks of roughly
+        `rlvs_per_chunk` reciprocal lattice vectors, so the full table of reciprocal
+        lattice vectors is never stored.
+        """
+        ReciprocalSpace._check_magnitude_range(
+            min_magnitude, max_magnitude, lattice_constants
+        )
+        if rlvs_per_chunk <= 0:
+            raise ValueError("rlvs_per_chunk must be greater than 0.")
+
+        chunk = []
+        chunk_length = 0
+        for miller_indices in ReciprocalSpace.generate_shell_miller_indices(
+            min_magnitude, max_magnitude, lattice_constants
+        ):
+            chunk.append(miller_indices)
+            chunk_length += len(miller_indices)
+
+            if chunk_length >= rlvs_per_chunk:
+                yield ReciprocalSpace._new_reciprocal_lattice_vectors(
+                    np.concatenate(chunk),
+                    min_magnitude,
+                    max_magnitude,
+                    lattice_constants,
+                )
+                chunk = []
+                chunk_length = 0
+
+        if chunk:
+            yield ReciprocalSpace._new_reciprocal_lattice_vectors(
+                np.concatenate(chunk), min_magnitude, max_magnitude, lattice_constants
+            )
+
+    @staticmethod
+    def _check_magnitude_range(
+        min_magnitude: float, max_magnitude: float, lattice_constants: np.ndarray
+    ):
+        """
+        Check magnitude range
+        =====================
+
+        Raises a ValueError if a range of reciprocal lattice vector magnitudes or a set
+        of lattice constants is invalid.
         """
-        # Error handling.
         if not (max_magnitude > 0 and min_magnitude >= 0):
             raise ValueError(
                 "max_magnitude and min_magnitude should be greater than or equal to 0."
@@ -283,35 +452,42 @@ class ReciprocalSpace:
         if not np.issubdtype(lattice_constants.dtype, np.floating):
             raise ValueError("lattice_constants must contain only floats.")
 
-        # Upper bounds on Miller indices.
-        max_hkl = np.ceil((lattice_constants * max_magnitude) / (2 * np.pi)).astype(int)
-
-        # Generate all possible Miller indices within the bounds.
-        miller_indices = (
-            np.vstack(
-                np.meshgrid(
-                    np.arange(-max_hkl[0], max_hkl[0] + 1),
-                    np.arange(-max_hkl[1], max_hkl[1] + 1),
-                    np.arange(-max_hkl[2], max_hkl[2] + 1),
-                    indexing="ij",
-                )
-            )
-            .reshape(3, -1)
-            .T
-        )
+    @staticmethod
+    def _new_reciprocal_lattice_vectors(
+        miller_indices: np.ndarray,
+        min_magnitude: float,
+        max_magnitude: float,
+        lattice_constants: np.ndarray,
+    ) -> np.ndarray:
+        """
+        New reciprocal lattice vectors
+        ==============================
 
+        Returns a structured NumPy array of the reciprocal lattice vectors with a range
+        of Miller indices, keeping only the reciprocal lattice vectors with a magnitude
+        in between a specified minimum and maximum magnitude (see
+        `get_reciprocal_lattice_vectors`).
+        """
         # Compute reciprocal lattice vector components and magnitudes.
         components = (2 * np.pi * miller_indices) / lattice_constants
         magnitudes = np.linalg.norm(components, axis=1)
 
-        # Filter the reciprocal lattice vectors based on their magnitude.
+        # Filter the reciprocal lattice vectors based on their magnitude. The generator
+        # includes a small tolerance, so this removes any vectors on the boundary of the
+        # shell that are not valid.
         mask = (magnitudes >= min_magnitude) & (magnitudes <= max_magnitude)
         valid_miller_indices = miller_indices[mask]
         valid_magnitudes = magnitudes[mask]
+        valid_components = components[mask]
 
         # Define a custom datatype to represent reciprocal lattice vectors.
         dtype = np.dtype(
-            [("miller_indices", "3i4"), ("magnitudes", "f8"), ("components", "3f8")]
+            [
+                ("miller_indices", "3i4"),
+                ("magnitudes", "f8"),
+                ("components", "3f8"),
+                ("shell_keys", "i8"),
+            ]
         )
 
         # Create a structured NumPy array to store the valid reciprocal lattice vectors.
@@ -320,12 +496,172 @@ class ReciprocalSpace:
         )
         reciprocal_lattice_vectors["miller_indices"] = valid_miller_indices
         reciprocal_lattice_vectors["magnitudes"] = valid_magnitudes
-        reciprocal_lattice_vectors["components"] = (
-            2 * np.pi * valid_miller_indices
-        ) / lattice_constants
+        reciprocal_lattice_vectors["components"] = valid_components
+        reciprocal_lattice_vectors["shell_keys"] = ReciprocalSpace.get_shell_keys(
+            valid_miller_indices, lattice_constants, max_magnitude
+        )
 
         return reciprocal_lattice_vectors
 
+    @staticmethod
+    def get_shell_keys(
+        miller_indices: np.ndarray,
+        lattice_constants: np.ndarray,
+        max_magnitude: float | None = None,
+    ) -> np.ndarray:
+        """
+        Get shell keys
+        ==============
+
+        Returns an integer key for each of a range of reciprocal lattice vectors, such
+        that two reciprocal lattice vectors have the same key if and only if they have
+        the same magnitude. The keys are calculated exactly using integer arithmetic.
+
+        For an orthorhombic unit cell, |G|^2 = (2π)^2 (h^2/a^2 + k^2/b^2 + l^2/c^2). If
+        the ratios between 1/a^2, 1/b^2 and 1/c^2 are rational (e.g. for a cubic or
+        tetragonal unit cell), |G|^2 is proportional to the integer quadratic form
+        w_a h^2 + w_b k^2 + w_c l^2, which is used as the key. The keys are then
+        ordered in the same way as the magnitudes.
+
+        Otherwise, the axes are grouped by lattice constant, and the key encodes the
+        integer sum of squared Miller indices for each group. Magnitudes of different
+        groups are incommensurate, so two vectors have the same magnitude only if each
+        of these sums are equal. In this case, the keys are not ordered in the same way
+        as the magnitudes. The radix used to encode the sums is bounded using
+        `max_magnitude`, so that keys calculated in different calls (e.g. for different
+        chunks of `generate_reciprocal_lattice_vectors`) can be compared. If
+        `max_magnitude` is not specified, the radix is found from `miller_indices`, and
+        the keys can only be compared with keys from the same call.
+        """
+        # Largest denominator and relative tolerance used to find rational ratios.
+        max_denominator = 1000
+        tolerance = 1e-9
+
+        squared_miller_indices = miller_indices.astype(np.int64) ** 2
+
+        inverse_squares = 1 / lattice_constants.astype(float) ** 2
+        ratios = inverse_squares / inverse_squares.min()
+        fractions = [
+            Fraction(float(ratio)).limit_denominator(max_denominator)
+            for ratio in ratios
+        ]
+
+        if all(
+            abs(float(fraction) - ratio) <= tolerance * ratio
+            for fraction, ratio in zip(fractions, ratios)
+        ):
+            # Integer weights of the quadratic form.
+            common_denominator = math.lcm(*[x.denominator for x in fractions])
+            weights = np.array(
+                [x.numerator * common_denominator // x.denominator for x in fractions],
+                dtype=np.int64,
+            )
+            return squared_miller_indices @ weights
+
+        # Sum the squared Miller indices for each group of equal lattice constants, and
+        # encode the sums as a single integer.
+        shell_keys = np.zeros(miller_indices.shape[0], dtype=np.int64)
+        for lattice_constant in np.unique(lattice_constants):
+            group_sums = squared_miller_indices[
+                :, lattice_constants == lattice_constant
+            ].sum(axis=1)
+
+            # |G| >= 2π sqrt(group_sum) / lattice_constant, which bounds the group sum.
+            if max_magnitude is not None:
+                max_group_sum = (max_magnitude * lattice_constant / (2 * np.pi)) ** 2
+                radix = int(np.ceil(max_group_sum)) + 1
+            else:
+                radix = int(group_sums.max(initial=0)) + 1
+            shell_keys = shell_keys * radix + group_sums
+
+        return shell_keys
+
+    @staticmethod
+    def generate_shell_miller_indices(
+        min_magnitude: float,
+        max_magnitude: float,
+        lattice_constants: np.ndarray,
+    ):
+        """
+        Generate shell Miller indices
+        =============================
+
+        A generator which yields the Miller indices (h, k, l) of the reciprocal lattice
+        vectors with a magnitude in between a specified minimum and maximum magnitude.
+        The Miller indices are yielded as NumPy arrays of shape (n, 3), with one array
+        for each value of h.
+
+        Rather than generating every Miller index in a cube and discarding the indices
+        outside of the spherical shell, the generator iterates over h and k, and solves
+        for the range of valid l values. The memory used is therefore proportional to
+        the number of valid reciprocal lattice vectors.
+
+        A small tolerance is used when solving for the range of l, so vectors which lie
+        on the boundary of the shell should be filtered by the caller.
+        """
+        # Tolerance used when solving for the range of l.
+        tolerance = 1e-6
+
+        # Magnitude of the reciprocal lattice vectors (1, 0, 0), (0, 1, 0), (0, 0, 1).
+        unit_magnitudes = 2 * np.pi / lattice_constants
+
+        # Upper bounds on Miller indices.
+        max_hkl = np.ceil((lattice_constants * max_magnitude) / (2 * np.pi)).astype(int)
+
+        k_values = np.arange(-max_hkl[1], max_hkl[1] + 1)
+
+        for h in range(-max_hkl[0], max_hkl[0] + 1):
+            # Squared magnitude of the (h, k, 0) component of each vector.
+            hk_squared_magnitudes = (h * unit_magnitudes[0]) ** 2 + (
+                k_values * unit_magnitudes[1]
+            ) ** 2
+
+            # Discard any values of k for which no value of l is valid.
+            k_mask = hk_squared_magnitudes <= max_magnitude**2 * (1 + tolerance)
+            if not np.any(k_mask):
+                continue
+            k = k_values[k_mask]
+            hk_squared_magnitudes = hk_squared_magnitudes[k_mask]
+
+            # Solve for the range of valid |l| values.
+            max_l = np.floor(
+                np.sqrt(np.clip(max_magnitude**2 - hk_squared_magnitudes, 0, None))
+                / unit_magnitudes[2]
+                + tolerance
+            ).astype(int)
+            min_l = np.ceil(
+                np.sqrt(np.clip(min_magnitude**2 - hk_squared_magnitudes, 0, None))
+                / unit_magnitudes[2]
+                - tolerance
+            ).astype(int)
+            min_l = np.clip(min_l, 0, None)
+
+            # Number of valid |l| values, and the number of valid negative l values.
+            num_abs_l = np.clip(max_l - min_l + 1, 0, None)
+            num_negative_l = num_abs_l - ((min_l == 0) & (num_abs_l > 0))
+            counts = num_abs_l + num_negative_l
+
+            total = int(counts.sum())
+            if total == 0:
+                continue
+
+            # For each (h, k), l runs from -max_l to -min_l, and then from min_l to
+            # max_l (excluding -0).
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            num_negative_l = np.repeat(num_negative_l, counts)
+            l = np.where(
+                offsets < num_negative_l,
+                np.repeat(-max_l, counts) + offsets,
+                np.repeat(min_l, counts) + offsets - num_negative_l,
+            )
+
+            miller_indices = np.empty((total, 3), dtype=int)
+            miller_indices[:, 0] = h
+            miller_indices[:, 1] = np.repeat(k, counts)
+            miller_indices[:, 2] = l
+
+            yield miller_indices
+
     @staticmethod
     def rlv_magnitudes_from_deflection_angles(
         deflection_angles: np.ndarray, wavelength: float
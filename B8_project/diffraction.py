@@ -5,7 +5,9 @@ Diffraction
 TODO: update module docstring.
 """
 
+from dataclasses import dataclass, field
 from datetime import datetime
+from multiprocessing import Pool, shared_memory, util
 from typing import Mapping
 import numpy as np
 import matplotlib.pyplot as plt
@@ -13,14 +15,557 @@ import plotly.graph_objects as go
 
 from B8_project import utils
 from B8_project.crystal import UnitCell, ReciprocalSpace
-from B8_project.form_factor import FormFactorProtocol, NeutronFormFactor, XRayFormFactor
+from B8_project.form_factor import (
+    FormFactorProtocol,
+    FormFactorTable,
+    NeutronFormFactor,
+    XRayFormFactor,
+    evaluate_form_factor_matrix,
+    get_constant_form_factors,
+)
 from B8_project.alloy import SuperCell
 
 
+# Approximate number of bytes needed for each element of a tile of phases. This
+# accounts for the float64 dot product, the complex exponent and its exponential.
+_PHASE_BYTES_PER_ELEMENT = 40
+
+# Offset and number of bits used to encode each Miller index as part of a single
+# integer key (see `PhaseCache`).
+_MILLER_INDEX_OFFSET = 2**20
+_MILLER_INDEX_BITS = 21
+
+# Default maximum number of bytes used to store the phases of a `PhaseCache`.
+_DEFAULT_PHASE_CACHE_BYTES = 2**30
+
+# Smallest tile of phases (number of reciprocal lattice vectors times number of atoms)
+# which is factorised by axis (see `_use_axis_phase_table`). For smaller tiles, the
+# overhead of finding the distinct Miller indices along each axis outweighs the saving.
+_MIN_AXIS_PHASE_ELEMENTS = 2**13
+
+
+@dataclass
+class PhaseCache:
+    """
+    Phase cache
+    ===========
+
+    A class to cache the phases exp(2πi G·r) of a set of atomic positions for a range of
+    reciprocal lattice vectors.
+
+    The phases only depend on the Miller indices (h, k, l) and on the fractional
+    positions of the atoms, so they are unchanged when the lattice constants of a
+    crystal are rescaled, or when atoms are substituted for atoms of a different
+    species. A `PhaseCache` can therefore be shared between the diffraction
+    calculations for every concentration of a disordered alloy, so that only the form
+    factors need to be re-evaluated for each concentration.
+
+    The cache stores a row of phases for each Miller index that has been requested, and
+    only the phases of new Miller indices are calculated. The new phases are evaluated
+    in tiles, so that the intermediate arrays fit within a memory budget (see
+    `_get_chunk_shape`). If different atomic positions are requested, the cache is
+    cleared.
+
+    Attributes
+    ----------
+    max_bytes : int | None
+        The maximum number of bytes used to store the phases. Requests which would
+        exceed this limit are not cached. The default value is 1 GiB. If None, there is
+        no limit.
+
+    Methods
+    -------
+    fits
+        Returns True if the phases for a set of Miller indices and positions fit in the
+        cache.
+    get_phase_sums
+        Returns weighted sums of the phases for a set of Miller indices and positions.
+    clear
+        Removes all phases from the cache.
+    """
+
+    max_bytes: int | None = _DEFAULT_PHASE_CACHE_BYTES
+    _positions: np.ndarray | None = field(default=None, init=False, repr=False)
+    _keys: np.ndarray = field(
+        default_factory=lambda: np.empty(0, dtype=np.int64), init=False, repr=False
+    )
+    _rows: np.ndarray = field(
+        default_factory=lambda: np.empty(0, dtype=np.intp), init=False, repr=False
+    )
+    _phases: np.ndarray | None = field(default=None, init=False, repr=False)
+    _axis_phase_table: tuple | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        if self.max_bytes is not None and self.max_bytes <= 0:
+            raise ValueError("max_bytes must be greater than 0.")
+
+    @staticmethod
+    def _encode_miller_indices(miller_indices: np.ndarray) -> np.ndarray:
+        """
+        Encode Miller indices
+        =====================
+
+        Encodes each set of Miller indices (h, k, l) as a single 64 bit integer key.
+        """
+        miller_indices = np.asarray(miller_indices, dtype=np.int64)
+
+        # Error handling.
+        if np.any(np.abs(miller_indices) >= _MILLER_INDEX_OFFSET):
+            raise ValueError(
+                f"Miller indices must be smaller than {_MILLER_INDEX_OFFSET}."
+            )
+
+        shifted = miller_indices + _MILLER_INDEX_OFFSET
+        return (
+            (shifted[:, 0] << (2 * _MILLER_INDEX_BITS))
+            | (shifted[:, 1] << _MILLER_INDEX_BITS)
+            | shifted[:, 2]
+        )
+
+    def clear(self):
+        """
+        Clear
+        =====
+
+        Removes all phases from the cache.
+        """
+        self._positions = None
+        self._keys = np.empty(0, dtype=np.int64)
+        self._rows = np.empty(0, dtype=np.intp)
+        self._phases = None
+        self._axis_phase_table = None
+
+    def fits(self, num_rlvs: int, num_atoms: int) -> bool:
+        """
+        Fits
+        ====
+
+        Returns True if the phases of `num_rlvs` reciprocal lattice vectors and
+        `num_atoms` atoms fit within `max_bytes`.
+        """
+        if self.max_bytes is None:
+            return True
+
+        return num_rlvs * num_atoms * np.dtype(np.complex128).itemsize <= self.max_bytes
+
+    def _add_phases(
+        self,
+        miller_indices: np.ndarray,
+        keys: np.ndarray,
+        memory_budget: int | None = None,
+    ):
+        """
+        Add phases
+        ==========
+
+        Calculates the phases of a range of new Miller indices, and stores them in the
+        cache. The phases are appended to the end of the stored phases, and the sorted
+        keys are updated to point at the new rows. The phases are evaluated in tiles,
+        so that the intermediate arrays use at most roughly `memory_budget` bytes.
+        """
+        num_rows = len(self._keys)
+        num_atoms = len(self._positions)
+
+        # Grow the storage geometrically, so that adding a few rows at a time does not
+        # copy every stored phase.
+        if self._phases is None or num_rows + len(keys) > len(self._phases):
+            capacity = max(num_rows + len(keys), 2 * num_rows)
+            if self.max_bytes is not None:
+                capacity = max(
+                    min(capacity, self.max_bytes // (16 * max(num_atoms, 1))),
+                    num_rows + len(keys),
+                )
+            phases = np.empty((capacity, num_atoms), dtype=np.complex128)
+            if self._phases is not None:
+                phases[:num_rows] = self._phases[:num_rows]
+            self._phases = phases
+
+        # Evaluate the new phases in tiles over both reciprocal lattice vectors and
+        # atoms.
+        rlvs_per_chunk, atoms_per_chunk = _get_chunk_shape(
+            len(keys), num_atoms, memory_budget
+        )
+        for rlv_start in range(0, len(keys), rlvs_per_chunk):
+            rlv_stop = min(rlv_start + rlvs_per_chunk, len(keys))
+
+            for atom_start in range(0, num_atoms, atoms_per_chunk):
+                atom_stop = atom_start + atoms_per_chunk
+
+                self._phases[
+                    num_rows + rlv_start : num_rows + rlv_stop, atom_start:atom_stop
+                ] = _calculate_phases(
+                    miller_indices[rlv_start:rlv_stop],
+                    self._positions[atom_start:atom_stop],
+                    _slice_axis_phase_table(
+                        self._axis_phase_table, atom_start, atom_stop
+                    ),
+                )
+
+        # Insert the new keys, keeping the keys sorted.
+        rows = np.concatenate((self._rows, np.arange(num_rows, num_rows + len(keys))))
+        keys = np.concatenate((self._keys, keys))
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._rows = rows[order]
+
+    def get_phase_sums(
+        self,
+        miller_indices: np.ndarray,
+        positions: np.ndarray,
+        weights: np.ndarray,
+        memory_budget: int | None = None,
+        atom_indices: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """
+        Get phase sums
+        ==============
+
+        Returns the weighted sums of the phases exp(2πi G·r) over a set of atomic
+        positions, for each reciprocal lattice vector in a range of Miller indices.
+        `weights` should have a row for each position, and the phase sums have a row
+        for each set of Miller indices and a column for each column of `weights`. Only
+        the phases of Miller indices which are not already in the cache are calculated.
+
+        If `atom_indices` is specified, only the positions at these indices are summed
+        over, and `weights` should have a row for each of these positions. The phases of
+        every position are still stored in the cache, so that they can be reused for a
+        different subset of the positions.
+
+        The new phases are calculated, and the cached phases are summed, in tiles, so
+        that the intermediate arrays use at most roughly `memory_budget` bytes. If
+        `memory_budget` is None, the cached phases are summed 4096 rows at a time.
+        """
+        # Clear the cache if the atomic positions have changed.
+        if self._positions is None or not np.array_equal(self._positions, positions):
+            self.clear()
+            self._positions = np.array(positions, dtype=float)
+            self._axis_phase_table = _get_axis_phase_table(self._positions)
+
+        keys = self._encode_miller_indices(miller_indices)
+
+        # Find the Miller indices which are not in the cache.
+        indices = np.searchsorted(self._keys, keys)
+        found = indices < len(self._keys)
+        found[found] = self._keys[indices[found]] == keys[found]
+
+        if not np.all(found):
+            new_keys, new_rows = np.unique(keys[~found], return_index=True)
+
+            # If the new phases do not fit in the cache, start again from an empty
+            # cache containing only the requested phases.
+            if not self.fits(len(self._keys) + len(new_keys), len(positions)):
+                positions, axis_phase_table = self._positions, self._axis_phase_table
+                self.clear()
+                self._positions, self._axis_phase_table = positions, axis_phase_table
+                found[:] = False
+                new_keys, new_rows = np.unique(keys, return_index=True)
+
+            self._add_phases(miller_indices[~found][new_rows], new_keys, memory_budget)
+            indices = np.searchsorted(self._keys, keys)
+
+        rows = self._rows[indices]
+        if atom_indices is None:
+            atom_indices = np.arange(len(self._positions))
+        num_atoms = len(atom_indices)
+
+        # Sum the phases in tiles, so that the phases are never copied all at once.
+        phase_sums = np.zeros((len(rows), weights.shape[1]), dtype=np.complex128)
+        if memory_budget is None:
+            rows_per_chunk, atoms_per_chunk = 4096, max(num_atoms, 1)
+        else:
+            rows_per_chunk, atoms_per_chunk = _get_chunk_shape(
+                len(rows), num_atoms, memory_budget
+            )
+
+        for start in range(0, len(rows), rows_per_chunk):
+            stop = start + rows_per_chunk
+
+            for atom_start in range(0, num_atoms, atoms_per_chunk):
+                atom_stop = atom_start + atoms_per_chunk
+                phase_sums[start:stop] += (
+                    self._phases[
+                        np.ix_(rows[start:stop], atom_indices[atom_start:atom_stop])
+                    ]
+                    @ weights[atom_start:atom_stop]
+                )
+
+        return phase_sums
+
+
+def _get_axis_phase_table(
+    positions: np.ndarray,
+) -> tuple[tuple[np.ndarray, ...], np.ndarray] | None:
+    """
+    Get axis phase table
+    ====================
+
+    Returns the distinct fractional coordinates of a set of atomic positions along each
+    axis, together with the index of the coordinate of each atom along each axis, if
+    there are fewer distinct coordinates in total than there are atoms. Otherwise,
+    returns None.
+
+    The phase exp(2πi (hx + ky + lz)) is the product of the phases exp(2πi hx),
+    exp(2πi ky) and exp(2πi lz), so the phases can be assembled from a small table of
+    phases for each axis (see `_calculate_phases`). A super cell generated by
+    `SuperCell.new_super_cell` with side lengths (N1, N2, N3) has only a few distinct
+    coordinates along each axis (e.g. 4 N1 along x for a zinc-blende super cell).
+    """
+    coordinates, indices = zip(
+        *(np.unique(positions[:, axis], return_inverse=True) for axis in range(3))
+    )
+
+    num_coordinates = sum(len(axis_coordinates) for axis_coordinates in coordinates)
+    if num_coordinates >= len(positions):
+        return None
+
+    return coordinates, np.stack(indices, axis=1)
+
+
+def _slice_axis_phase_table(
+    axis_phase_table: tuple[tuple[np.ndarray, ...], np.ndarray] | None,
+    start: int,
+    stop: int,
+) -> tuple[tuple[np.ndarray, ...], np.ndarray] | None:
+    """
+    Slice axis phase table
+    ======================
+
+    Returns the axis phase table (see `_get_axis_phase_table`) of the atoms from
+    `start` to `stop`, for use with `_calculate_phases` on a tile of atoms.
+    """
+    if axis_phase_table is None:
+        return None
+
+    coordinates, indices = axis_phase_table
+    return coordinates, indices[start:stop]
+
+
+def _use_axis_phase_table(
+    num_rlvs: int, axis_phase_table: tuple[tuple[np.ndarray, ...], np.ndarray] | None
+) -> bool:
+    """
+    Use axis phase table
+    ====================
+
+    Returns True if the phases of a tile of `num_rlvs` reciprocal lattice vectors and
+    the atoms of `axis_phase_table` should be factorised by axis, and False if they
+    should be evaluated directly.
+
+    Factorising by axis replaces an exponential for each element of the tile with a
+    product of three table lookups, but it also evaluates the phase of every distinct
+    coordinate for each reciprocal lattice vector and finds the distinct Miller indices
+    along each axis. It is therefore only used if the tile has more atoms than there
+    are distinct coordinates, and at least `_MIN_AXIS_PHASE_ELEMENTS` elements.
+    """
+    if axis_phase_table is None:
+        return False
+
+    coordinates, indices = axis_phase_table
+    num_coordinates = sum(len(axis_coordinates) for axis_coordinates in coordinates)
+
+    return (
+        num_coordinates < len(indices)
+        and num_rlvs * len(indices) >= _MIN_AXIS_PHASE_ELEMENTS
+    )
+
+
+def _calculate_phases(
+    miller_indices: np.ndarray,
+    positions: np.ndarray,
+    axis_phase_table: tuple[tuple[np.ndarray, ...], np.ndarray] | None = None,
+) -> np.ndarray:
+    """
+    Calculate phases
+    ================
+
+    Returns the phases exp(2πi G·r) of a set of atomic positions for a range of Miller
+    indices, as an array with a row for each set of Miller indices and a column for
+    each position.
+
+    If `axis_phase_table` is specified (see `_get_axis_phase_table`) and the tile is
+    large enough (see `_use_axis_phase_table`), the phase of each atom is the product
+    of the phases along each axis, which are evaluated only for the distinct Miller
+    indices and coordinates along that axis. Otherwise, the phases are evaluated
+    directly.
+    """
+    if _use_axis_phase_table(len(miller_indices), axis_phase_table):
+        coordinates, indices = axis_phase_table
+
+        phases = None
+        for axis, axis_coordinates in enumerate(coordinates):
+            axis_miller_indices, rows = np.unique(
+                miller_indices[:, axis], return_inverse=True
+            )
+
+            # Evaluate the phases of the distinct Miller indices and coordinates along
+            # the current axis, and look up the phase of each atom.
+            axis_phases = np.exp(
+                (2 * np.pi * 1j)
+                * np.multiply.outer(axis_miller_indices, axis_coordinates)
+            )
+            axis_phases = np.take(axis_phases[rows], indices[:, axis], axis=1)
+
+            if phases is None:
+                phases = axis_phases
+            else:
+                phases *= axis_phases
+
+        return phases
+
+    return np.exp((2 * np.pi * 1j) * np.dot(miller_indices, positions.T))
+
+
+def _get_chunk_shape(
+    num_rlvs: int, num_atoms: int, memory_budget: int | None = None
+) -> tuple[int, int]:
+    """
+    Get chunk shape
+    ===============
+
+    Returns the number of reciprocal lattice vectors and the number of atoms that
+    should be included in each tile of the phase matrix, so that the memory used by a
+    single tile does not exceed `memory_budget` (given in bytes). If `memory_budget` is
+    None, the whole phase matrix is evaluated as a single tile.
+    """
+    if memory_budget is None:
+        return max(num_rlvs, 1), max(num_atoms, 1)
+
+    if memory_budget <= 0:
+        raise ValueError("memory_budget must be greater than 0.")
+
+    # Number of phase matrix elements that fit in the memory budget.
+    max_elements = max(memory_budget // _PHASE_BYTES_PER_ELEMENT, 1)
+
+    # Tile over atoms only if a single reciprocal lattice vector does not fit within
+    # the memory budget.
+    atoms_per_chunk = int(min(max(num_atoms, 1), max_elements))
+    rlvs_per_chunk = int(min(max(num_rlvs, 1), max(max_elements // atoms_per_chunk, 1)))
+
+    return rlvs_per_chunk, atoms_per_chunk
+
+
+def _calculate_phase_sums(
+    miller_indices: np.ndarray,
+    positions: np.ndarray,
+    memory_budget: int | None = None,
+    weights: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Calculate phase sums
+    ====================
+
+    Calculates the sum of exp(2πi G·r) over a set of atomic positions, for each
+    reciprocal lattice vector in a range of Miller indices. The phase matrix is
+    evaluated in tiles over both reciprocal lattice vectors and atoms, so that the
+    memory used at any one time is bounded by `memory_budget` (given in bytes). If the
+    positions have few distinct coordinates along each axis, the phases are factorised
+    by axis (see `_get_axis_phase_table`).
+
+    If `weights` is specified, it should have a row for each position, and weighted
+    sums are calculated as a matrix product of the phase matrix with `weights`. The
+    phase sums then have a row for each set of Miller indices and a column for each
+    column of `weights`.
+    """
+    num_rlvs = miller_indices.shape[0]
+    num_atoms = positions.shape[0]
+
+    # Initialise the phase sums array.
+    if weights is None:
+        phase_sums = np.zeros(num_rlvs, dtype=np.complex128)
+    else:
+        phase_sums = np.zeros((num_rlvs, weights.shape[1]), dtype=np.complex128)
+
+    rlvs_per_chunk, atoms_per_chunk = _get_chunk_shape(
+        num_rlvs, num_atoms, memory_budget
+    )
+
+    # Factorise the phases by axis, if possible.
+    axis_phase_table = _get_axis_phase_table(positions)
+
+    for rlv_start in range(0, num_rlvs, rlvs_per_chunk):
+        rlv_stop = rlv_start + rlvs_per_chunk
+
+        for atom_start in range(0, num_atoms, atoms_per_chunk):
+            atom_stop = atom_start + atoms_per_chunk
+
+            # Calculate phases for the current tile of atoms and Miller indices.
+            phases = _calculate_phases(
+                miller_indices[rlv_start:rlv_stop],
+                positions[atom_start:atom_stop],
+                _slice_axis_phase_table(axis_phase_table, atom_start, atom_stop),
+            )
+
+            # Accumulate the contribution from the current tile.
+            if weights is None:
+                phase_sums[rlv_start:rlv_stop] += np.sum(phases, axis=1)
+            else:
+                phase_sums[rlv_start:rlv_stop] += phases @ weights[atom_start:atom_stop]
+
+    return phase_sums
+
+
+def _get_form_factor_table(
+    form_factors: Mapping[int, FormFactorProtocol],
+) -> Mapping[int, FormFactorProtocol]:
+    """
+    Get form factor table
+    =====================
+
+    Converts a `Mapping` of `XRayFormFactor` or `NeutronFormFactor` instances to a
+    `FormFactorTable`, so that the form factors of every species can be evaluated in a
+    single vectorised call. Any other `Mapping` (e.g. of `XRayFormFactorHardShell`
+    instances) is returned unchanged.
+    """
+    try:
+        return FormFactorTable.from_form_factors(form_factors)
+    except ValueError:
+        return form_factors
+
+
+def _evaluate_form_factors(
+    form_factors: Mapping[int, FormFactorProtocol],
+    atomic_numbers: np.ndarray,
+    reciprocal_lattice_vector_magnitudes: np.ndarray,
+) -> np.ndarray:
+    """
+    Evaluate form factors
+    =====================
+
+    Evaluates the form factors of a range of atoms for a range of reciprocal lattice
+    vectors, and returns an array of shape (number of atoms, number of reciprocal
+    lattice vectors (see `form_factor.evaluate_form_factor_matrix`).
+    """
+    try:
+        return evaluate_form_factor_matrix(
+            form_factors, atomic_numbers, reciprocal_lattice_vector_magnitudes
+        )
+    except KeyError as exc:
+        raise KeyError(f"Error reading form factor Mapping: {exc}") from exc
+
+
+def _get_constant_form_factors(
+    form_factors: Mapping[int, FormFactorProtocol], atomic_numbers: np.ndarray
+) -> np.ndarray | None:
+    """
+    Get constant form factors
+    =========================
+
+    Returns the form factor of each of a range of atoms as a scalar, or None if any of
+    the form factors depend on the reciprocal lattice vector (see
+    `form_factor.get_constant_form_factors`).
+    """
+    try:
+        return get_constant_form_factors(form_factors, atomic_numbers)
+    except KeyError as exc:
+        raise KeyError(f"Error reading form factor Mapping: {exc}") from exc
+
+
 def _calculate_structure_factors(
     unit_cell: UnitCell,
     form_factors: Mapping[int, FormFactorProtocol],
     reciprocal_lattice_vectors: np.ndarray,
+    memory_budget: int | None = None,
+    phase_cache: PhaseCache | None = None,
 ) -> np.ndarray:
     """
     Calculate structure factors
@@ -28,70 +573,524 @@ def _calculate_structure_factors(
 
     Calculates the structure factor of a crystal for a specified range of
     reciprocal lattice vectors, and returns the structure factors as a NumPy array.
+
+    If `memory_budget` is specified, the phases are evaluated in tiles so that the
+    intermediate arrays use at most roughly `memory_budget` bytes, regardless of the
+    number of atoms in the crystal.
+
+    If `unit_cell` is an ordered super cell generated by `SuperCell.new_super_cell`,
+    the structure factors are calculated analytically from the structure factors of
+    the original unit cell (see `_calculate_super_cell_structure_factors`). If
+    `unit_cell` stores a primitive basis and centering translations, the centering is
+    also accounted for analytically (see `_calculate_centered_structure_factors`).
+
+    If `unit_cell` is a disordered super cell generated by `SuperCell.apply_disorder`,
+    the structure factors of the ordered super cell are updated for the substituted
+    atoms only, using the phases in `phase_cache` if it is specified (see
+    `_calculate_disordered_structure_factors`). Otherwise, if `phase_cache` is
+    specified, the phases of every atom are read from (and stored in) the cache,
+    provided that they fit in the cache (see `_calculate_cached_structure_factors`).
+    """
+    if isinstance(unit_cell, SuperCell) and unit_cell.unit_cell is not None:
+        return _calculate_super_cell_structure_factors(
+            unit_cell, form_factors, reciprocal_lattice_vectors, memory_budget
+        )
+
+    if unit_cell.centering_translations is not None:
+        return _calculate_centered_structure_factors(
+            unit_cell, form_factors, reciprocal_lattice_vectors, memory_budget
+        )
+
+    if isinstance(unit_cell, SuperCell) and unit_cell.ordered_super_cell is not None:
+        return _calculate_disordered_structure_factors(
+            unit_cell,
+            form_factors,
+            reciprocal_lattice_vectors,
+            memory_budget,
+            phase_cache,
+        )
+
+    if phase_cache is not None and phase_cache.fits(
+        len(reciprocal_lattice_vectors), len(unit_cell.atoms)
+    ):
+        return _calculate_cached_structure_factors(
+            unit_cell.atoms,
+            form_factors,
+            reciprocal_lattice_vectors,
+            phase_cache,
+            memory_budget,
+        )
+
+    return _calculate_basis_structure_factors(
+        unit_cell.atoms, form_factors, reciprocal_lattice_vectors, memory_budget
+    )
+
+
+def _calculate_basis_structure_factors(
+    atoms: np.ndarray,
+    form_factors: Mapping[int, FormFactorProtocol],
+    reciprocal_lattice_vectors: np.ndarray,
+    memory_budget: int | None = None,
+) -> np.ndarray:
+    """
+    Calculate basis structure factors
+    =================================
+
+    Calculates the structure factors of a list of atoms for a specified range of
+    reciprocal lattice vectors by summing the contribution from every atom, and returns
+    the structure factors as a NumPy array.
+
+    If the form factors are constant (e.g. neutron form factors), the structure factors
+    are calculated as a single sum of the phases of every atom, weighted by its form
+    factor.
     """
     # Extract atomic numbers and positions.
-    atomic_numbers = unit_cell.atoms["atomic_numbers"]
-    positions = unit_cell.atoms["positions"]
+    atomic_numbers = atoms["atomic_numbers"]
+    positions = atoms["positions"]
+
+    # Weight the phase of each atom by its form factor, if the form factors are
+    # constant.
+    species, species_indices = np.unique(atomic_numbers, return_inverse=True)
+    constant_form_factors = _get_constant_form_factors(form_factors, species)
+    if constant_form_factors is not None:
+        return _calculate_phase_sums(
+            reciprocal_lattice_vectors["miller_indices"],
+            positions,
+            memory_budget,
+            constant_form_factors[species_indices, np.newaxis].astype(np.complex128),
+        )[:, 0]
 
     # Initialize the structure factors array.
     structure_factors = np.zeros(
         reciprocal_lattice_vectors.shape[0], dtype=np.complex128
     )
 
-    # Iterate over unique atomic numbers to evaluate form factors
-    for atomic_number in np.unique(atomic_numbers):
-        try:
-            form_factor = form_factors[atomic_number]
-        except KeyError as exc:
-            raise KeyError(f"Error reading form factor Mapping: {exc}") from exc
-
-        # Evaluate the form factor for all RLVs.
-        form_factor_values = form_factor.evaluate_form_factors(
-            reciprocal_lattice_vectors["magnitudes"]
-        )
+    # Evaluate the form factor of each unique atomic number for all RLVs.
+    form_factor_values = _evaluate_form_factors(
+        form_factors, species, reciprocal_lattice_vectors["magnitudes"]
+    )
 
+    for i, atomic_number in enumerate(species):
         # Get the positions of all of the current atoms
         mask = atomic_numbers == atomic_number
         current_positions = positions[mask]
 
-        # Calculate exponents for all current atoms and Miller indices at once
-        exponents = (2 * np.pi * 1j) * np.dot(
-            reciprocal_lattice_vectors["miller_indices"], current_positions.T
-        )
-
         # Sum the contribution from all atoms in the UC with the current atomic number.
-        structure_factors += np.sum(
-            form_factor_values[:, np.newaxis] * np.exp(exponents), axis=1
+        structure_factors += form_factor_values[i] * _calculate_phase_sums(
+            reciprocal_lattice_vectors["miller_indices"],
+            current_positions,
+            memory_budget,
         )
 
     return structure_factors
 
 
-def _calculate_diffraction_peaks(
+def _calculate_cached_structure_factors(
+    atoms: np.ndarray,
+    form_factors: Mapping[int, FormFactorProtocol],
+    reciprocal_lattice_vectors: np.ndarray,
+    phase_cache: PhaseCache,
+    memory_budget: int | None = None,
+) -> np.ndarray:
+    """
+    Calculate cached structure factors
+    ==================================
+
+    Calculates the structure factors of a list of atoms for a specified range of
+    reciprocal lattice vectors using phases from a `PhaseCache`, and returns the
+    structure factors as a NumPy array.
+
+    The phase sum of each species is calculated as a product of the cached phases with a
+    one-hot occupancy matrix, so only the occupancy and the form factors depend on
+    which atoms are present at each position. If the form factors are constant (e.g.
+    neutron form factors), the cached phases are instead multiplied by the form factor
+    of each atom directly.
+    """
+    # Extract atomic numbers and positions.
+    atomic_numbers = atoms["atomic_numbers"]
+    positions = atoms["positions"]
+
+    # Weight the phase of each atom by its form factor, if the form factors are
+    # constant.
+    species, species_indices = np.unique(atomic_numbers, return_inverse=True)
+    constant_form_factors = _get_constant_form_factors(form_factors, species)
+    if constant_form_factors is not None:
+        return phase_cache.get_phase_sums(
+            reciprocal_lattice_vectors["miller_indices"],
+            positions,
+            constant_form_factors[species_indices, np.newaxis].astype(np.complex128),
+            memory_budget,
+        )[:, 0]
+
+    # The occupancy matrix has a row for each atom, and a column for each species.
+    occupancy = np.zeros((len(atomic_numbers), len(species)), dtype=np.complex128)
+    occupancy[np.arange(len(atomic_numbers)), species_indices] = 1
+
+    # Sum the phases of the atoms of each species.
+    species_phase_sums = phase_cache.get_phase_sums(
+        reciprocal_lattice_vectors["miller_indices"],
+        positions,
+        occupancy,
+        memory_budget,
+    )
+
+    # Evaluate the form factor of each species for all RLVs, and sum the contributions
+    # of every species.
+    form_factor_values = _evaluate_form_factors(
+        form_factors, species, reciprocal_lattice_vectors["magnitudes"]
+    )
+
+    return np.sum(form_factor_values.T * species_phase_sums, axis=1)
+
+
+def _update_structure_factors(
+    structure_factors: np.ndarray,
+    form_factors: Mapping[int, FormFactorProtocol],
+    reciprocal_lattice_vectors: np.ndarray,
+    changed_atoms: np.ndarray,
+    new_atomic_numbers: np.ndarray,
+    memory_budget: int | None = None,
+) -> np.ndarray:
+    """
+    Update structure factors
+    ========================
+
+    Updates the structure factors of a crystal after the atomic numbers of some of its
+    atoms have changed, and returns the updated structure factors as a NumPy array.
+
+    `changed_atoms` is a structured NumPy array of the atoms that have changed, with
+    their old atomic numbers, and `new_atomic_numbers` contains the new atomic number of
+    each of these atoms. For each pair of old and new atomic numbers, the contribution
+    (f_new - f_old) * sum exp(2πi G·r) of the changed atoms is added to the structure
+    factors, so only the changed atoms are summed over. If the form factors are
+    constant (e.g. neutron form factors), the phases of every changed atom are summed
+    at once, weighted by the change in the form factor of each atom.
+    """
+    # Initialize the updated structure factors array.
+    updated_structure_factors = np.array(structure_factors, dtype=np.complex128)
+
+    old_atomic_numbers = changed_atoms["atomic_numbers"]
+    positions = changed_atoms["positions"]
+    new_atomic_numbers = np.asarray(new_atomic_numbers)
+
+    # Find every distinct substitution.
+    substitutions = np.unique(
+        np.stack((old_atomic_numbers, new_atomic_numbers), axis=1), axis=0
+    )
+
+    substitutions = substitutions[substitutions[:, 0] != substitutions[:, 1]]
+    if len(substitutions) == 0:
+        return updated_structure_factors
+
+    species, species_indices = np.unique(substitutions, return_inverse=True)
+    species_indices = species_indices.reshape(substitutions.shape)
+
+    # Weight the phase of each changed atom by its change in form factor, if the form
+    # factors are constant.
+    constant_form_factors = _get_constant_form_factors(form_factors, species)
+    if constant_form_factors is not None:
+        mask = old_atomic_numbers != new_atomic_numbers
+        form_factor_differences = (
+            constant_form_factors[np.searchsorted(species, new_atomic_numbers[mask])]
+            - constant_form_factors[np.searchsorted(species, old_atomic_numbers[mask])]
+        )
+
+        updated_structure_factors += _calculate_phase_sums(
+            reciprocal_lattice_vectors["miller_indices"],
+            positions[mask],
+            memory_budget,
+            form_factor_differences[:, np.newaxis].astype(np.complex128),
+        )[:, 0]
+        return updated_structure_factors
+
+    # Evaluate the form factor of every species involved for all RLVs.
+    form_factor_values = _evaluate_form_factors(
+        form_factors, species, reciprocal_lattice_vectors["magnitudes"]
+    )
+
+    for (old_atomic_number, new_atomic_number), (old_index, new_index) in zip(
+        substitutions, species_indices
+    ):
+        # Calculate the change in form factor for all RLVs.
+        form_factor_differences = (
+            form_factor_values[new_index] - form_factor_values[old_index]
+        )
+
+        # Get the positions of the atoms with the current substitution.
+        mask = (old_atomic_numbers == old_atomic_number) & (
+            new_atomic_numbers == new_atomic_number
+        )
+
+        updated_structure_factors += form_factor_differences * _calculate_phase_sums(
+            reciprocal_lattice_vectors["miller_indices"],
+            positions[mask],
+            memory_budget,
+        )
+
+    return updated_structure_factors
+
+
+def _update_cached_structure_factors(
+    structure_factors: np.ndarray,
+    form_factors: Mapping[int, FormFactorProtocol],
+    reciprocal_lattice_vectors: np.ndarray,
+    atoms: np.ndarray,
+    changed_indices: np.ndarray,
+    new_atomic_numbers: np.ndarray,
+    phase_cache: PhaseCache,
+    memory_budget: int | None = None,
+) -> np.ndarray:
+    """
+    Update cached structure factors
+    ===============================
+
+    Updates the structure factors of a crystal after the atomic numbers of some of its
+    atoms have changed, using phases from a `PhaseCache`, and returns the updated
+    structure factors as a NumPy array.
+
+    `atoms` is a structured NumPy array of every atom in the crystal, with their old
+    atomic numbers, `changed_indices` contains the indices of the atoms that have
+    changed, and `new_atomic_numbers` contains the new atomic number of each of these
+    atoms. The cache stores the phases of every atom, but only the cached phases of the
+    changed atoms are summed over. Each changed atom has an occupancy of +1 for its new
+    species and -1 for its old species, so the change in the structure factors is the
+    product of the cached phases with this occupancy matrix, weighted by the form
+    factors (see `_calculate_cached_structure_factors`).
+    """
+    # Initialize the updated structure factors array.
+    updated_structure_factors = np.array(structure_factors, dtype=np.complex128)
+
+    old_atomic_numbers = atoms["atomic_numbers"][changed_indices]
+    new_atomic_numbers = np.asarray(new_atomic_numbers)
+    if len(changed_indices) == 0:
+        return updated_structure_factors
+
+    species, species_indices = np.unique(
+        np.concatenate((old_atomic_numbers, new_atomic_numbers)), return_inverse=True
+    )
+    old_indices = species_indices[: len(changed_indices)]
+    new_indices = species_indices[len(changed_indices) :]
+
+    # Weight the phase of each changed atom by its change in form factor, if the form
+    # factors are constant.
+    constant_form_factors = _get_constant_form_factors(form_factors, species)
+    if constant_form_factors is not None:
+        form_factor_differences = (
+            constant_form_factors[new_indices] - constant_form_factors[old_indices]
+        )
+
+        updated_structure_factors += phase_cache.get_phase_sums(
+            reciprocal_lattice_vectors["miller_indices"],
+            atoms["positions"],
+            form_factor_differences[:, np.newaxis].astype(np.complex128),
+            memory_budget,
+            changed_indices,
+        )[:, 0]
+        return updated_structure_factors
+
+    # The occupancy change matrix has a row for each changed atom, and a column for
+    # each species.
+    occupancy_changes = np.zeros((len(changed_indices), len(species)), np.complex128)
+    np.add.at(occupancy_changes, (np.arange(len(changed_indices)), new_indices), 1)
+    np.add.at(occupancy_changes, (np.arange(len(changed_indices)), old_indices), -1)
+
+    # Sum the changes in the phases of the atoms of each species.
+    species_phase_sums = phase_cache.get_phase_sums(
+        reciprocal_lattice_vectors["miller_indices"],
+        atoms["positions"],
+        occupancy_changes,
+        memory_budget,
+        changed_indices,
+    )
+
+    # Evaluate the form factor of each species for all RLVs, and sum the contributions
+    # of every species.
+    form_factor_values = _evaluate_form_factors(
+        form_factors, species, reciprocal_lattice_vectors["magnitudes"]
+    )
+
+    return updated_structure_factors + np.sum(
+        form_factor_values.T * species_phase_sums, axis=1
+    )
+
+
+def _calculate_disordered_structure_factors(
+    super_cell: SuperCell,
+    form_factors: Mapping[int, FormFactorProtocol],
+    reciprocal_lattice_vectors: np.ndarray,
+    memory_budget: int | None = None,
+    phase_cache: PhaseCache | None = None,
+) -> np.ndarray:
+    """
+    Calculate disordered structure factors
+    ======================================
+
+    Calculates the structure factors of a disordered super cell generated by
+    `SuperCell.apply_disorder`, and returns the structure factors as a NumPy array.
+
+    The structure factors of the ordered super cell are calculated first (analytically,
+    if the ordered super cell is a periodic repeat of a unit cell), and are then updated
+    for the atoms whose atomic numbers differ from the ordered super cell (see
+    `_update_structure_factors`). The structure factors only depend on the Miller
+    indices and magnitudes of the reciprocal lattice vectors, so the different lattice
+    constants of the two super cells do not matter.
+
+    If `phase_cache` is specified, and the phases of every atom in the super cell fit in
+    the cache, the phases of the substituted atoms are read from (and stored in) the
+    cache instead (see `_update_cached_structure_factors`). The substituted atoms
+    differ between calls, so the cache stores the phases of every atom, and these are
+    reused for every disordered super cell with the same atomic positions.
+    """
+    ordered_super_cell = super_cell.ordered_super_cell
+
+    # Find the atoms that have been substituted.
+    mask = (
+        super_cell.atoms["atomic_numbers"] != ordered_super_cell.atoms["atomic_numbers"]
+    )
+
+    structure_factors = _calculate_structure_factors(
+        ordered_super_cell,
+        form_factors,
+        reciprocal_lattice_vectors,
+        memory_budget,
+        phase_cache,
+    )
+
+    if phase_cache is not None and phase_cache.fits(
+        len(reciprocal_lattice_vectors), len(super_cell.atoms)
+    ):
+        return _update_cached_structure_factors(
+            structure_factors,
+            form_factors,
+            reciprocal_lattice_vectors,
+            ordered_super_cell.atoms,
+            np.flatnonzero(mask),
+            super_cell.atoms["atomic_numbers"][mask],
+            phase_cache,
+            memory_budget,
+        )
+
+    return _update_structure_factors(
+        structure_factors,
+        form_factors,
+        reciprocal_lattice_vectors,
+        ordered_super_cell.atoms[mask],
+        super_cell.atoms["atomic_numbers"][mask],
+        memory_budget,
+    )
+
+
+def _calculate_centered_structure_factors(
     unit_cell: UnitCell,
     form_factors: Mapping[int, FormFactorProtocol],
+    reciprocal_lattice_vectors: np.ndarray,
+    memory_budget: int | None = None,
+) -> np.ndarray:
+    """
+    Calculate centered structure factors
+    ====================================
+
+    Calculates the structure factors of a unit cell which stores a primitive basis and
+    centering translations, and returns the structure factors as a NumPy array.
+
+    The structure factor of the conventional unit cell is the structure factor of the
+    primitive basis multiplied by the centering factor, sum_t exp(2πi G·t), where the
+    sum is over the centering translations t. Reflections for which the centering
+    factor vanishes are systematically absent, so the structure factor of the basis is
+    only evaluated for the remaining reciprocal lattice vectors.
+    """
+    # Initialise the structure factors array.
+    structure_factors = np.zeros(
+        reciprocal_lattice_vectors.shape[0], dtype=np.complex128
+    )
+
+    # Calculate the centering factor for each reciprocal lattice vector.
+    centering_factors = _calculate_phase_sums(
+        reciprocal_lattice_vectors["miller_indices"],
+        unit_cell.centering_translations,
+        memory_budget,
+    )
+
+    # Find the reflections which are not systematically absent.
+    mask = np.abs(centering_factors) > 1e-8
+
+    # Calculate the structure factor of the primitive basis for the remaining
+    # reflections.
+    basis_structure_factors = _calculate_basis_structure_factors(
+        unit_cell.atoms,
+        form_factors,
+        reciprocal_lattice_vectors[mask],
+        memory_budget,
+    )
+
+    structure_factors[mask] = centering_factors[mask] * basis_structure_factors
+
+    return structure_factors
+
+
+def _calculate_super_cell_structure_factors(
+    super_cell: SuperCell,
+    form_factors: Mapping[int, FormFactorProtocol],
+    reciprocal_lattice_vectors: np.ndarray,
+    memory_budget: int | None = None,
+) -> np.ndarray:
+    """
+    Calculate super cell structure factors
+    ======================================
+
+    Calculates the structure factors of an ordered super cell for a specified range of
+    reciprocal lattice vectors, and returns the structure factors as a NumPy array.
+
+    An ordered super cell with side lengths (N1, N2, N3) is a periodic repeat of its
+    unit cell, so its structure factor is the structure factor of the unit cell
+    multiplied by a Laue interference product. For integer Miller indices (h, k, l) of
+    the super cell, the Laue interference product is equal to N1 * N2 * N3 if h, k and l
+    are multiples of N1, N2 and N3 respectively, and is zero otherwise (its square is
+    `utils.laue_interference` at (h / N1, k / N2, l / N3)), so this is found exactly
+    with integer arithmetic. The structure factors are therefore only evaluated for the
+    unit cell, and only for the reciprocal lattice vectors where the Laue interference
+    product is non-zero.
+    """
+    side_lengths = np.array(super_cell.side_lengths)
+    miller_indices = reciprocal_lattice_vectors["miller_indices"]
+
+    # Initialise the structure factors array.
+    structure_factors = np.zeros(
+        reciprocal_lattice_vectors.shape[0], dtype=np.complex128
+    )
+
+    # Find the reciprocal lattice vectors where the Laue interference product is
+    # non-zero.
+    mask = np.all(miller_indices % side_lengths == 0, axis=1)
+
+    # Express the reciprocal lattice vectors in terms of the Miller indices of the unit
+    # cell. The magnitudes and components of the vectors are unchanged.
+    unit_cell_reciprocal_lattice_vectors = reciprocal_lattice_vectors[mask]
+    unit_cell_reciprocal_lattice_vectors["miller_indices"] //= side_lengths
+
+    structure_factors[mask] = np.prod(side_lengths) * _calculate_structure_factors(
+        super_cell.unit_cell,
+        form_factors,
+        unit_cell_reciprocal_lattice_vectors,
+        memory_budget,
+    )
+
+    return structure_factors
+
+
+def _get_reciprocal_lattice_vectors(
+    lattice_constants: np.ndarray,
     wavelength: float,
     min_deflection_angle: float = 10,
     max_deflection_angle: float = 170,
-    intensity_cutoff: float = 1e-6,
 ) -> np.ndarray:
     """
-    Calculate diffraction peaks
-    ===========================
+    Get reciprocal lattice vectors
+    ==============================
 
-    Calculates the miller indices, deflection angle and intensity of every peak in the
-    diffraction pattern of a specified crystal, and returns this data as a structured
-    NumPy array.
-
-    Array format
-    ------------
-    The structured NumPy array representing the diffraction peaks has the following
-    fields:
-        - 'miller_indices': Ndarray representing the Miller indices (h, k, l) of the
-        peak.
-        - 'deflection_angle': Float equal to the deflection angle of the peak.
-        - 'intensities': Float equal to the (normalized) intensity of the peak.
-        - 'multiplicities': Int equal to the multiplicity value of a peak.
+    Returns a structured NumPy array of every reciprocal lattice vector associated
+    with a deflection angle between a specified minimum and maximum deflection angle
+    (see `ReciprocalSpace.get_reciprocal_lattice_vectors`).
     """
     # Error handling.
     if not (min_deflection_angle >= 0 and max_deflection_angle > 0):
@@ -122,19 +1121,77 @@ def _calculate_diffraction_peaks(
         reciprocal_lattice_vectors = ReciprocalSpace.get_reciprocal_lattice_vectors(
             float(min_magnitude),
             float(max_magnitude),
-            np.array(unit_cell.lattice_constants),
+            np.array(lattice_constants),
         )
     except ValueError as exc:
         raise ValueError(f"Error generating reciprocal lattice vectors: {exc}") from exc
 
-    # Generate an array of deflection angles.
-    deflection_angles = ReciprocalSpace.deflection_angles_from_rlv_magnitudes(
-        reciprocal_lattice_vectors["magnitudes"], wavelength
+    return reciprocal_lattice_vectors
+
+
+def _calculate_diffraction_peaks(
+    unit_cell: UnitCell,
+    form_factors: Mapping[int, FormFactorProtocol],
+    wavelength: float,
+    min_deflection_angle: float = 10,
+    max_deflection_angle: float = 170,
+    intensity_cutoff: float = 1e-6,
+    memory_budget: int | None = None,
+    phase_cache: PhaseCache | None = None,
+) -> np.ndarray:
+    """
+    Calculate diffraction peaks
+    ===========================
+
+    Calculates the miller indices, deflection angle and intensity of every peak in the
+    diffraction pattern of a specified crystal, and returns this data as a structured
+    NumPy array.
+
+    Array format
+    ------------
+    The structured NumPy array representing the diffraction peaks has the following
+    fields:
+        - 'miller_indices': Ndarray representing the Miller indices (h, k, l) of the
+        peak.
+        - 'deflection_angle': Float equal to the deflection angle of the peak.
+        - 'intensities': Float equal to the (normalized) intensity of the peak.
+        - 'multiplicities': Int equal to the multiplicity value of a peak.
+    """
+    # Generate an array of all reciprocal lattice vectors with valid magnitudes.
+    reciprocal_lattice_vectors = _get_reciprocal_lattice_vectors(
+        unit_cell.lattice_constants,
+        wavelength,
+        min_deflection_angle,
+        max_deflection_angle,
     )
 
     # Calculate the structure factor for each reciprocal lattice vectors
     structure_factors = _calculate_structure_factors(
-        unit_cell, form_factors, reciprocal_lattice_vectors
+        unit_cell, form_factors, reciprocal_lattice_vectors, memory_budget, phase_cache
+    )
+
+    return _get_diffraction_peaks_from_structure_factors(
+        reciprocal_lattice_vectors, structure_factors, wavelength, intensity_cutoff
+    )
+
+
+def _get_diffraction_peaks_from_structure_factors(
+    reciprocal_lattice_vectors: np.ndarray,
+    structure_factors: np.ndarray,
+    wavelength: float,
+    intensity_cutoff: float = 1e-6,
+) -> np.ndarray:
+    """
+    Get diffraction peaks from structure factors
+    ============================================
+
+    Calculates the diffraction peaks from the structure factor of each of a range of
+    reciprocal lattice vectors, and returns this data as a structured NumPy array (see
+    `_calculate_diffraction_peaks`).
+    """
+    # Generate an array of deflection angles.
+    deflection_angles = ReciprocalSpace.deflection_angles_from_rlv_magnitudes(
+        reciprocal_lattice_vectors["magnitudes"], wavelength
     )
 
     # Calculate the intensity of each peak and normalize the intensities
@@ -159,13 +1216,19 @@ def _calculate_diffraction_peaks(
     diffraction_peaks["multiplicities"] = np.ones(len(relative_intensities))
 
     # Remove duplicate angles and sum the intensities of duplicate peaks.
-    diffraction_peaks = _merge_peaks(diffraction_peaks, intensity_cutoff)
+    diffraction_peaks = _merge_peaks(
+        diffraction_peaks,
+        intensity_cutoff,
+        reciprocal_lattice_vectors["shell_keys"],
+    )
 
     return diffraction_peaks
 
 
 def _merge_peaks(
-    diffraction_peaks: np.ndarray, intensity_cutoff: float = 1e-6
+    diffraction_peaks: np.ndarray,
+    intensity_cutoff: float = 1e-6,
+    shell_keys: np.ndarray | None = None,
 ) -> np.ndarray:
     """
     Merge peaks
@@ -176,70 +1239,294 @@ def _merge_peaks(
     angle (to within a given tolerance) are merged. Second, the remaining peaks are
     normalized. Finally, any peaks which have an intensity smaller than the intensity
     cutoff are removed.
+
+    If `shell_keys` is specified, it should contain the integer shell key of the
+    reciprocal lattice vector associated with each peak (see
+    `ReciprocalSpace.get_shell_keys`). Peaks are then merged exactly by grouping equal
+    shell keys, rather than by comparing deflection angles.
     """
     # Normalize the intensities.
     max_intensity = diffraction_peaks["intensities"].max()
     diffraction_peaks["intensities"] /= max_intensity
 
-    # Remove any intensities below a threshold.
-    # This threshold should be set to remove any intensities which should be zero, but
-    # are small due to floating point errors.
-    intensity_floating_point_threshold = 1e-10
-    diffraction_peaks = diffraction_peaks[
-        diffraction_peaks["intensities"] >= intensity_floating_point_threshold
-    ]
+    # Remove any intensities below a threshold.
+    # This threshold should be set to remove any intensities which should be zero, but
+    # are small due to floating point errors.
+    intensity_floating_point_threshold = 1e-10
+    mask = diffraction_peaks["intensities"] >= intensity_floating_point_threshold
+    diffraction_peaks = diffraction_peaks[mask]
+
+    if shell_keys is not None:
+        diffraction_peaks = _merge_peaks_by_shell_keys(
+            diffraction_peaks, shell_keys[mask]
+        )
+    else:
+        diffraction_peaks = _merge_peaks_by_deflection_angles(diffraction_peaks)
+
+    # Normalize the intensities
+    max_intensity = diffraction_peaks["intensities"].max()
+    diffraction_peaks["intensities"] /= max_intensity
+
+    # Remove peaks with intensities below the cutoff.
+    diffraction_peaks = diffraction_peaks[
+        diffraction_peaks["intensities"] >= intensity_cutoff
+    ]
+
+    # Take the absolute value of the miller indices for each peak and sort from largest
+    # to smallest, so that each peak is labelled by its family of planes {h k l}.
+    diffraction_peaks["miller_indices"] = np.sort(
+        np.abs(diffraction_peaks["miller_indices"]), axis=1
+    )[:, ::-1]
+
+    return diffraction_peaks
+
+
+def _merge_peaks_by_deflection_angles(diffraction_peaks: np.ndarray) -> np.ndarray:
+    """
+    Merge peaks by deflection angles
+    ================================
+
+    Merges all peaks which occur at the same deflection angle (to within a given
+    tolerance), and returns the merged peaks sorted by deflection angle.
+    """
+    # Relative and absolute tolerances for comparing deflection angles.
+    angle_tolerance = 1e-10
+    absolute_angle_tolerance = 1e-8
+
+    # Sort diffraction_peaks based on the deflection angle.
+    diffraction_peaks.sort(order="deflection_angles")
+
+    # A new group of duplicate peaks starts wherever the deflection angle differs from
+    # the deflection angle of the previous peak.
+    deflection_angles = diffraction_peaks["deflection_angles"]
+    new_group = np.ones(len(diffraction_peaks), dtype=bool)
+    new_group[1:] = np.diff(deflection_angles) > (
+        absolute_angle_tolerance + angle_tolerance * np.abs(deflection_angles[1:])
+    )
+    group_starts = np.flatnonzero(new_group)
+
+    # Merge the intensities and multiplicities of each group of duplicate peaks into
+    # the first peak of the group, and remove the duplicate peaks.
+    merged_intensities = np.add.reduceat(diffraction_peaks["intensities"], group_starts)
+    merged_multiplicities = np.add.reduceat(
+        diffraction_peaks["multiplicities"], group_starts
+    )
+    diffraction_peaks = diffraction_peaks[group_starts]
+    diffraction_peaks["intensities"] = merged_intensities
+    diffraction_peaks["multiplicities"] = merged_multiplicities
+
+    return diffraction_peaks
+
+
+def _merge_peaks_by_shell_keys(
+    diffraction_peaks: np.ndarray, shell_keys: np.ndarray
+) -> np.ndarray:
+    """
+    Merge peaks by shell keys
+    =========================
+
+    Merges all peaks which have the same integer shell key, and returns the merged
+    peaks sorted by deflection angle.
+    """
+    # Group the peaks by shell key. Each group is represented by its first peak.
+    _, group_starts, group_indices = np.unique(
+        shell_keys, return_index=True, return_inverse=True
+    )
+
+    # Merge the intensities and multiplicities of each group of duplicate peaks.
+    merged_intensities = np.bincount(
+        group_indices, weights=diffraction_peaks["intensities"]
+    )
+    merged_multiplicities = np.bincount(
+        group_indices, weights=diffraction_peaks["multiplicities"]
+    )
+    diffraction_peaks = diffraction_peaks[group_starts]
+    diffraction_peaks["intensities"] = merged_intensities
+    diffraction_peaks["multiplicities"] = merged_multiplicities
+
+    # Sort diffraction_peaks based on the deflection angle.
+    diffraction_peaks.sort(order="deflection_angles")
+
+    return diffraction_peaks
+
+
+def _calculate_binned_pattern(
+    unit_cell: UnitCell,
+    form_factors: Mapping[int, FormFactorProtocol],
+    wavelength: float,
+    deflection_angles: np.ndarray,
+    peak_width: float,
+    window_width: float = 5,
+    integrate_profile: bool = True,
+    memory_budget: int | None = None,
+    phase_cache: PhaseCache | None = None,
+) -> np.ndarray:
+    """
+    Calculate binned pattern
+    ========================
+
+    Calculates the diffraction pattern of a crystal by depositing the intensity of each
+    reciprocal lattice vector into a uniform grid of deflection angle bins, and returns
+    the total intensity |F|^2 in each bin. Each bin is centred on one of the specified
+    (uniformly spaced) deflection angles. The intensities are not normalized, so that
+    the bins of different ranges of deflection angles can be compared directly;
+    `get_diffraction_pattern` normalizes the pattern.
+
+    The reciprocal lattice vectors are generated shell by shell and processed in chunks
+    (see `ReciprocalSpace.generate_reciprocal_lattice_vectors`), so the peaks are never
+    merged, and the memory used does not depend on the number of reciprocal lattice
+    vectors. Reciprocal lattice vectors with a deflection angle just outside of the
+    bins are included if the tail of their peak profile falls inside the bins (see
+    `_get_binned_deflection_angle_range`).
+    """
+    # Calculate the edges of the deflection angle bins.
+    bin_edges = _get_bin_edges(deflection_angles)
+
+    min_magnitude, max_magnitude = (
+        ReciprocalSpace.rlv_magnitudes_from_deflection_angles(
+            _get_binned_deflection_angle_range(
+                bin_edges, peak_width, window_width, integrate_profile
+            ),
+            wavelength,
+        )
+    )
+
+    intensities = np.zeros_like(deflection_angles, dtype=float)
+
+    for chunk in ReciprocalSpace.generate_reciprocal_lattice_vectors(
+        float(min_magnitude), float(max_magnitude), unit_cell.lattice_constants
+    ):
+        # Calculate the deflection angle and intensity of each reciprocal lattice
+        # vector in the chunk.
+        chunk_deflection_angles = ReciprocalSpace.deflection_angles_from_rlv_magnitudes(
+            chunk["magnitudes"], wavelength
+        )
+        chunk_intensities = (
+            np.abs(
+                _calculate_structure_factors(
+                    unit_cell, form_factors, chunk, memory_budget, phase_cache
+                )
+            )
+            ** 2
+        )
+
+        intensities += _bin_intensities(
+            bin_edges,
+            chunk_deflection_angles,
+            chunk_intensities,
+            peak_width,
+            window_width,
+            integrate_profile,
+        )
+
+    return intensities
+
+
+def _get_binned_deflection_angle_range(
+    bin_edges: np.ndarray,
+    peak_width: float,
+    window_width: float = 5,
+    integrate_profile: bool = True,
+) -> np.ndarray:
+    """
+    Get binned deflection angle range
+    =================================
+
+    Returns the minimum and maximum deflection angle of the reciprocal lattice vectors
+    which contribute to a uniform grid of bins (see `_bin_intensities`). If
+    `integrate_profile` is True, the range of the bins is widened by the half-width of
+    the window of each peak, so that peaks centred just outside of the bins still
+    deposit their tails into the bins.
+    """
+    half_window = window_width * peak_width if integrate_profile else 0
+
+    return np.array(
+        [max(bin_edges[0] - half_window, 0), min(bin_edges[-1] + half_window, 180)]
+    )
 
-    # Relative tolerance for comparing deflection angles.
-    angle_tolerance = 1e-10
 
-    # Sort diffraction_peaks based on the deflection angle.
-    diffraction_peaks.sort(order="deflection_angles")
+def _get_bin_edges(deflection_angles: np.ndarray) -> np.ndarray:
+    """
+    Get bin edges
+    =============
 
-    # Initialise a mask to keep track of duplicate peaks.
-    mask = np.ones(len(diffraction_peaks), dtype=bool)
-
-    # Iterate over all diffraction peaks.
-    i = 0
-    length = len(diffraction_peaks)
-    while i < length - 1:
-        # Find all peaks with similar deflection angles and merge them.
-        j = i + 1
-        while j < length and np.isclose(
-            diffraction_peaks["deflection_angles"][i],
-            diffraction_peaks["deflection_angles"][j],
-            rtol=angle_tolerance,
-        ):
-            # Merge intensities.
-            diffraction_peaks["intensities"][i] += diffraction_peaks["intensities"][j]
+    Returns the edges of a uniform grid of bins, where each bin is centred on one of a
+    range of uniformly spaced deflection angles.
+    """
+    bin_width = deflection_angles[1] - deflection_angles[0]
+    bin_edges = np.append(deflection_angles - bin_width / 2, deflection_angles[-1])
+    bin_edges[-1] += bin_width / 2
 
-            # Update multiplicity values.
-            diffraction_peaks["multiplicities"][i] += 1
+    return bin_edges
 
-            # Mark peak as a duplicate.
-            mask[j] = False
-            j += 1
-        i = j
 
-    # Remove duplicate intensities
-    diffraction_peaks = diffraction_peaks[mask]
+def _bin_intensities(
+    bin_edges: np.ndarray,
+    deflection_angles: np.ndarray,
+    intensities: np.ndarray,
+    peak_width: float,
+    window_width: float = 5,
+    integrate_profile: bool = True,
+) -> np.ndarray:
+    """
+    Bin intensities
+    ===============
 
-    # Normalize the intensities
-    max_intensity = diffraction_peaks["intensities"].max()
-    diffraction_peaks["intensities"] /= max_intensity
+    Deposits a range of intensities at specified deflection angles into a uniform grid
+    of bins, and returns the total intensity in each bin.
 
-    # Remove peaks with intensities below the cutoff.
-    diffraction_peaks = diffraction_peaks[
-        diffraction_peaks["intensities"] >= intensity_cutoff
-    ]
+    If `integrate_profile` is True, each intensity is spread over the bins within
+    `window_width` peak widths of its deflection angle, according to a Gaussian peak
+    profile. The fraction of the intensity deposited into each bin is the integral of
+    the profile over the bin, which is calculated from a difference of error functions.
+    """
+    num_bins = len(bin_edges) - 1
+    bin_width = bin_edges[1] - bin_edges[0]
 
-    # Take the absolute value of the miller indices for each peak and sort from largest
-    # to smallest.
-    for i in range(len(diffraction_peaks)):
-        diffraction_peaks["miller_indices"][i] = np.sort(
-            diffraction_peaks["miller_indices"][i]
-        )[::-1]
+    if not integrate_profile:
+        bin_indices = np.floor((deflection_angles - bin_edges[0]) / bin_width).astype(
+            int
+        )
+        mask = (bin_indices >= 0) & (bin_indices < num_bins)
+        return np.bincount(
+            bin_indices[mask], weights=intensities[mask], minlength=num_bins
+        )
 
-    return diffraction_peaks
+    # Find the range of bins within the window of each deflection angle.
+    half_window = window_width * peak_width
+    first_bins = np.clip(
+        np.floor((deflection_angles - half_window - bin_edges[0]) / bin_width),
+        0,
+        num_bins,
+    ).astype(int)
+    last_bins = np.clip(
+        np.floor((deflection_angles + half_window - bin_edges[0]) / bin_width) + 1,
+        0,
+        num_bins,
+    ).astype(int)
+    window_lengths = last_bins - first_bins
+
+    # Index of the deflection angle and of the bin for every deposit.
+    angle_indices = np.repeat(np.arange(len(deflection_angles)), window_lengths)
+    bin_indices = (
+        np.arange(window_lengths.sum())
+        - np.repeat(np.cumsum(window_lengths) - window_lengths, window_lengths)
+        + np.repeat(first_bins, window_lengths)
+    )
+
+    # Integrate the Gaussian profile over each bin.
+    scale = np.sqrt(2) * peak_width
+    centres = deflection_angles[angle_indices]
+    fractions = 0.5 * (
+        utils.erf((bin_edges[bin_indices + 1] - centres) / scale)
+        - utils.erf((bin_edges[bin_indices] - centres) / scale)
+    )
+
+    return np.bincount(
+        bin_indices,
+        weights=fractions * intensities[angle_indices],
+        minlength=num_bins,
+    )
 
 
 def get_miller_peaks(
@@ -253,6 +1540,7 @@ def get_miller_peaks(
     intensity_cutoff: float = 1e-6,
     print_peak_data: bool = False,
     save_to_csv: bool = False,
+    memory_budget: int | None = None,
 ) -> np.ndarray:
     """
     Get miller peaks
@@ -287,6 +1575,10 @@ def get_miller_peaks(
         If True, print the peak data. Default is False.
     save_to_csv : bool, optional
         If True, save the peak data to a .csv file. Default is False.
+    memory_budget : int | None, optional
+        The approximate maximum number of bytes used by intermediate arrays when
+        calculating structure factors. If None (default), the structure factors are
+        calculated in a single step.
 
     Returns
     -------
@@ -306,6 +1598,7 @@ def get_miller_peaks(
             min_deflection_angle,
             max_deflection_angle,
             intensity_cutoff,
+            memory_budget,
         )
     elif diffraction_type == "XRD":
         diffraction_peaks = _calculate_diffraction_peaks(
@@ -315,6 +1608,7 @@ def get_miller_peaks(
             min_deflection_angle,
             max_deflection_angle,
             intensity_cutoff,
+            memory_budget,
         )
     else:
         raise ValueError("Invalid diffraction type")
@@ -335,6 +1629,134 @@ def get_miller_peaks(
     return diffraction_peaks
 
 
+def _get_deflection_angle_grid(
+    min_deflection_angle: float, max_deflection_angle: float, peak_width: float
+) -> np.ndarray:
+    """
+    Get deflection angle grid
+    =========================
+
+    Returns a uniform grid of deflection angles between a minimum and maximum
+    deflection angle, with 10 points per peak width.
+    """
+    # Calculate a sensible number of points
+    num_points = np.round(
+        10 * (max_deflection_angle - min_deflection_angle) / peak_width
+    ).astype(int)
+
+    return np.linspace(min_deflection_angle, max_deflection_angle, num_points)
+
+
+def _render_peaks_dense(
+    deflection_angles: np.ndarray, diffraction_peaks: np.ndarray, peak_width: float
+) -> np.ndarray:
+    """
+    Render peaks dense
+    ==================
+
+    Evaluates the sum of a Gaussian for each diffraction peak at each of a range of
+    deflection angles. Every Gaussian is evaluated at every deflection angle, so the
+    memory used is proportional to the number of deflection angles multiplied by the
+    number of peaks.
+    """
+    gaussian_peaks = utils.gaussian(
+        deflection_angles[:, np.newaxis],
+        diffraction_peaks["deflection_angles"],
+        peak_width,
+        diffraction_peaks["intensities"],
+    )
+
+    return np.sum(gaussian_peaks, axis=1)
+
+
+def _render_peaks_windowed(
+    deflection_angles: np.ndarray,
+    diffraction_peaks: np.ndarray,
+    peak_width: float,
+    window_width: float = 5,
+) -> np.ndarray:
+    """
+    Render peaks windowed
+    =====================
+
+    Evaluates the sum of a Gaussian for each diffraction peak at each of a range of
+    sorted deflection angles. Each Gaussian is only evaluated at the deflection angles
+    within `window_width` peak widths of the centre of the peak, and the results are
+    scatter-added into the output. The memory used is proportional to the number of
+    deflection angles plus the number of peaks multiplied by the window size.
+    """
+    return _render_peak_intensities(
+        deflection_angles,
+        diffraction_peaks["deflection_angles"],
+        diffraction_peaks["intensities"][:, np.newaxis],
+        peak_width,
+        window_width,
+    )[:, 0]
+
+
+def _render_peak_intensities(
+    deflection_angles: np.ndarray,
+    peak_angles: np.ndarray,
+    peak_intensities: np.ndarray,
+    peak_width: float,
+    window_width: float = 5,
+) -> np.ndarray:
+    """
+    Render peak intensities
+    =======================
+
+    Renders several sets of intensities for the same peaks at once (see
+    `_render_peaks_windowed`). `peak_intensities` should have a row for each peak and a
+    column for each set of intensities, and the rendered intensities have a row for
+    each deflection angle and a column for each set of intensities.
+    """
+    # Maximum number of Gaussian evaluations in each chunk of peaks.
+    max_evaluations_per_chunk = 2**20
+
+    intensities = np.zeros(
+        (len(deflection_angles), peak_intensities.shape[1]), dtype=float
+    )
+
+    # Find the range of deflection angles within the window of each peak.
+    half_window = window_width * peak_width
+    starts = np.searchsorted(deflection_angles, peak_angles - half_window, side="left")
+    stops = np.searchsorted(deflection_angles, peak_angles + half_window, side="right")
+    window_lengths = stops - starts
+
+    # Process the peaks in chunks, so that the number of Gaussian evaluations held in
+    # memory at once is bounded.
+    max_window_length = max(int(window_lengths.max(initial=0)), 1)
+    peaks_per_chunk = max(max_evaluations_per_chunk // max_window_length, 1)
+
+    for chunk_start in range(0, len(peak_angles), peaks_per_chunk):
+        chunk = slice(chunk_start, chunk_start + peaks_per_chunk)
+        chunk_lengths = window_lengths[chunk]
+
+        # Index of the peak and of the deflection angle for every evaluation.
+        peak_indices = np.repeat(np.arange(len(chunk_lengths)), chunk_lengths)
+        angle_indices = (
+            np.arange(chunk_lengths.sum())
+            - np.repeat(np.cumsum(chunk_lengths) - chunk_lengths, chunk_lengths)
+            + np.repeat(starts[chunk], chunk_lengths)
+        )
+
+        values = utils.gaussian(
+            deflection_angles[angle_indices],
+            peak_angles[chunk][peak_indices],
+            peak_width,
+            1,
+        )
+
+        for i in range(peak_intensities.shape[1]):
+            intensities[:, i] += np.bincount(
+                angle_indices,
+                weights=values * peak_intensities[chunk, i][peak_indices],
+                minlength=len(deflection_angles),
+            )
+
+    return intensities
+
+
 def get_diffraction_pattern(
     unit_cell: UnitCell,
     diffraction_type: str,
@@ -345,6 +1767,11 @@ def get_diffraction_pattern(
     max_deflection_angle: float = 170,
     peak_width: float = 0.1,
     intensity_cutoff: float = 1e-6,
+    memory_budget: int | None = None,
+    pattern_mode: str = "dense",
+    window_width: float = 5,
+    integrate_profile: bool = True,
+    phase_cache: PhaseCache | None = None,
 ) -> np.ndarray:
     """
     Get diffraction pattern
@@ -376,6 +1803,36 @@ def get_diffraction_pattern(
     intensity_cutoff : float
         The minimum intensity required for a peak to be registered. The default value
         is 1e-6.
+    memory_budget : int | None
+        The approximate maximum number of bytes used by intermediate arrays when
+        calculating structure factors. If None (default), the structure factors are
+        calculated in a single step.
+    pattern_mode : str
+        The method used to calculate the diffraction pattern. Should be one of:
+            - `"dense"` (default): every Gaussian peak is evaluated at every deflection
+            angle.
+            - `"windowed"`: each Gaussian peak is only evaluated within `window_width`
+            peak widths of its centre. This uses much less memory and time when there
+            are many peaks.
+            - `"binned"`: the intensity |F|^2 of each reciprocal lattice vector is
+            deposited directly into a bin centred on each deflection angle, without
+            merging peaks. The reciprocal lattice vectors are processed in chunks. As
+            in the other modes, the pattern is normalized so that its maximum intensity
+            is 1. This mode is intended for super cells with a very large number of
+            reciprocal lattice vectors, and `intensity_cutoff` is ignored.
+    window_width : float
+        The half-width of the window used by the `"windowed"` and `"binned"` pattern
+        modes, in units of `peak_width`. The default value is 5, which truncates each
+        peak where its height has fallen below 4e-6 of its maximum.
+    integrate_profile : bool
+        Only used by the `"binned"` pattern mode. If True (default), a Gaussian peak
+        profile of width `peak_width` is integrated over each bin, so that the pattern
+        is area-preserving. If False, the intensity of each reciprocal lattice vector
+        is deposited into a single bin.
+    phase_cache : PhaseCache | None
+        A cache of phases, which can be shared between crystals with the same atomic
+        positions (for example, the super cells of a disordered alloy at different
+        concentrations). If None (default), the phases are not cached.
 
     Returns
     -------
@@ -385,55 +1842,70 @@ def get_diffraction_pattern(
             - 'deflection_angles': A list of all sampled deflection angles.
             - 'intensities': The intensity at each deflection angle.
     """
-    # Find the diffraction peaks.
+    # Select the form factors for the diffraction type.
     if diffraction_type == "ND":
+        form_factors = neutron_form_factors
+    elif diffraction_type == "XRD":
+        form_factors = x_ray_form_factors
+    else:
+        raise ValueError("Invalid diffraction type.")
+
+    # Store the form factors in a table, so that every species is evaluated at once.
+    form_factors = _get_form_factor_table(form_factors)
+
+    # Get x coordinates of plotted points.
+    x_values = _get_deflection_angle_grid(
+        min_deflection_angle, max_deflection_angle, peak_width
+    )
+
+    # In the binned pattern mode, the intensity of each reciprocal lattice vector is
+    # binned directly, so the diffraction peaks are not needed.
+    if pattern_mode == "binned":
         try:
-            diffraction_peaks = _calculate_diffraction_peaks(
+            y_values = _calculate_binned_pattern(
                 unit_cell,
-                neutron_form_factors,
+                form_factors,
                 wavelength,
-                min_deflection_angle,
-                max_deflection_angle,
-                intensity_cutoff,
+                x_values,
+                peak_width,
+                window_width,
+                integrate_profile,
+                memory_budget,
+                phase_cache,
             )
         except Exception as exc:
-            raise ValueError(f"Error finding diffraction peaks: {exc}") from exc
+            raise ValueError(f"Error binning diffraction intensities: {exc}") from exc
 
-    elif diffraction_type == "XRD":
+        # Normalize the intensities, so that the scale matches the other pattern modes.
+        if y_values.max() > 0:
+            y_values = y_values / y_values.max()
+
+    elif pattern_mode in ("dense", "windowed"):
+        # Find the diffraction peaks.
         try:
             diffraction_peaks = _calculate_diffraction_peaks(
                 unit_cell,
-                x_ray_form_factors,
+                form_factors,
                 wavelength,
                 min_deflection_angle,
                 max_deflection_angle,
                 intensity_cutoff,
+                memory_budget,
+                phase_cache,
             )
         except Exception as exc:
             raise ValueError(f"Error finding diffraction peaks: {exc}") from exc
 
-    else:
-        raise ValueError("Invalid diffraction type.")
-
-    # Calculate a sensible number of points
-    num_points = np.round(
-        10 * (max_deflection_angle - min_deflection_angle) / peak_width
-    ).astype(int)
-
-    # Get x coordinates of plotted points.
-    x_values = np.linspace(min_deflection_angle, max_deflection_angle, num_points)
-
-    # Get y coordinates of plotted points.
-    y_values = np.zeros_like(x_values)
-
-    gaussian_peaks = utils.gaussian(
-        x_values[:, np.newaxis],
-        diffraction_peaks["deflection_angles"],
-        peak_width,
-        diffraction_peaks["intensities"],
-    )
+        # Get y coordinates of plotted points.
+        if pattern_mode == "dense":
+            y_values = _render_peaks_dense(x_values, diffraction_peaks, peak_width)
+        else:
+            y_values = _render_peaks_windowed(
+                x_values, diffraction_peaks, peak_width, window_width
+            )
 
-    y_values += np.sum(gaussian_peaks, axis=1)
+    else:
+        raise ValueError("Invalid pattern mode.")
 
     # Define a custom datatype to represent the diffraction data.
     dtype = np.dtype(
@@ -721,69 +2193,614 @@ def plot_superimposed_diffraction_patterns(
                 linewidth=line_width,
                 alpha=opacity,
             )
-        except Exception as exc:
-            raise ValueError(f"Error plotting points: {exc}") from exc
+        except Exception as exc:
+            raise ValueError(f"Error plotting points: {exc}") from exc
+
+    # Get today's date and format as a string.
+    today = datetime.today()
+    date_string = today.strftime("%d-%m-%Y")
+
+    # Create a string for the plot title.
+    title_string = "Diffraction pattern for "
+    for unit_cell, diffraction_type in unit_cells_with_diffraction_types:
+        title_string += f"{unit_cell.material} ({diffraction_type}), "
+
+    title_string = title_string[:-2]
+    title_string += "."
+
+    # Create a string for the filename.
+    filename = ""
+    for unit_cell, diffraction_type in unit_cells_with_diffraction_types:
+        filename += f"{unit_cell.material}_{diffraction_type}_"
+
+    filename += f"{date_string}"
+
+    # Set title.
+    ax.set_title(title_string, fontsize=15)
+
+    # Set axis labels.
+    ax.set_xlabel("Deflection angle (°)", fontsize=11)
+    ax.set_ylabel("Relative intensity", fontsize=11)
+
+    # Set y-axis limits.
+    ax.set_ylim(y_axis_min, y_axis_max)
+
+    # Add legend.
+    plt.legend()
+
+    # Add grid lines.
+    ax.grid(True, which="both", linestyle="--", linewidth=0.5, alpha=0.7)
+
+    # Customize the tick marks.
+    ax.tick_params(axis="both", which="major", labelsize=10)
+    ax.tick_params(axis="both", which="minor", length=4, color="gray")
+
+    # Add minor ticks.
+    ax.minorticks_on()
+
+    # Adjust layout to prevent clipping.
+    fig.tight_layout()
+
+    # Save the figure.
+    fig.savefig(f"{file_path}{filename}.pdf", format="pdf")
+
+    # Print the path to the .pdf file.
+    print(f"Plot created at {file_path}{filename}.pdf")
+
+
+def _rescale_reciprocal_lattice_vectors(
+    reciprocal_lattice_vectors: np.ndarray,
+    lattice_constants: np.ndarray,
+    min_magnitude: float,
+    max_magnitude: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Rescale reciprocal lattice vectors
+    ==================================
+
+    Recalculates the components, magnitudes and shell keys of a range of reciprocal
+    lattice vectors for a crystal with different lattice constants, and keeps the
+    reciprocal lattice vectors with a magnitude between a specified minimum and maximum
+    magnitude. Returns the rescaled reciprocal lattice vectors, and a mask of the
+    reciprocal lattice vectors that were kept.
+    """
+    miller_indices = reciprocal_lattice_vectors["miller_indices"]
+
+    # Compute reciprocal lattice vector components and magnitudes.
+    components = (2 * np.pi * miller_indices) / lattice_constants
+    magnitudes = np.linalg.norm(components, axis=1)
+
+    mask = (magnitudes >= min_magnitude) & (magnitudes <= max_magnitude)
+
+    # Create a structured NumPy array to store the rescaled reciprocal lattice vectors.
+    rescaled_reciprocal_lattice_vectors = np.empty(
+        np.count_nonzero(mask), dtype=reciprocal_lattice_vectors.dtype
+    )
+    rescaled_reciprocal_lattice_vectors["miller_indices"] = miller_indices[mask]
+    rescaled_reciprocal_lattice_vectors["magnitudes"] = magnitudes[mask]
+    rescaled_reciprocal_lattice_vectors["components"] = components[mask]
+    rescaled_reciprocal_lattice_vectors["shell_keys"] = ReciprocalSpace.get_shell_keys(
+        miller_indices[mask], lattice_constants, max_magnitude
+    )
+
+    return rescaled_reciprocal_lattice_vectors, mask
+
+
+def _get_sweep_lattice_constants(
+    pure_super_cell: SuperCell,
+    target_atomic_number: int,
+    concentrations: list[float],
+    lattice_constants_no_substitution: np.ndarray,
+    lattice_constants_full_substitution: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Get sweep lattice constants
+    ===========================
+
+    Calculates the number of substitute atoms and the (Vegard) lattice constants of a
+    disordered super cell for each of a range of concentrations, and returns them as
+    NumPy arrays.
+    """
+    num_target_atoms = np.count_nonzero(
+        pure_super_cell.atoms["atomic_numbers"] == target_atomic_number
+    )
+
+    # Error handling.
+    if num_target_atoms == 0:
+        raise ValueError("The super cell does not contain any target atoms.")
+
+    num_substitute_atoms = np.ceil(np.array(concentrations) * num_target_atoms).astype(
+        int
+    )
+    lattice_constants = np.array(
+        [
+            SuperCell.interpolate_lattice_constants(
+                pure_super_cell.lattice_constants,
+                num / num_target_atoms,
+                lattice_constants_no_substitution,
+                lattice_constants_full_substitution,
+            )
+            for num in num_substitute_atoms
+        ]
+    )
+
+    return num_substitute_atoms, lattice_constants
+
+
+def _get_sweep_reciprocal_lattice_vectors(
+    lattice_constants: np.ndarray,
+    deflection_angles: np.ndarray,
+    wavelength: float,
+    pattern_mode: str = "dense",
+    peak_width: float = 0.1,
+) -> tuple[np.ndarray, float, float]:
+    """
+    Get sweep reciprocal lattice vectors
+    ====================================
+
+    Generates a single table of reciprocal lattice vectors which contains every
+    reciprocal lattice vector in range of the deflection angles for any of a range of
+    lattice constants (one row of `lattice_constants` per crystal). Returns the table,
+    and the minimum and maximum RLV magnitudes. The reciprocal lattice vectors of each
+    crystal can then be found with `_rescale_reciprocal_lattice_vectors`.
+    """
+    # Calculate the range of deflection angles.
+    if pattern_mode == "binned":
+        min_deflection_angle, max_deflection_angle = _get_binned_deflection_angle_range(
+            _get_bin_edges(deflection_angles), peak_width
+        )
+    elif pattern_mode in ("dense", "windowed"):
+        min_deflection_angle = deflection_angles[0]
+        max_deflection_angle = deflection_angles[-1]
+    else:
+        raise ValueError("Invalid pattern mode.")
+
+    # Calculate the minimum and maximum RLV magnitudes.
+    min_magnitude, max_magnitude = (
+        ReciprocalSpace.rlv_magnitudes_from_deflection_angles(
+            np.array([min_deflection_angle, max_deflection_angle]), wavelength
+        )
+    )
+
+    # Increasing a lattice constant never increases the magnitude of a reciprocal
+    # lattice vector, and decreases it by at most the ratio of the lattice constants.
+    max_lattice_constants = lattice_constants.max(axis=0)
+    reciprocal_lattice_vectors = ReciprocalSpace.get_reciprocal_lattice_vectors(
+        float(min_magnitude * np.min(lattice_constants / max_lattice_constants)),
+        float(max_magnitude),
+        max_lattice_constants,
+    )
+
+    return reciprocal_lattice_vectors, float(min_magnitude), float(max_magnitude)
+
+
+def _calculate_pattern_from_structure_factors(
+    reciprocal_lattice_vectors: np.ndarray,
+    structure_factors: np.ndarray,
+    wavelength: float,
+    deflection_angles: np.ndarray,
+    peak_width: float,
+    intensity_cutoff: float = 1e-6,
+    pattern_mode: str = "dense",
+) -> np.ndarray:
+    """
+    Calculate pattern from structure factors
+    ========================================
+
+    Calculates the intensity at each of a range of deflection angles from the structure
+    factor of each of a range of reciprocal lattice vectors, using the same pattern
+    modes as `get_diffraction_pattern`.
+    """
+    if pattern_mode == "binned":
+        intensities = _bin_intensities(
+            _get_bin_edges(deflection_angles),
+            ReciprocalSpace.deflection_angles_from_rlv_magnitudes(
+                reciprocal_lattice_vectors["magnitudes"], wavelength
+            ),
+            np.abs(structure_factors) ** 2,
+            peak_width,
+        )
+
+        # Normalize the intensities, as in `get_diffraction_pattern`.
+        if intensities.max() > 0:
+            intensities = intensities / intensities.max()
+
+        return intensities
+
+    diffraction_peaks = _get_diffraction_peaks_from_structure_factors(
+        reciprocal_lattice_vectors, structure_factors, wavelength, intensity_cutoff
+    )
+
+    if pattern_mode == "dense":
+        return _render_peaks_dense(deflection_angles, diffraction_peaks, peak_width)
+    if pattern_mode == "windowed":
+        return _render_peaks_windowed(deflection_angles, diffraction_peaks, peak_width)
+
+    raise ValueError("Invalid pattern mode.")
+
+
+def _get_nested_disordered_diffraction_patterns(
+    pure_super_cell: SuperCell,
+    target_atomic_number: int,
+    substitute_atomic_number: int,
+    concentrations: list[float],
+    lattice_constants_no_substitution: np.ndarray,
+    lattice_constants_full_substitution: np.ndarray,
+    form_factors: Mapping[int, FormFactorProtocol],
+    wavelength: float,
+    deflection_angles: np.ndarray,
+    peak_width: float,
+    intensity_cutoff: float = 1e-6,
+    memory_budget: int | None = None,
+    pattern_mode: str = "dense",
+    rng: np.random.Generator | int | None = None,
+) -> np.ndarray:
+    """
+    Get nested disordered diffraction patterns
+    ==========================================
+
+    Calculates the diffraction pattern of a disordered alloy for a range of
+    concentrations of substitute atoms, where the substituted atoms at each
+    concentration are a superset of the substituted atoms at every lower concentration.
+    Returns a 2D array with the intensity at each deflection angle (columns) for each
+    concentration (rows).
+
+    A single random ordering of the target atoms is drawn using `rng`, and the first
+    ceil(x * number of target atoms) target atoms are substituted at concentration x.
+    The concentrations are processed from smallest to largest, and a running sum of the
+    phases of the substituted atoms is kept, so the phases of each target atom are only
+    calculated once for the whole sweep. The structure factors at each concentration are
+    then the (analytic) structure factors of the pure super cell plus
+    (f_substitute - f_target) times the running phase sum.
+
+    The running phase sums are stored for a single table of Miller indices, which
+    contains every reciprocal lattice vector in range for any of the (Vegard) lattice
+    constants of the sweep (see `_get_sweep_reciprocal_lattice_vectors`).
+    """
+    atoms = pure_super_cell.atoms
+
+    # Calculate the number of substitute atoms and the lattice constants for each
+    # concentration.
+    num_substitute_atoms, lattice_constants = _get_sweep_lattice_constants(
+        pure_super_cell,
+        target_atomic_number,
+        concentrations,
+        lattice_constants_no_substitution,
+        lattice_constants_full_substitution,
+    )
+
+    # Draw a single random ordering of the target atoms.
+    rng = utils.get_random_number_generator(rng)
+    target_indices = rng.permutation(
+        np.flatnonzero(atoms["atomic_numbers"] == target_atomic_number)
+    )
+
+    # Generate a table of Miller indices which contains every reciprocal lattice vector
+    # in range for any of the lattice constants.
+    reciprocal_lattice_vectors, min_magnitude, max_magnitude = (
+        _get_sweep_reciprocal_lattice_vectors(
+            lattice_constants, deflection_angles, wavelength, pattern_mode, peak_width
+        )
+    )
+
+    # Initialise the running sum of the phases of the substituted atoms.
+    substituted_phase_sums = np.zeros(
+        len(reciprocal_lattice_vectors), dtype=np.complex128
+    )
+    num_substituted_atoms = 0
+
+    # Initialise an array which stores the intensity data.
+    intensity_data = np.zeros((len(concentrations), len(deflection_angles)))
+
+    for i in np.argsort(num_substitute_atoms, kind="stable"):
+        # Add the phases of the newly substituted atoms to the running sum.
+        new_indices = target_indices[num_substituted_atoms : num_substitute_atoms[i]]
+        if len(new_indices) > 0:
+            substituted_phase_sums += _calculate_phase_sums(
+                reciprocal_lattice_vectors["miller_indices"],
+                atoms["positions"][new_indices],
+                memory_budget,
+            )
+        num_substituted_atoms = num_substitute_atoms[i]
+
+        # Get the reciprocal lattice vectors in range for the current lattice
+        # constants.
+        current_reciprocal_lattice_vectors, mask = _rescale_reciprocal_lattice_vectors(
+            reciprocal_lattice_vectors,
+            lattice_constants[i],
+            min_magnitude,
+            max_magnitude,
+        )
+        magnitudes = current_reciprocal_lattice_vectors["magnitudes"]
+
+        # Update the structure factors of the pure super cell for the substituted
+        # atoms.
+        substitute_form_factors, target_form_factors = _evaluate_form_factors(
+            form_factors, [substitute_atomic_number, target_atomic_number], magnitudes
+        )
+        form_factor_differences = substitute_form_factors - target_form_factors
+        structure_factors = (
+            _calculate_structure_factors(
+                pure_super_cell,
+                form_factors,
+                current_reciprocal_lattice_vectors,
+                memory_budget,
+            )
+            + form_factor_differences * substituted_phase_sums[mask]
+        )
 
-    # Get today's date and format as a string.
-    today = datetime.today()
-    date_string = today.strftime("%d-%m-%Y")
+        # Calculate the diffraction pattern for the current concentration.
+        intensity_data[i] = _calculate_pattern_from_structure_factors(
+            current_reciprocal_lattice_vectors,
+            structure_factors,
+            wavelength,
+            deflection_angles,
+            peak_width,
+            intensity_cutoff,
+            pattern_mode,
+        )
 
-    # Create a string for the plot title.
-    title_string = "Diffraction pattern for "
-    for unit_cell, diffraction_type in unit_cells_with_diffraction_types:
-        title_string += f"{unit_cell.material} ({diffraction_type}), "
+    return intensity_data
 
-    title_string = title_string[:-2]
-    title_string += "."
 
-    # Create a string for the filename.
-    filename = ""
-    for unit_cell, diffraction_type in unit_cells_with_diffraction_types:
-        filename += f"{unit_cell.material}_{diffraction_type}_"
+# State of each worker process of a parallel concentration sweep. This is set by
+# `_initialise_sweep_worker`.
+_SWEEP_WORKER_STATE: dict = {}
 
-    filename += f"{date_string}"
 
-    # Set title.
-    ax.set_title(title_string, fontsize=15)
+def _create_shared_array(
+    array: np.ndarray,
+) -> tuple[shared_memory.SharedMemory, tuple[str, tuple[int, ...], np.dtype]]:
+    """
+    Create shared array
+    ===================
 
-    # Set axis labels.
-    ax.set_xlabel("Deflection angle (°)", fontsize=11)
-    ax.set_ylabel("Relative intensity", fontsize=11)
+    Copies a NumPy array into a new block of shared memory. Returns the shared memory
+    block, and a description of the array (name, shape and dtype) which can be passed
+    to another process and used with `_attach_shared_array`. The caller is responsible
+    for closing and unlinking the shared memory block.
+    """
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared_array = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+    shared_array[...] = array
 
-    # Set y-axis limits.
-    ax.set_ylim(y_axis_min, y_axis_max)
+    return shm, (shm.name, array.shape, array.dtype)
 
-    # Add legend.
-    plt.legend()
 
-    # Add grid lines.
-    ax.grid(True, which="both", linestyle="--", linewidth=0.5, alpha=0.7)
+def _attach_shared_array(
+    description: tuple[str, tuple[int, ...], np.dtype],
+) -> tuple[shared_memory.SharedMemory, np.ndarray]:
+    """
+    Attach shared array
+    ===================
 
-    # Customize the tick marks.
-    ax.tick_params(axis="both", which="major", labelsize=10)
-    ax.tick_params(axis="both", which="minor", length=4, color="gray")
+    Returns the shared memory block and the NumPy array described by `description`
+    (see `_create_shared_array`). The array uses the shared memory as its buffer, so
+    the data is not copied.
+    """
+    name, shape, dtype = description
+    shm = shared_memory.SharedMemory(name=name)
 
-    # Add minor ticks.
-    ax.minorticks_on()
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
 
-    # Adjust layout to prevent clipping.
-    fig.tight_layout()
 
-    # Save the figure.
-    fig.savefig(f"{file_path}{filename}.pdf", format="pdf")
+def _initialise_sweep_worker(
+    shared_arrays: dict[str, tuple[str, tuple[int, ...], np.dtype]],
+    parameters: dict,
+):
+    """
+    Initialise sweep worker
+    =======================
 
-    # Print the path to the .pdf file.
-    print(f"Plot created at {file_path}{filename}.pdf")
+    Attaches a worker process of a parallel concentration sweep to the shared atoms,
+    reciprocal lattice vectors and intensity data, and stores these together with the
+    parameters of the sweep in `_SWEEP_WORKER_STATE`. The shared memory blocks are
+    closed by `_close_sweep_worker` when the worker process exits.
+    """
+    _SWEEP_WORKER_STATE.clear()
+    _SWEEP_WORKER_STATE["shared_memory"] = []
+    util.Finalize(None, _close_sweep_worker, exitpriority=0)
+
+    for key, description in shared_arrays.items():
+        shm, array = _attach_shared_array(description)
+        _SWEEP_WORKER_STATE["shared_memory"].append(shm)
+        _SWEEP_WORKER_STATE[key] = array
+
+    _SWEEP_WORKER_STATE.update(parameters)
+
+    # Rebuild the pure super cell around the shared atoms.
+    unit_cell = parameters["unit_cell"]
+    _SWEEP_WORKER_STATE["pure_super_cell"] = SuperCell(
+        unit_cell.material,
+        parameters["super_cell_lattice_constants"],
+        _SWEEP_WORKER_STATE["atoms"],
+        unit_cell=unit_cell,
+        side_lengths=parameters["side_lengths"],
+    )
 
 
-def plot_disordered_diffraction_pattern_3d(
+def _close_sweep_worker():
+    """
+    Close sweep worker
+    ==================
+
+    Removes the arrays in `_SWEEP_WORKER_STATE`, and closes the shared memory blocks
+    attached by `_initialise_sweep_worker`. The shared memory is unlinked by the parent
+    process.
+    """
+    shared_memory_blocks = _SWEEP_WORKER_STATE.pop("shared_memory", [])
+    _SWEEP_WORKER_STATE.clear()
+
+    for shm in shared_memory_blocks:
+        shm.close()
+
+
+def _calculate_sweep_row(task: tuple[int, float, np.random.Generator]):
+    """
+    Calculate sweep row
+    ===================
+
+    Calculates the diffraction pattern of a single concentration of a parallel
+    concentration sweep in a worker process, and writes the intensities into the
+    corresponding row of the shared intensity data.
+    """
+    row, concentration, rng = task
+    state = _SWEEP_WORKER_STATE
+
+    # Generate a disordered super cell.
+    disordered_super_cell = SuperCell.apply_disorder(
+        state["pure_super_cell"],
+        state["target_atomic_number"],
+        state["substitute_atomic_number"],
+        concentration,
+        state["lattice_constants_no_substitution"],
+        state["lattice_constants_full_substitution"],
+        f"conc={concentration}",
+        rng,
+    )
+
+    # Get the reciprocal lattice vectors in range for the current lattice constants.
+    reciprocal_lattice_vectors, _ = _rescale_reciprocal_lattice_vectors(
+        state["reciprocal_lattice_vectors"],
+        disordered_super_cell.lattice_constants,
+        state["min_magnitude"],
+        state["max_magnitude"],
+    )
+
+    structure_factors = _calculate_structure_factors(
+        disordered_super_cell,
+        state["form_factors"],
+        reciprocal_lattice_vectors,
+        state["memory_budget"],
+    )
+
+    state["intensity_data"][row] = _calculate_pattern_from_structure_factors(
+        reciprocal_lattice_vectors,
+        structure_factors,
+        state["wavelength"],
+        state["deflection_angles"],
+        state["peak_width"],
+        state["intensity_cutoff"],
+        state["pattern_mode"],
+    )
+
+
+def _get_parallel_disordered_diffraction_patterns(
+    pure_super_cell: SuperCell,
+    target_atomic_number: int,
+    substitute_atomic_number: int,
+    concentrations: list[float],
+    lattice_constants_no_substitution: np.ndarray,
+    lattice_constants_full_substitution: np.ndarray,
+    form_factors: Mapping[int, FormFactorProtocol],
+    wavelength: float,
+    deflection_angles: np.ndarray,
+    peak_width: float,
+    intensity_cutoff: float,
+    memory_budget: int | None,
+    pattern_mode: str,
+    rngs: list[np.random.Generator],
+    num_processes: int,
+) -> np.ndarray:
+    """
+    Get parallel disordered diffraction patterns
+    ============================================
+
+    Calculates the diffraction pattern of a disordered alloy for a range of
+    concentrations of substitute atoms using a pool of worker processes, where the atoms
+    at each concentration are substituted independently using the corresponding
+    generator in `rngs`. Returns a 2D array with the intensity at each deflection angle
+    (columns) for each concentration (rows).
+
+    The atoms of the pure super cell, a single table of reciprocal lattice vectors for
+    every concentration (see `_get_sweep_reciprocal_lattice_vectors`) and the intensity
+    data are placed in shared memory once, so only the concentration and random number
+    generator of each row are sent to the workers, and each worker writes its rows
+    directly into the shared intensity data. The pool is closed and joined, rather than
+    terminated, so that every worker closes its shared memory blocks before they are
+    unlinked.
+    """
+    # Calculate the lattice constants for each concentration, and a table of reciprocal
+    # lattice vectors for every concentration.
+    _, lattice_constants = _get_sweep_lattice_constants(
+        pure_super_cell,
+        target_atomic_number,
+        concentrations,
+        lattice_constants_no_substitution,
+        lattice_constants_full_substitution,
+    )
+    reciprocal_lattice_vectors, min_magnitude, max_magnitude = (
+        _get_sweep_reciprocal_lattice_vectors(
+            lattice_constants, deflection_angles, wavelength, pattern_mode, peak_width
+        )
+    )
+
+    parameters = {
+        "unit_cell": pure_super_cell.unit_cell,
+        "super_cell_lattice_constants": pure_super_cell.lattice_constants,
+        "side_lengths": pure_super_cell.side_lengths,
+        "target_atomic_number": target_atomic_number,
+        "substitute_atomic_number": substitute_atomic_number,
+        "lattice_constants_no_substitution": lattice_constants_no_substitution,
+        "lattice_constants_full_substitution": lattice_constants_full_substitution,
+        "form_factors": form_factors,
+        "wavelength": wavelength,
+        "deflection_angles": deflection_angles,
+        "peak_width": peak_width,
+        "intensity_cutoff": intensity_cutoff,
+        "memory_budget": memory_budget,
+        "pattern_mode": pattern_mode,
+        "min_magnitude": min_magnitude,
+        "max_magnitude": max_magnitude,
+    }
+
+    shared_memory_blocks = []
+    try:
+        # Place the atoms, the reciprocal lattice vectors and the intensity data in
+        # shared memory.
+        shared_arrays = {}
+        for key, array in [
+            ("atoms", pure_super_cell.atoms),
+            ("reciprocal_lattice_vectors", reciprocal_lattice_vectors),
+            ("intensity_data", np.zeros((len(concentrations), len(deflection_angles)))),
+        ]:
+            shm, shared_arrays[key] = _create_shared_array(array)
+            shared_memory_blocks.append(shm)
+
+        tasks = [
+            (i, concentration, rngs[i])
+            for i, concentration in enumerate(concentrations)
+        ]
+
+        with Pool(
+            num_processes,
+            initializer=_initialise_sweep_worker,
+            initargs=(shared_arrays, parameters),
+        ) as pool:
+            pool.map(_calculate_sweep_row, tasks, chunksize=1)
+            pool.close()
+            pool.join()
+
+        # Copy the intensity data out of the shared memory block created above.
+        _, shape, dtype = shared_arrays["intensity_data"]
+        intensity_data = np.ndarray(
+            shape, dtype=dtype, buffer=shared_memory_blocks[-1].buf
+        ).copy()
+    finally:
+        for shm in shared_memory_blocks:
+            shm.close()
+            shm.unlink()
+
+    return intensity_data
+
+
+def get_disordered_diffraction_patterns(
     unit_cell_no_substitution: UnitCell,
     unit_cell_full_substitution: UnitCell,
     target_atomic_number: int,
     substitute_atomic_number: int,
     concentrations: list[float],
     super_cell_side_lengths: tuple[int, int, int],
-    alloy_name: str,
     diffraction_type: str,
     neutron_form_factors: Mapping[int, NeutronFormFactor],
     x_ray_form_factors: Mapping[int, XRayFormFactor],
@@ -792,20 +2809,91 @@ def plot_disordered_diffraction_pattern_3d(
     max_deflection_angle: float = 170,
     intensity_cutoff: float = 1e-6,
     peak_width: float = 0.1,
-    line_width: float = 1.0,
-    z_axis_min: float = 0,
-    z_axis_max: float = 1,
-    filename: str = "results/disordered_alloy_3D_plot.html",
-):
+    memory_budget: int | None = None,
+    pattern_mode: str = "dense",
+    phase_cache: PhaseCache | None = None,
+    nested_substitutions: bool = False,
+    rng: np.random.Generator | int | None = None,
+    num_processes: int | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
     """
-    Plot disordered diffraction pattern 3D
-    ======================================
+    Get disordered diffraction patterns
+    ===================================
+
+    Calculates the diffraction pattern of a disordered alloy for a range of
+    concentrations of substitute atoms. For each concentration, atoms in a super cell of
+    the unsubstituted crystal are randomly substituted, and the diffraction pattern of
+    the disordered super cell is calculated.
+
+    By default, the atoms are substituted independently for each concentration (see
+    `SuperCell.apply_disorder`). If `nested_substitutions` is True, a single random
+    ordering of the target atoms is used for the whole sweep instead, so the substituted
+    atoms at each concentration are a superset of the substituted atoms at every lower
+    concentration. Each concentration then only needs the phases of the newly
+    substituted atoms (see `_get_nested_disordered_diffraction_patterns`), but the
+    diffraction patterns of neighbouring concentrations are correlated.
+
+    In both cases, the atomic positions of the disordered super cells are the same for
+    every concentration; only the lattice constants and the species of the atoms
+    change. The structure factors of each disordered super cell are therefore
+    calculated from the (analytic) structure factors of the pure super cell, by only
+    summing over the substituted atoms.
 
-    TODO: add documentation.
+    Parameters
+    ----------
+    unit_cell_no_substitution, unit_cell_full_substitution : UnitCell
+        The unit cells of the crystal with 0% and 100% substitution respectively.
+    target_atomic_number, substitute_atomic_number : int
+        The atomic numbers of the atoms to be replaced, and the atoms that replace them.
+    concentrations : list[float]
+        The concentrations of substitute atoms, between 0 and 1.
+    super_cell_side_lengths : tuple[int, int, int]
+        The side lengths of the super cell, in terms of the lattice constants of the
+        unit cell.
+    phase_cache : PhaseCache | None
+        A cache of phases, which is passed to `get_diffraction_pattern`. If None
+        (default), the phases are not cached. Only used if `nested_substitutions` is
+        False, and not supported if `num_processes` is specified, since the cache cannot
+        be shared between processes.
+    nested_substitutions : bool
+        Whether the substituted atoms at each concentration should be a superset of the
+        substituted atoms at every lower concentration. The default value is False.
+    rng : np.random.Generator | int | None
+        The random number generator, or seed, used to choose the substituted atoms. If
+        `nested_substitutions` is False, an independent child generator is spawned for
+        each concentration (see `utils.spawn_random_number_generators`), so the
+        diffraction pattern of each concentration does not depend on the others. If
+        None (default), the generator is seeded with fresh entropy.
+    num_processes : int | None
+        The number of worker processes used to calculate the diffraction patterns of
+        the concentrations in parallel (see
+        `_get_parallel_disordered_diffraction_patterns`). Only supported if
+        `nested_substitutions` is False, since each nested concentration builds on the
+        previous one, and if `phase_cache` is None. Each concentration uses the same
+        child generator as the serial calculation, so the intensity data does not
+        depend on `num_processes`. If None (default), the diffraction patterns are
+        calculated in the current process.
+
+    The remaining parameters are passed to `get_diffraction_pattern`.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        The deflection angles, and a 2D array with the intensity at each deflection
+        angle (columns) for each concentration (rows).
     """
     # Error handling
     if max(concentrations) > 1 or min(concentrations) < 0:
         raise ValueError("Concentration must be between 0 and 1.")
+    if num_processes is not None:
+        if nested_substitutions:
+            raise ValueError(
+                "Parallel calculation requires nested_substitutions to be False."
+            )
+        if phase_cache is not None:
+            raise ValueError("Parallel calculation does not support a phase_cache.")
+        if num_processes < 1:
+            raise ValueError("num_processes must be at least 1.")
 
     # Generate a pure super cell.
     pure_super_cell = SuperCell.new_super_cell(
@@ -814,23 +2902,80 @@ def plot_disordered_diffraction_pattern_3d(
         unit_cell_no_substitution.material,
     )
 
-    # Sort the concentrations from smallest to largest, so that the plot looks sensible.
-    concentrations.sort()
+    # Generate an array of deflection angles using the same method as
+    # get_diffraction_pattern().
+    deflection_angles = _get_deflection_angle_grid(
+        min_deflection_angle, max_deflection_angle, peak_width
+    )
 
-    # Calculate the number of deflection angles using the same method as
-    # diffraction.get_diffraction_pattern().
-    num_deflection_angles = np.round(
-        10 * (max_deflection_angle - min_deflection_angle) / peak_width
-    ).astype(int)
+    # Select the form factors for the diffraction type.
+    if diffraction_type == "ND":
+        form_factors = neutron_form_factors
+    elif diffraction_type == "XRD":
+        form_factors = x_ray_form_factors
+    else:
+        raise ValueError("Invalid diffraction type.")
 
-    # Generate an array of deflection angles.
-    deflection_angles = np.linspace(
-        min_deflection_angle, max_deflection_angle, num_deflection_angles
-    )
+    # Store the form factors in a table, so that every species is evaluated at once.
+    form_factors = _get_form_factor_table(form_factors)
+
+    if nested_substitutions:
+        try:
+            intensity_data = _get_nested_disordered_diffraction_patterns(
+                pure_super_cell,
+                target_atomic_number,
+                substitute_atomic_number,
+                concentrations,
+                unit_cell_no_substitution.lattice_constants,
+                unit_cell_full_substitution.lattice_constants,
+                form_factors,
+                wavelength,
+                deflection_angles,
+                peak_width,
+                intensity_cutoff,
+                memory_budget,
+                pattern_mode,
+                rng,
+            )
+        except Exception as exc:
+            raise ValueError(
+                f"Error calculating nested diffraction patterns: {exc}"
+            ) from exc
+
+        return deflection_angles, intensity_data
+
+    # Spawn an independent random number generator for each concentration.
+    rngs = utils.spawn_random_number_generators(rng, len(concentrations))
+
+    if num_processes is not None:
+        try:
+            intensity_data = _get_parallel_disordered_diffraction_patterns(
+                pure_super_cell,
+                target_atomic_number,
+                substitute_atomic_number,
+                concentrations,
+                unit_cell_no_substitution.lattice_constants,
+                unit_cell_full_substitution.lattice_constants,
+                form_factors,
+                wavelength,
+                deflection_angles,
+                peak_width,
+                intensity_cutoff,
+                memory_budget,
+                pattern_mode,
+                rngs,
+                num_processes,
+            )
+        except Exception as exc:
+            raise ValueError(
+                f"Error calculating parallel diffraction patterns: {exc}"
+            ) from exc
+
+        return deflection_angles, intensity_data
 
     # Initialise an array which stores the intensity data.
     intensity_data = np.zeros(
-        (len(concentrations), num_deflection_angles),
+        (len(concentrations), len(deflection_angles)),
     )
 
     for i, conc in enumerate(concentrations):
@@ -846,6 +2991,7 @@ def plot_disordered_diffraction_pattern_3d(
             unit_cell_no_substitution.lattice_constants,
             unit_cell_full_substitution.lattice_constants,
             alloy_name,
+            rngs[i],
         )
 
         # Get the diffraction pattern for the super cell.
@@ -859,11 +3005,339 @@ def plot_disordered_diffraction_pattern_3d(
             max_deflection_angle,
             peak_width,
             intensity_cutoff,
+            memory_budget,
+            pattern_mode=pattern_mode,
+            phase_cache=phase_cache,
         )
 
         intensity_data[i] = diffraction_pattern["intensities"]
 
-        print(f"Computed intensities for x = {conc}")
+    return deflection_angles, intensity_data
+
+
+def get_disorder_ensemble_diffraction_pattern(
+    unit_cell_no_substitution: UnitCell,
+    unit_cell_full_substitution: UnitCell,
+    target_atomic_number: int,
+    substitute_atomic_number: int,
+    concentration: float,
+    super_cell_side_lengths: tuple[int, int, int],
+    diffraction_type: str,
+    neutron_form_factors: Mapping[int, NeutronFormFactor],
+    x_ray_form_factors: Mapping[int, XRayFormFactor],
+    wavelength: float = 1,
+    min_deflection_angle: float = 10,
+    max_deflection_angle: float = 170,
+    peak_width: float = 0.1,
+    realisations_per_batch: int = 16,
+    max_realisations: int = 256,
+    target_standard_error: float | None = None,
+    memory_budget: int | None = None,
+    phase_cache: PhaseCache | None = None,
+    window_width: float = 5,
+    rng: np.random.Generator | int | None = None,
+) -> np.ndarray:
+    """
+    Get disorder ensemble diffraction pattern
+    =========================================
+
+    Calculates the mean and variance of the diffraction pattern of a disordered alloy
+    over many random realisations of the disorder, and returns a structured NumPy array
+    containing deflection angles, mean intensities and variances.
+
+    The realisations are generated in batches. Each batch is represented by an
+    occupancy matrix, with a row for each target atom of the pure super cell and a
+    column for each realisation, which is 1 if the target atom is substituted and 0
+    otherwise. The phase sums of the substituted atoms of every realisation in a batch
+    are calculated as a single matrix product of the phase matrix of the target atoms
+    with the occupancy matrix (see `_calculate_phase_sums`), and are added to the
+    (analytic) structure factors of the pure super cell.
+
+    Every realisation has the same number of substituted atoms, so every realisation
+    has the same lattice constants and reciprocal lattice vectors. The patterns of each
+    realisation are not normalized individually; the mean pattern is normalized so
+    that its largest intensity is 1, and the variances are scaled accordingly.
+
+    Parameters
+    ----------
+    unit_cell_no_substitution, unit_cell_full_substitution : UnitCell
+        The unit cells of the crystal with 0% and 100% substitution respectively.
+    target_atomic_number, substitute_atomic_number : int
+        The atomic numbers of the atoms to be replaced, and the atoms that replace them.
+    concentration : float
+        The concentration of substitute atoms, between 0 and 1.
+    super_cell_side_lengths : tuple[int, int, int]
+        The side lengths of the super cell, in terms of the lattice constants of the
+        unit cell.
+    realisations_per_batch : int
+        The number of realisations of the disorder in each batch. The default value is
+        16.
+    max_realisations : int
+        The maximum number of realisations of the disorder. The default value is 256.
+    target_standard_error : float | None
+        If specified, no more batches are generated once the largest standard error of
+        the mean pattern is smaller than `target_standard_error` multiplied by the
+        largest mean intensity. If None (default), `max_realisations` realisations are
+        generated.
+    memory_budget : int | None
+        The approximate maximum number of bytes used by intermediate arrays when
+        calculating phases.
+    phase_cache : PhaseCache | None
+        A cache of phases. If specified, the phases of the target atoms are only
+        calculated for the first batch, provided that they fit in the cache. If None
+        (default), the phases are recalculated for each batch.
+    window_width : float
+        The half-width of the window used to evaluate each peak, in units of
+        `peak_width` (see `_render_peaks_windowed`).
+    rng : np.random.Generator | int | None
+        The random number generator, or seed, used to choose the substituted atoms. If
+        None (default), the generator is seeded with fresh entropy.
+
+    The remaining parameters have the same meaning as in `get_diffraction_pattern`.
+
+    Returns
+    -------
+    np.ndarray
+        A structured NumPy array that contains the diffraction pattern data. The array
+        has the following fields:
+            - 'deflection_angles': A list of all sampled deflection angles.
+            - 'intensities': The mean intensity at each deflection angle.
+            - 'variances': The variance of the intensity at each deflection angle over
+            the realisations.
+            - 'standard_errors': The standard error of the mean intensity at each
+            deflection angle.
+    """
+    # Error handling.
+    if concentration < 0 or concentration > 1:
+        raise ValueError("concentration must be between 0 and 1")
+    if realisations_per_batch <= 0 or max_realisations <= 0:
+        raise ValueError(
+            "realisations_per_batch and max_realisations must be greater than 0."
+        )
+
+    # Select the form factors for the diffraction type.
+    if diffraction_type == "ND":
+        form_factors = neutron_form_factors
+    elif diffraction_type == "XRD":
+        form_factors = x_ray_form_factors
+    else:
+        raise ValueError("Invalid diffraction type.")
+
+    # Store the form factors in a table, so that every species is evaluated at once.
+    form_factors = _get_form_factor_table(form_factors)
+
+    # Generate a pure super cell, and find the positions of the target atoms.
+    pure_super_cell = SuperCell.new_super_cell(
+        unit_cell_no_substitution,
+        super_cell_side_lengths,
+        unit_cell_no_substitution.material,
+    )
+    atoms = pure_super_cell.atoms
+    target_positions = atoms["positions"][
+        atoms["atomic_numbers"] == target_atomic_number
+    ]
+    num_target_atoms = len(target_positions)
+
+    if num_target_atoms == 0:
+        raise ValueError("The super cell does not contain any target atoms.")
+
+    # Calculate the number of substitute atoms, and the lattice constants.
+    num_substitute_atoms = int(np.ceil(concentration * num_target_atoms))
+    lattice_constants = SuperCell.interpolate_lattice_constants(
+        pure_super_cell.lattice_constants,
+        num_substitute_atoms / num_target_atoms,
+        unit_cell_no_substitution.lattice_constants,
+        unit_cell_full_substitution.lattice_constants,
+    )
+
+    # Generate an array of all reciprocal lattice vectors with valid magnitudes.
+    reciprocal_lattice_vectors = _get_reciprocal_lattice_vectors(
+        lattice_constants, wavelength, min_deflection_angle, max_deflection_angle
+    )
+    miller_indices = reciprocal_lattice_vectors["miller_indices"]
+    magnitudes = reciprocal_lattice_vectors["magnitudes"]
+
+    # The structure factors of every realisation are the structure factors of the pure
+    # super cell, plus the change in form factor multiplied by the phase sums of the
+    # substituted atoms.
+    pure_structure_factors = _calculate_structure_factors(
+        pure_super_cell, form_factors, reciprocal_lattice_vectors, memory_budget
+    )
+    substitute_form_factors, target_form_factors = _evaluate_form_factors(
+        form_factors, [substitute_atomic_number, target_atomic_number], magnitudes
+    )
+    form_factor_differences = substitute_form_factors - target_form_factors
+
+    # Group the reciprocal lattice vectors into peaks with the same shell key.
+    _, shell_starts, shell_indices = np.unique(
+        reciprocal_lattice_vectors["shell_keys"],
+        return_index=True,
+        return_inverse=True,
+    )
+    peak_angles = ReciprocalSpace.deflection_angles_from_rlv_magnitudes(
+        magnitudes[shell_starts], wavelength
+    )
+
+    # Get x coordinates of plotted points.
+    x_values = _get_deflection_angle_grid(
+        min_deflection_angle, max_deflection_angle, peak_width
+    )
+
+    rng = utils.get_random_number_generator(rng)
+
+    # Initialise the running mean and sum of squared deviations of the patterns.
+    num_realisations = 0
+    mean = np.zeros_like(x_values)
+    sum_of_squares = np.zeros_like(x_values)
+
+    while num_realisations < max_realisations:
+        batch_size = min(realisations_per_batch, max_realisations - num_realisations)
+
+        # Choose the substituted atoms of each realisation.
+        substituted_atoms = rng.permuted(
+            np.tile(np.arange(num_target_atoms), (batch_size, 1)), axis=1
+        )[:, :num_substitute_atoms]
+        occupancy = np.zeros((num_target_atoms, batch_size))
+        occupancy[substituted_atoms, np.arange(batch_size)[:, np.newaxis]] = 1
+
+        # Calculate the phase sums of the substituted atoms of every realisation.
+        if phase_cache is not None and phase_cache.fits(
+            len(miller_indices), num_target_atoms
+        ):
+            phase_sums = phase_cache.get_phase_sums(
+                miller_indices, target_positions, occupancy, memory_budget
+            )
+        else:
+            phase_sums = _calculate_phase_sums(
+                miller_indices, target_positions, memory_budget, occupancy
+            )
+
+        structure_factors = (
+            pure_structure_factors[:, np.newaxis]
+            + form_factor_differences[:, np.newaxis] * phase_sums
+        )
+
+        # Sum the intensities of the reciprocal lattice vectors in each peak.
+        peak_intensities = np.zeros((len(shell_starts), batch_size))
+        np.add.at(peak_intensities, shell_indices, np.abs(structure_factors) ** 2)
+
+        patterns = _render_peak_intensities(
+            x_values, peak_angles, peak_intensities, peak_width, window_width
+        )
+
+        # Combine the mean and sum of squared deviations of the batch with the running
+        # values.
+        batch_mean = np.mean(patterns, axis=1)
+        batch_sum_of_squares = np.sum(
+            (patterns - batch_mean[:, np.newaxis]) ** 2, axis=1
+        )
+        delta = batch_mean - mean
+        total = num_realisations + batch_size
+        mean += delta * batch_size / total
+        sum_of_squares += (
+            batch_sum_of_squares + delta**2 * num_realisations * batch_size / total
+        )
+        num_realisations = total
+
+        # Stop once the standard error is small enough.
+        if target_standard_error is not None and num_realisations > 1:
+            standard_errors = np.sqrt(
+                sum_of_squares / (num_realisations - 1) / num_realisations
+            )
+            if standard_errors.max() <= target_standard_error * mean.max():
+                break
+
+    # Calculate the variances and standard errors.
+    if num_realisations > 1:
+        variances = sum_of_squares / (num_realisations - 1)
+    else:
+        variances = np.zeros_like(mean)
+    standard_errors = np.sqrt(variances / num_realisations)
+
+    # Normalize the mean intensities.
+    max_intensity = mean.max(initial=0)
+    if max_intensity == 0:
+        max_intensity = 1
+
+    # Define a custom datatype to represent the diffraction data.
+    dtype = np.dtype(
+        [
+            ("deflection_angles", "f8"),
+            ("intensities", "f8"),
+            ("variances", "f8"),
+            ("standard_errors", "f8"),
+        ]
+    )
+
+    # Create a structured NumPy array to store the diffraction pattern.
+    diffraction_pattern = np.empty(x_values.shape[0], dtype=dtype)
+    diffraction_pattern["deflection_angles"] = x_values
+    diffraction_pattern["intensities"] = mean / max_intensity
+    diffraction_pattern["variances"] = variances / max_intensity**2
+    diffraction_pattern["standard_errors"] = standard_errors / max_intensity
+
+    return diffraction_pattern
+
+
+def plot_disordered_diffraction_pattern_3d(
+    unit_cell_no_substitution: UnitCell,
+    unit_cell_full_substitution: UnitCell,
+    target_atomic_number: int,
+    substitute_atomic_number: int,
+    concentrations: list[float],
+    super_cell_side_lengths: tuple[int, int, int],
+    alloy_name: str,
+    diffraction_type: str,
+    neutron_form_factors: Mapping[int, NeutronFormFactor],
+    x_ray_form_factors: Mapping[int, XRayFormFactor],
+    wavelength: float = 1,
+    min_deflection_angle: float = 10,
+    max_deflection_angle: float = 170,
+    intensity_cutoff: float = 1e-6,
+    peak_width: float = 0.1,
+    line_width: float = 1.0,
+    z_axis_min: float = 0,
+    z_axis_max: float = 1,
+    filename: str = "results/disordered_alloy_3D_plot.html",
+    memory_budget: int | None = None,
+    nested_substitutions: bool = False,
+    rng: np.random.Generator | int | None = None,
+    num_processes: int | None = None,
+):
+    """
+    Plot disordered diffraction pattern 3D
+    ======================================
+
+    TODO: add documentation.
+
+    The diffraction patterns are calculated by `get_disordered_diffraction_patterns`.
+    If `nested_substitutions` is True, the substituted atoms at each concentration are
+    a superset of the substituted atoms at every lower concentration, so the plotted
+    curves are correlated between neighbouring concentrations.
+    """
+    # Sort the concentrations from smallest to largest, so that the plot looks sensible.
+    concentrations.sort()
+
+    deflection_angles, intensity_data = get_disordered_diffraction_patterns(
+        unit_cell_no_substitution,
+        unit_cell_full_substitution,
+        target_atomic_number,
+        substitute_atomic_number,
+        concentrations,
+        super_cell_side_lengths,
+        diffraction_type,
+        neutron_form_factors,
+        x_ray_form_factors,
+        wavelength,
+        min_deflection_angle,
+        max_deflection_angle,
+        intensity_cutoff,
+        peak_width,
+        memory_budget,
+        nested_substitutions=nested_substitutions,
+        rng=rng,
+        num_processes=num_processes,
+    )
 
     # Create the figure.
     fig = go.Figure()
@@ -0,0 +1,742 @@
+"""
+Diffraction Monte Carlo
+=======================
+
+This module contains a Monte Carlo method for calculating the powder diffraction
+pattern of a finite crystal. Rather than enumerating reciprocal lattice vectors, random
+pairs of incident and scattered wave vectors are drawn, and the intensity scattered by
+the finite crystal is evaluated for each scattering vector and accumulated into a
+histogram of deflection angles.
+
+Classes
+-------
+    - NeutronDiffractionMonteCarlo: calculates neutron diffraction patterns of finite
+    crystals using Monte Carlo sampling of scattering vectors.
+"""
+
+from dataclasses import dataclass
+from functools import partial
+from multiprocessing import Pool
+from typing import Mapping
+import numpy as np
+
+from B8_project import utils
+from B8_project.crystal import UnitCell, ReciprocalSpace
+from B8_project.file_reading import read_neutron_scattering_lengths
+from B8_project.form_factor import (
+    FormFactorTable,
+    NeutronFormFactor,
+    evaluate_form_factor_matrix,
+    get_constant_form_factors,
+)
+
+
+# Fraction of trials drawn uniformly (as in the "random" sampler) when importance
+# sampling near reciprocal lattice vectors. This keeps the proposal density non-zero
+# for every scattering vector, so the weighted intensities remain unbiased.
+_UNIFORM_PROPOSAL_FRACTION = 0.1
+
+# Offsets of the 27 reciprocal lattice points nearest to a scattering vector.
+_NEIGHBOUR_OFFSETS = np.stack(
+    np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1], indexing="ij"), axis=-1
+).reshape(-1, 3)
+
+# Offset added to each Miller index, and number of bits used to store it, when a set of
+# Miller indices is encoded as a single integer key (see `_encode_miller_indices`).
+_MILLER_INDEX_OFFSET = 2**20
+_MILLER_INDEX_BITS = 21
+
+
+def _encode_miller_indices(miller_indices: np.ndarray) -> np.ndarray:
+    """
+    Encode Miller indices
+    =====================
+
+    Encodes each set of Miller indices (h, k, l) as a single 64 bit integer key, using
+    the same scheme as `diffraction.PhaseCache`.
+    """
+    shifted = np.asarray(miller_indices, dtype=np.int64) + _MILLER_INDEX_OFFSET
+
+    return (
+        (shifted[:, 0] << (2 * _MILLER_INDEX_BITS))
+        | (shifted[:, 1] << _MILLER_INDEX_BITS)
+        | shifted[:, 2]
+    )
+
+
+@dataclass
+class _BraggProposal:
+    """
+    Bragg proposal
+    ==============
+
+    A proposal distribution for importance sampling scattering vectors near the
+    reciprocal lattice vectors of a crystal (see
+    `NeutronDiffractionMonteCarlo._get_bragg_proposal`).
+
+    Attributes
+    ----------
+    reciprocal_lattice_vectors : np.ndarray
+        The components of the reciprocal lattice vectors which can be sampled, as an
+        array of shape (n, 3).
+    keys : np.ndarray
+        The encoded Miller indices of each reciprocal lattice vector (see
+        `_encode_miller_indices`). The reciprocal lattice vectors are sorted by key, so
+        a reciprocal lattice vector can be looked up with `np.searchsorted`.
+    probabilities : np.ndarray
+        The probability of sampling near each reciprocal lattice vector.
+    widths : np.ndarray
+        The standard deviation of the Gaussian around each reciprocal lattice vector,
+        along each axis.
+    """
+
+    reciprocal_lattice_vectors: np.ndarray
+    keys: np.ndarray
+    probabilities: np.ndarray
+    widths: np.ndarray
+
+
+@dataclass
+class NeutronDiffractionMonteCarlo:
+    """
+    Neutron diffraction Monte Carlo
+    ===============================
+
+    A class to calculate the neutron powder diffraction pattern of a finite crystal
+    using Monte Carlo sampling.
+
+    For each trial, the directions of the incident and scattered neutrons are drawn
+    uniformly from the unit sphere using `utils.random_uniform_unit_vectors`. The
+    scattering vector Q = k' - k then determines both the deflection angle and the
+    scattered intensity, which is |F(Q)|^2 multiplied by the interference function of a
+    finite crystal of N1 * N2 * N3 unit cells. Since the scattering vectors do not have
+    to be reciprocal lattice vectors, this gives a pattern with finite-size broadening,
+    and the cost scales with the number of trials rather than the number of reciprocal
+    lattice vectors.
+
+    Attributes
+    ----------
+    unit_cell : UnitCell
+        The unit cell of the crystal.
+    wavelength : float
+        The wavelength of the neutrons, in the same units as the lattice constants of
+        `unit_cell`.
+    neutron_form_factors : Mapping[int, NeutronFormFactor] | None
+        A `Mapping` mapping atomic numbers to neutron form factors. If None (default),
+        the neutron scattering lengths are read from
+        `"data/neutron_scattering_lengths.csv"`. A `Mapping` of `NeutronFormFactor`
+        instances is stored as a `FormFactorTable`, so that every atom is evaluated at
+        once; any other `Mapping` (e.g. of interpolated form factors) is used unchanged.
+
+    Methods
+    -------
+    _calculate_structure_factors
+        Calculates the structure factor of the unit cell for a range of scattering
+        vectors.
+    _calculate_interference
+        Calculates the interference function of a finite crystal for a range of
+        scattering vectors.
+    _draw_scattering_vectors
+        Draws a batch of trials, and returns the deflection angle and scattering vector
+        of each trial.
+    _calculate_trial_intensities
+        Draws a batch of trials, and returns the deflection angle and scattered
+        intensity of each trial.
+    _calculate_batch_histogram
+        Draws a batch of trials, and returns the number of accepted trials and their
+        histogram.
+    calculate_diffraction_pattern
+        Calculates a histogram of the scattered intensity against deflection angle.
+    """
+
+    unit_cell: UnitCell
+    wavelength: float
+    neutron_form_factors: Mapping[int, NeutronFormFactor] | None = None
+
+    def __post_init__(self):
+        if self.wavelength <= 0:
+            raise ValueError("wavelength must be greater than 0.")
+
+        if self.neutron_form_factors is None:
+            self.neutron_form_factors = read_neutron_scattering_lengths()
+
+        # Store the form factors in a table, if they are all of the same tabulated type.
+        try:
+            self.neutron_form_factors = FormFactorTable.from_form_factors(
+                self.neutron_form_factors
+            )
+        except ValueError:
+            pass
+
+    def _calculate_structure_factors(
+        self, scattering_vectors: np.ndarray
+    ) -> np.ndarray:
+        """
+        Calculate structure factors
+        ===========================
+
+        Calculates the structure factor of the conventional unit cell for each of a
+        range of scattering vectors (given as an array of shape (n, 3)), which do not
+        have to be reciprocal lattice vectors. Constant form factors are applied as a
+        weight to the phase of each atom.
+        """
+        atoms = self.unit_cell.get_conventional_atoms()
+
+        # Calculate the phase of each atom for each scattering vector.
+        phases = np.exp(
+            1j
+            * np.dot(
+                scattering_vectors,
+                (atoms["positions"] * self.unit_cell.lattice_constants).T,
+            )
+        )
+
+        try:
+            # Sum the phases weighted by the form factor of each atom, if the form
+            # factors are constant.
+            constant_form_factors = get_constant_form_factors(
+                self.neutron_form_factors, atoms["atomic_numbers"]
+            )
+            if constant_form_factors is not None:
+                return phases @ constant_form_factors.astype(np.complex128)
+
+            # Otherwise, evaluate the form factor of each atom for each scattering
+            # vector.
+            magnitudes = np.linalg.norm(scattering_vectors, axis=1)
+            form_factors = evaluate_form_factor_matrix(
+                self.neutron_form_factors, atoms["atomic_numbers"], magnitudes
+            ).T
+        except KeyError as exc:
+            raise KeyError(f"Error reading form factor Mapping: {exc}") from exc
+
+        return np.sum(form_factors * phases, axis=1)
+
+    def _calculate_interference(
+        self,
+        scattering_vectors: np.ndarray,
+        unit_cells_in_crystal: tuple[int, int, int],
+    ) -> np.ndarray:
+        """
+        Calculate interference
+        ======================
+
+        Calculates the interference function of a finite crystal of N1 * N2 * N3 unit
+        cells for each of a range of scattering vectors, using the closed form
+        `utils.laue_interference` at the (non-integer) Miller indices Q a / 2π.
+        """
+        miller_indices = (
+            scattering_vectors * self.unit_cell.lattice_constants / (2 * np.pi)
+        )
+
+        return utils.laue_interference(miller_indices, unit_cells_in_crystal)
+
+    def _draw_scattering_vectors(
+        self,
+        num_trials: int,
+        rng: np.random.Generator | None = None,
+        direction_sampler: str = "random",
+        min_angle_deg: float = 0,
+        max_angle_deg: float = 180,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Draw scattering vectors
+        =======================
+
+        Draws `num_trials` trials, and returns the deflection angle (in degrees) and the
+        scattering vector of each trial. The trials are drawn from `rng`, or from the
+        global NumPy random state if `rng` is None (default).
+
+        If `direction_sampler` is "random" (default), the directions of the incident
+        and scattered neutrons are independent random unit vectors. If
+        `direction_sampler` is "fibonacci", the trials are drawn from a low-discrepancy
+        set instead: for independent uniform directions, the cosine of the deflection
+        angle is uniform on [-1, 1] and independent of the direction of the scattering
+        vector, so the directions of the scattering vectors are taken from a randomly
+        rotated Fibonacci lattice (see `utils.fibonacci_unit_vectors`), and the cosines
+        of the deflection angles from a randomly shifted additive recurrence. Since the
+        cosines are uniform, they are only drawn between the cosines of `max_angle_deg`
+        and `min_angle_deg`, so every trial has a deflection angle in range.
+        """
+        wave_number = 2 * np.pi / self.wavelength
+
+        if direction_sampler == "random":
+            # Draw the directions of the incident and scattered neutrons.
+            incident_directions = utils.random_uniform_unit_vectors(num_trials, 3, rng)
+            scattered_directions = utils.random_uniform_unit_vectors(num_trials, 3, rng)
+
+            # Calculate the deflection angles and the scattering vectors.
+            cos_angles = np.clip(
+                np.sum(incident_directions * scattered_directions, axis=1), -1, 1
+            )
+            deflection_angles = np.degrees(np.arccos(cos_angles))
+            scattering_vectors = wave_number * (
+                scattered_directions - incident_directions
+            )
+        elif direction_sampler == "fibonacci":
+            rng = utils.get_random_number_generator(rng)
+
+            # Draw the directions of the scattering vectors.
+            scattering_directions = utils.fibonacci_unit_vectors(num_trials, rng)
+
+            # Draw the cosines of the deflection angles. The step sqrt(2) - 1 is not a
+            # rational multiple of the golden ratio used by the Fibonacci lattice, so
+            # the deflection angles and the directions are not correlated.
+            min_cos_angle = np.cos(np.radians(max_angle_deg))
+            max_cos_angle = np.cos(np.radians(min_angle_deg))
+            cos_angles = min_cos_angle + (max_cos_angle - min_cos_angle) * np.mod(
+                rng.random() + (np.sqrt(2) - 1) * np.arange(num_trials), 1
+            )
+            deflection_angles = np.degrees(np.arccos(np.clip(cos_angles, -1, 1)))
+
+            # |Q| = 2k sin(θ), where 2θ is the deflection angle.
+            magnitudes = 2 * wave_number * np.sqrt((1 - cos_angles) / 2)
+            scattering_vectors = magnitudes[:, np.newaxis] * scattering_directions
+        else:
+            raise ValueError("Invalid direction sampler.")
+
+        return deflection_angles, scattering_vectors
+
+    def _calculate_bragg_weights(
+        self, reciprocal_lattice_vectors: np.ndarray
+    ) -> np.ndarray:
+        """
+        Calculate Bragg weights
+        =======================
+
+        Calculates the (unnormalised) weight of each of a range of reciprocal lattice
+        vectors in the Bragg proposal. The intensity scattered near a reciprocal lattice
+        vector G is proportional to |F(G)|^2, and the density of uniformly sampled
+        scattering vectors is proportional to 1 / |G|, so the weight is |F(G)|^2 / |G|.
+        """
+        magnitudes = np.linalg.norm(reciprocal_lattice_vectors, axis=1)
+
+        return (
+            np.abs(self._calculate_structure_factors(reciprocal_lattice_vectors)) ** 2
+            / magnitudes
+        )
+
+    def _get_bragg_proposal(
+        self,
+        min_angle_deg: float,
+        max_angle_deg: float,
+        unit_cells_in_crystal: tuple[int, int, int],
+    ) -> _BraggProposal:
+        """
+        Get Bragg proposal
+        ==================
+
+        Returns a proposal distribution for importance sampling scattering vectors near
+        the reciprocal lattice vectors with a deflection angle in range. The proposal
+        is a mixture of Gaussians around each reciprocal lattice vector G, with weights
+        given by `_calculate_bragg_weights`. The width of each Gaussian matches the
+        width sqrt(6) / (N a) of the main peak of the interference function of the
+        finite crystal, and is at most a quarter of the spacing of the reciprocal
+        lattice, so only the nearest reciprocal lattice vectors contribute to the
+        proposal density.
+        """
+        lattice_constants = self.unit_cell.lattice_constants
+        widths = np.minimum(
+            np.sqrt(6) / (np.array(unit_cells_in_crystal) * lattice_constants),
+            np.pi / (2 * lattice_constants),
+        )
+
+        # Find the reciprocal lattice vectors whose Gaussians overlap the range of
+        # deflection angles.
+        min_magnitude, max_magnitude = (
+            ReciprocalSpace.rlv_magnitudes_from_deflection_angles(
+                np.array([min_angle_deg, max_angle_deg]), self.wavelength
+            )
+        )
+        margin = 4 * widths.max()
+        min_magnitude = max(float(min_magnitude) - margin, 0)
+        max_magnitude = float(max_magnitude) + margin
+
+        reciprocal_lattice_vectors = ReciprocalSpace.get_reciprocal_lattice_vectors(
+            min_magnitude, max_magnitude, lattice_constants
+        )
+        reciprocal_lattice_vectors = reciprocal_lattice_vectors[
+            reciprocal_lattice_vectors["magnitudes"] > 0
+        ]
+
+        # Sort the reciprocal lattice vectors by their encoded Miller indices.
+        keys = _encode_miller_indices(reciprocal_lattice_vectors["miller_indices"])
+        order = np.argsort(keys)
+        keys = keys[order]
+        reciprocal_lattice_vectors = reciprocal_lattice_vectors["components"][order]
+
+        weights = self._calculate_bragg_weights(reciprocal_lattice_vectors)
+        total_weight = weights.sum()
+
+        # Error handling.
+        if not total_weight > 0:
+            raise ValueError("No reciprocal lattice vectors to sample near.")
+
+        return _BraggProposal(
+            reciprocal_lattice_vectors,
+            keys,
+            weights / total_weight,
+            widths,
+        )
+
+    def _calculate_bragg_densities(
+        self, scattering_vectors: np.ndarray, bragg_proposal: _BraggProposal
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Calculate Bragg densities
+        =========================
+
+        Calculates the density of the uniform distribution of scattering vectors (as
+        sampled by the "random" sampler), and the density of the Bragg proposal mixed
+        with the uniform distribution, for each of a range of scattering vectors.
+
+        For independent uniform incident and scattered directions, the cosine of the
+        deflection angle is uniform and the direction of Q is uniform, which gives a
+        density of 1 / (8π k^2 |Q|) for |Q| < 2k.
+
+        The probability of each neighbouring reciprocal lattice vector is looked up from
+        the probabilities already calculated for the proposal, by its encoded Miller
+        indices, so no structure factors are calculated here.
+        """
+        wave_number = 2 * np.pi / self.wavelength
+        lattice_constants = self.unit_cell.lattice_constants
+        magnitudes = np.linalg.norm(scattering_vectors, axis=1)
+
+        # Calculate the uniform density.
+        uniform_densities = np.zeros(len(scattering_vectors))
+        valid = (magnitudes > 0) & (magnitudes < 2 * wave_number)
+        uniform_densities[valid] = 1 / (8 * np.pi * wave_number**2 * magnitudes[valid])
+
+        # Sum the Gaussians of the reciprocal lattice vectors nearest to each
+        # scattering vector.
+        nearest_miller_indices = np.rint(
+            scattering_vectors * lattice_constants / (2 * np.pi)
+        ).astype(int)
+        bragg_densities = np.zeros(len(scattering_vectors))
+
+        for offset in _NEIGHBOUR_OFFSETS:
+            miller_indices = nearest_miller_indices + offset
+            components = (2 * np.pi * miller_indices) / lattice_constants
+
+            # Look up the probability of each reciprocal lattice vector. Reciprocal
+            # lattice vectors which are not in the proposal have a probability of 0.
+            keys = _encode_miller_indices(miller_indices)
+            indices = np.minimum(
+                np.searchsorted(bragg_proposal.keys, keys),
+                len(bragg_proposal.keys) - 1,
+            )
+            weights = np.where(
+                bragg_proposal.keys[indices] == keys,
+                bragg_proposal.probabilities[indices],
+                0,
+            )
+
+            gaussians = np.prod(
+                np.exp(
+                    -(((scattering_vectors - components) / bragg_proposal.widths) ** 2)
+                    / 2
+                )
+                / (np.sqrt(2 * np.pi) * bragg_proposal.widths),
+                axis=1,
+            )
+            bragg_densities += weights * gaussians
+
+        proposal_densities = (
+            1 - _UNIFORM_PROPOSAL_FRACTION
+        ) * bragg_densities + _UNIFORM_PROPOSAL_FRACTION * uniform_densities
+
+        return uniform_densities, proposal_densities
+
+    def _draw_bragg_scattering_vectors(
+        self,
+        num_trials: int,
+        bragg_proposal: _BraggProposal,
+        rng: np.random.Generator | None = None,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Draw Bragg scattering vectors
+        =============================
+
+        Draws `num_trials` scattering vectors from the Bragg proposal mixed with the
+        uniform distribution (see `_get_bragg_proposal`), and returns the deflection
+        angle (in degrees), the scattering vector and the importance weight of each
+        trial. The importance weight is the ratio of the uniform density to the
+        proposal density, so the weighted intensities have the same expected histogram
+        as the "random" sampler. Scattering vectors with |Q| > 2k cannot be reached, so
+        their deflection angle is NaN and their weight is 0.
+        """
+        rng = utils.get_random_number_generator(rng)
+        wave_number = 2 * np.pi / self.wavelength
+
+        # Choose which trials are drawn uniformly.
+        uniform = rng.random(num_trials) < _UNIFORM_PROPOSAL_FRACTION
+        num_uniform_trials = np.count_nonzero(uniform)
+        scattering_vectors = np.empty((num_trials, 3))
+
+        # Draw the uniform trials.
+        incident_directions = utils.random_uniform_unit_vectors(
+            num_uniform_trials, 3, rng
+        )
+        scattered_directions = utils.random_uniform_unit_vectors(
+            num_uniform_trials, 3, rng
+        )
+        scattering_vectors[uniform] = wave_number * (
+            scattered_directions - incident_directions
+        )
+
+        # Draw the remaining trials near the reciprocal lattice vectors.
+        indices = rng.choice(
+            len(bragg_proposal.probabilities),
+            size=num_trials - num_uniform_trials,
+            p=bragg_proposal.probabilities,
+        )
+        scattering_vectors[~uniform] = bragg_proposal.reciprocal_lattice_vectors[
+            indices
+        ] + bragg_proposal.widths * rng.normal(size=(len(indices), 3))
+
+        # Calculate the deflection angles and the importance weights.
+        sin_half_angles = np.linalg.norm(scattering_vectors, axis=1) / (2 * wave_number)
+        deflection_angles = np.full(num_trials, np.nan)
+        reachable = sin_half_angles <= 1
+        deflection_angles[reachable] = np.degrees(
+            2 * np.arcsin(sin_half_angles[reachable])
+        )
+
+        uniform_densities, proposal_densities = self._calculate_bragg_densities(
+            scattering_vectors, bragg_proposal
+        )
+        weights = np.divide(
+            uniform_densities,
+            proposal_densities,
+            out=np.zeros(num_trials),
+            where=proposal_densities > 0,
+        )
+
+        return deflection_angles, scattering_vectors, weights
+
+    def _calculate_trial_intensities(
+        self,
+        num_trials: int,
+        unit_cells_in_crystal: tuple[int, int, int],
+        rng: np.random.Generator | None = None,
+        direction_sampler: str = "random",
+        min_angle_deg: float = 0,
+        max_angle_deg: float = 180,
+        bragg_proposal: _BraggProposal | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Calculate trial intensities
+        ===========================
+
+        Draws `num_trials` trials (see `_draw_scattering_vectors`), and returns the
+        deflection angle (in degrees) and the intensity scattered by the finite crystal
+        for each trial. If `bragg_proposal` is specified, the trials are instead drawn
+        near the reciprocal lattice vectors (see `_draw_bragg_scattering_vectors`), and
+        each intensity is multiplied by its importance weight.
+        """
+        if bragg_proposal is None:
+            deflection_angles, scattering_vectors = self._draw_scattering_vectors(
+                num_trials, rng, direction_sampler, min_angle_deg, max_angle_deg
+            )
+            weights = 1
+        else:
+            deflection_angles, scattering_vectors, weights = (
+                self._draw_bragg_scattering_vectors(num_trials, bragg_proposal, rng)
+            )
+
+        intensities = (
+            np.abs(self._calculate_structure_factors(scattering_vectors)) ** 2
+            * self._calculate_interference(scattering_vectors, unit_cells_in_crystal)
+            * weights
+        )
+
+        return deflection_angles, intensities
+
+    def _calculate_batch_histogram(
+        self,
+        rng: np.random.Generator,
+        trials_per_batch: int,
+        unit_cells_in_crystal: tuple[int, int, int],
+        two_thetas: np.ndarray,
+        direction_sampler: str = "random",
+        bragg_proposal: _BraggProposal | None = None,
+    ) -> tuple[int, np.ndarray]:
+        """
+        Calculate batch histogram
+        =========================
+
+        Draws a batch of `trials_per_batch` trials from `rng`, and returns the number of
+        trials with a deflection angle between the first and last values of
+        `two_thetas`, and the histogram of their intensities (see
+        `calculate_diffraction_pattern`).
+        """
+        deflection_angles, trial_intensities = self._calculate_trial_intensities(
+            trials_per_batch,
+            unit_cells_in_crystal,
+            rng,
+            direction_sampler,
+            two_thetas[0],
+            two_thetas[-1],
+            bragg_proposal,
+        )
+
+        # Only accept trials with a deflection angle in range.
+        accepted = (deflection_angles >= two_thetas[0]) & (
+            deflection_angles <= two_thetas[-1]
+        )
+
+        # Add the intensity of each accepted trial to its bin.
+        bins = np.searchsorted(two_thetas, deflection_angles[accepted])
+        histogram = np.bincount(
+            bins, weights=trial_intensities[accepted], minlength=len(two_thetas)
+        )
+
+        return int(np.count_nonzero(accepted)), histogram
+
+    def calculate_diffraction_pattern(
+        self,
+        target_accepted_trials: int = 5000,
+        trials_per_batch: int = 1000,
+        unit_cells_in_crystal: tuple[int, int, int] = (8, 8, 8),
+        min_angle_deg: float = 0,
+        max_angle_deg: float = 180,
+        angle_bins: int = 100,
+        num_processes: int | None = None,
+        rng: np.random.Generator | int | None = None,
+        direction_sampler: str = "random",
+        importance_sampling: bool = False,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Calculate diffraction pattern
+        =============================
+
+        Calculates the neutron powder diffraction pattern of a finite crystal by Monte
+        Carlo sampling. Trials are drawn in vectorised batches of `trials_per_batch`,
+        until at least `target_accepted_trials` trials have a deflection angle between
+        `min_angle_deg` and `max_angle_deg`. The intensities of the accepted trials are
+        accumulated into a histogram, which is normalised so that the maximum intensity
+        is 1.
+
+        Each batch draws its trials from its own child generator, which is spawned from
+        `rng` in order (see `utils.spawn_random_number_generators`). If `num_processes`
+        is specified, rounds of `num_processes` batches are calculated in parallel by a
+        pool of worker processes, and each worker only holds a single batch in memory.
+        The histograms of the batches are always added in batch order, and batching
+        stops at the same batch regardless of the number of processes (any extra batches
+        in the final round are discarded), so the diffraction pattern for a given seed
+        does not depend on `num_processes`.
+
+        Parameters
+        ----------
+        target_accepted_trials : int
+            The minimum number of trials with a deflection angle in range.
+        trials_per_batch : int
+            The number of trials drawn at once. This bounds the memory used.
+        unit_cells_in_crystal : tuple[int, int, int]
+            The number of unit cells (N1, N2, N3) along each side of the crystal.
+        min_angle_deg, max_angle_deg : float
+            The range of deflection angles, in degrees.
+        angle_bins : int
+            The number of deflection angles in the histogram.
+        num_processes : int | None
+            The number of worker processes. If None (default), every batch is
+            calculated in the current process.
+        rng : np.random.Generator | int | None
+            The random number generator, or seed, from which the generator of each batch
+            is spawned. If None (default), the generator is seeded with fresh entropy,
+            so unlike `_draw_scattering_vectors`, the pattern does not depend on the
+            global NumPy random state set by `np.random.seed`.
+        direction_sampler : str
+            "random" (default) draws independent random directions. "fibonacci" draws
+            each batch from a randomly rotated low-discrepancy set, which gives less
+            noise for the same number of trials, and only draws deflection angles in
+            range (see `_draw_scattering_vectors`).
+        importance_sampling : bool
+            Whether to draw most trials near the reciprocal lattice vectors with a
+            deflection angle in range, and weight their intensities so that the
+            expected pattern is unchanged (see `_get_bragg_proposal`). Far fewer trials
+            are then needed for the same noise. Can only be used with the "random"
+            direction sampler. The default value is False.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            `angle_bins` evenly spaced deflection angles between `min_angle_deg` and
+            `max_angle_deg`, and the normalised intensity at each deflection angle. The
+            intensity at each deflection angle (other than the first) is the intensity
+            scattered at angles greater than the previous deflection angle, up to and
+            including the current one.
+        """
+        # Error handling.
+        if target_accepted_trials < 1 or trials_per_batch < 1:
+            raise ValueError(
+                "target_accepted_trials and trials_per_batch must be at least 1."
+            )
+        if not 0 <= min_angle_deg < max_angle_deg <= 180:
+            raise ValueError("Invalid deflection angle range.")
+        if angle_bins < 2:
+            raise ValueError("angle_bins must be at least 2.")
+        if min(unit_cells_in_crystal) < 1:
+            raise ValueError("unit_cells_in_crystal must only contain positive values.")
+        if num_processes is not None and num_processes < 1:
+            raise ValueError("num_processes must be at least 1.")
+        if direction_sampler not in ("random", "fibonacci"):
+            raise ValueError("Invalid direction sampler.")
+        if importance_sampling and direction_sampler != "random":
+            raise ValueError(
+                "Importance sampling requires the random direction sampler."
+            )
+
+        two_thetas = np.linspace(min_angle_deg, max_angle_deg, angle_bins)
+
+        bragg_proposal = None
+        if importance_sampling:
+            bragg_proposal = self._get_bragg_proposal(
+                min_angle_deg, max_angle_deg, unit_cells_in_crystal
+            )
+
+        # Create the parent generator once, so that each round spawns new children.
+        rng = utils.get_random_number_generator(rng)
+        calculate_batch_histogram = partial(
+            self._calculate_batch_histogram,
+            trials_per_batch=trials_per_batch,
+            unit_cells_in_crystal=unit_cells_in_crystal,
+            two_thetas=two_thetas,
+            direction_sampler=direction_sampler,
+            bragg_proposal=bragg_proposal,
+        )
+
+        intensities = np.zeros(angle_bins)
+        accepted_trials = 0
+
+        pool = None if num_processes is None else Pool(num_processes)
+        try:
+            while accepted_trials < target_accepted_trials:
+                # Calculate the histograms of the next round of batches.
+                if pool is None:
+                    batch_results = [
+                        calculate_batch_histogram(
+                            utils.spawn_random_number_generators(rng, 1)[0]
+                        )
+                    ]
+                else:
+                    batch_results = pool.map(
+                        calculate_batch_histogram,
+                        utils.spawn_random_number_generators(rng, num_processes),
+                    )
+
+                # Add the histograms in batch order, until enough trials are accepted.
+                for batch_accepted_trials, histogram in batch_results:
+                    if accepted_trials >= target_accepted_trials:
+                        break
+                    intensities += histogram
+                    accepted_trials += batch_accepted_trials
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+        # Normalise the intensities.
+        max_intensity = intensities.max()
+        if max_intensity > 0:
+            intensities /= max_intensity
+
+        return two_thetas, intensities
@@ -148,6 +148,21 @@ def read_lattice(
     return material, lattice_type, lattice_constants
 
 
+def _read_debye_waller_factors(df: pd.DataFrame) -> list[float]:
+    """
+    Read Debye-Waller factors
+    =========================
+
+    Reads the Debye-Waller factors from the "debye_waller_factor" column of a
+    DataFrame, and returns them as a list. If the column is not present, the
+    Debye-Waller factor of every row is 0.
+    """
+    if "debye_waller_factor" not in df.columns:
+        return [0.0] * len(df)
+
+    return df["debye_waller_factor"].astype(float).tolist()
+
+
 def read_neutron_scattering_lengths(
     filename: str = "data/neutron_scattering_lengths.csv",
 ) -> Mapping[int, NeutronFormFactor]:
@@ -168,6 +183,11 @@ def read_neutron_scattering_lengths(
         - atomic_number (int): The atomic number of the atom.
         - neutron_scattering_length (float): The neutron scattering length of the
         atom, in femtometers (fm).
+    The .csv file may also contain the following column:
+        - debye_waller_factor (float): The Debye-Waller factor B of the atom, in Å^2,
+        the same unit as the widths of the tabulated X-ray form factors, so the lattice
+        constants must be in Å. If the column is not present, the Debye-Waller factor
+        of every atom is 0.
 
     Parameters
     ----------
@@ -191,11 +211,17 @@ def read_neutron_scattering_lengths(
         # Read the atomic numbers.
         atomic_numbers = neutron_df["atomic_number"].astype(int).tolist()
 
+        # Read the Debye-Waller factors, if they are present.
+        debye_waller_factors = _read_debye_waller_factors(neutron_df)
+
         # Read the neutron scattering lengths, and store them as an instance of
         # NeutronFormFactor
         neutron_scattering_lengths = [
-            NeutronFormFactor(x)
-            for x in neutron_df["neutron_scattering_length"].astype(float).tolist()
+            NeutronFormFactor(x, debye_waller_factor)
+            for x, debye_waller_factor in zip(
+                neutron_df["neutron_scattering_length"].astype(float).tolist(),
+                debye_waller_factors,
+            )
         ]
 
         # Validate that atomic_numbers and neutron_scattering_lengths have the same
@@ -234,6 +260,11 @@ def read_xray_form_factors(
         - "a1", "b1", "a2", "b2", "a3", "b3", "a4", "b4", "c" (float): Parameters which
         specify the X-ray form factor of the atom. These correspond to the attributes
         of the `XRayFormFactor` class.
+    The .csv file may also contain the following column:
+        - "debye_waller_factor" (float): The Debye-Waller factor B of the atom, in Å^2,
+        the same unit as the widths of the tabulated X-ray form factors, so the lattice
+        constants must be in Å. If the column is not present, the Debye-Waller factor
+        of every atom is 0.
 
     Parameters
     ----------
@@ -268,10 +299,13 @@ def read_xray_form_factors(
         # Read the atomic numbers
         atomic_numbers = xray_df["atomic_number"].astype(int).tolist()
 
+        # Read the Debye-Waller factors, if they are present.
+        debye_waller_factors = _read_debye_waller_factors(xray_df)
+
         # Read the X-ray form factors
         xray_form_factors = [
-            XRayFormFactor(a1, b1, a2, b2, a3, b3, a4, b4, c)
-            for a1, b1, a2, b2, a3, b3, a4, b4, c in zip(
+            XRayFormFactor(a1, b1, a2, b2, a3, b3, a4, b4, c, debye_waller_factor)
+            for a1, b1, a2, b2, a3, b3, a4, b4, c, debye_waller_factor in zip(
                 xray_df["a1"].astype(float).tolist(),
                 xray_df["b1"].astype(float).tolist(),
                 xray_df["a2"].astype(float).tolist(),
@@ -281,6 +315,7 @@ def read_xray_form_factors(
                 xray_df["a4"].astype(float).tolist(),
                 xray_df["b4"].astype(float).tolist(),
                 xray_df["c"].astype(float).tolist(),
+                debye_waller_factors,
             )
         ]
 
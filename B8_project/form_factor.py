@@ -11,15 +11,44 @@ Classes
     represents a form factor.
     - NeutronFormFactor: A class to represent the neutron form factor of an atom.
     - XRayFormFactor: A class to represent the X-ray form factor of an atom.
+    - FormFactorTable: A `Mapping` which stores the form factors of many atoms in a
+    single array, and evaluates them together.
+    - InterpolatedFormFactor: A class which approximates another form factor by
+    interpolating between values sampled on a grid.
+
+Functions
+---------
+    - evaluate_form_factor_matrix: evaluates the form factors of a range of atoms for a
+    range of reciprocal lattice vectors.
+    - get_constant_form_factors: returns the form factors of a range of atoms as
+    scalars, if none of them depend on the reciprocal lattice vector.
+    - interpolate_form_factors: creates an `InterpolatedFormFactor` for every atom in a
+    `Mapping` of form factors.
 
 TODO: update this documentation.
 """
 
-from dataclasses import dataclass
+from collections.abc import Mapping
+from dataclasses import dataclass, field
 from typing import Protocol, runtime_checkable
 import numpy as np
 
 
+def _calculate_debye_waller_factors(
+    debye_waller_factor: float, reciprocal_lattice_vector_magnitudes: np.ndarray
+) -> np.ndarray:
+    """
+    Calculate Debye-Waller factors
+    ==============================
+
+    Calculates the Debye-Waller factor exp(-B |G|^2 / 16π^2) of an atom with
+    Debye-Waller factor B for a range of reciprocal lattice vectors.
+    """
+    return np.exp(
+        -debye_waller_factor * (reciprocal_lattice_vector_magnitudes / (4 * np.pi)) ** 2
+    )
+
+
 @runtime_checkable
 class FormFactorProtocol(Protocol):
     """
@@ -56,10 +85,16 @@ class NeutronFormFactor:
     are only interested in relative intensities, we do not make a distinction
     between the neutron form factor and the neutron scattering length of an atom.
 
+    Thermal vibrations of the atom are accounted for by the Debye-Waller factor
+    exp(-B |G|^2 / 16π^2), where B is the Debye-Waller (temperature) factor.
+
     Attributes
     ----------
     neutron_scattering_length : float
         The neutron scattering length of an atom.
+    debye_waller_factor : float
+        The Debye-Waller factor B of the atom, in Å^2, so the lattice constants must
+        be in Å. The default value is 0, which corresponds to an atom at rest.
 
     Methods
     -------
@@ -69,10 +104,11 @@ class NeutronFormFactor:
     """
 
     neutron_scattering_length: float
+    debye_waller_factor: float = 0.0
 
     def evaluate_form_factors(
         self,
-        reciprocal_lattice_vector_magnitudes: np.ndarray,  # pylint: disable=W0613
+        reciprocal_lattice_vector_magnitudes: np.ndarray,
     ) -> np.ndarray:
         """
         Evaluate neutron form factor
@@ -81,11 +117,19 @@ class NeutronFormFactor:
         Evaluates the neutron form factor of an tom for a specified range of reciprocal
         lattice vectors.
         """
-        # Create a NumPy array to store the neutron form factors.
-        form_factors = self.neutron_scattering_length * np.ones(
-            reciprocal_lattice_vector_magnitudes.shape[0], dtype=float
+        # Create a NumPy array filled with the neutron scattering length.
+        form_factors = np.full(
+            reciprocal_lattice_vector_magnitudes.shape[0],
+            self.neutron_scattering_length,
+            dtype=float,
         )
 
+        # Apply the Debye-Waller factor.
+        if self.debye_waller_factor != 0:
+            form_factors *= _calculate_debye_waller_factors(
+                self.debye_waller_factor, reciprocal_lattice_vector_magnitudes
+            )
+
         return form_factors
 
 
@@ -103,6 +147,9 @@ class XRayFormFactor:
     related to these quantities, and can use these parameters to calculate the X-ray
     form factor of an atom for a given reciprocal lattice vector.
 
+    Thermal vibrations of the atom are accounted for by the Debye-Waller factor
+    exp(-B |G|^2 / 16π^2), where B is the Debye-Waller (temperature) factor.
+
     Attributes
     ----------
     a1, a2, a3, a4 : float
@@ -112,6 +159,11 @@ class XRayFormFactor:
         respectively.
     c : float
         The constant term.
+    debye_waller_factor : float
+        The Debye-Waller factor B of the atom, in Å^2. This is the same unit as the
+        widths b1, ..., b4 of the tabulated X-ray form factors, which B is added to in
+        a `FormFactorTable`, so the lattice constants must be in Å. The default value
+        is 0, which corresponds to an atom at rest.
 
     Methods
     -------
@@ -129,6 +181,7 @@ class XRayFormFactor:
     a4: float
     b4: float
     c: float
+    debye_waller_factor: float = 0.0
 
     def evaluate_form_factors(
         self, reciprocal_lattice_vector_magnitudes: np.ndarray
@@ -156,6 +209,12 @@ class XRayFormFactor:
             )
         form_factors += c * np.ones(len(form_factors))
 
+        # Apply the Debye-Waller factor.
+        if self.debye_waller_factor != 0:
+            form_factors *= _calculate_debye_waller_factors(
+                self.debye_waller_factor, reciprocal_lattice_vector_magnitudes
+            )
+
         return form_factors
 
 
@@ -201,3 +260,502 @@ class XRayFormFactorHardShell:
         """
         x = reciprocal_lattice_vector_magnitudes * self.atomic_radius
         return 3 * self.atomic_number * (np.sin(x) - x * np.cos(x)) * np.pow(x, -3)
+
+
+@dataclass(eq=False)
+class FormFactorTable(Mapping):
+    """
+    Form factor table
+    =================
+
+    A `Mapping` mapping atomic numbers to form factors, which stores the parameters of
+    the form factor of every atom in a single dense NumPy array. This allows the form
+    factors of many atoms to be evaluated for a range of reciprocal lattice vectors in
+    a single vectorised call (see `evaluate_form_factor_matrix`), rather than once per
+    atom.
+
+    Row Z of `coefficients` contains the parameters (a1, b1, a2, b2, a3, b3, a4, b4, c,
+    B) of the atom with atomic number Z, in the same form as `XRayFormFactor`. A
+    neutron form factor is stored as a constant c, with a1 = ... = a4 = 0. Rows of
+    atoms which are not in the table are NaN.
+
+    The Debye-Waller factor exp(-B s^2), where s = |G| / 4π, is fused into the
+    Gaussians when the table is created, since
+        (sum_i a_i exp(-b_i s^2) + c) exp(-B s^2)
+            = sum_i a_i exp(-(b_i + B) s^2) + c exp(-B s^2).
+    Each form factor is therefore evaluated as a sum of up to five Gaussians, and the
+    Debye-Waller factors do not need to be applied separately.
+
+    Attributes
+    ----------
+    coefficients : np.ndarray
+        An array of shape (Z_max + 1, 10) containing the form factor parameters of each
+        atom.
+    neutron : bool
+        Whether the table contains neutron form factors (True) or X-ray form factors
+        (False). This determines the type of the form factors returned by indexing the
+        table. The default value is False.
+
+    Methods
+    -------
+    from_form_factors
+        Creates a table from a `Mapping` of `XRayFormFactor` or `NeutronFormFactor`
+        instances.
+    evaluate_form_factor_matrix
+        Evaluates the form factors of a range of atoms for a range of reciprocal
+        lattice vectors.
+    get_constant_form_factors
+        Returns the form factors of a range of atoms as scalars, if none of them depend
+        on the reciprocal lattice vector.
+    """
+
+    coefficients: np.ndarray
+    neutron: bool = False
+    _amplitudes: np.ndarray = field(init=False, repr=False)
+    _widths: np.ndarray = field(init=False, repr=False)
+    _constants: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self):
+        if not (
+            isinstance(self.coefficients, np.ndarray)
+            and self.coefficients.ndim == 2
+            and self.coefficients.shape[1] == 10
+        ):
+            raise ValueError("coefficients must be a numpy array of shape (n, 10).")
+
+        a = self.coefficients[:, 0:8:2]
+        b = self.coefficients[:, 1:8:2]
+        c = self.coefficients[:, 8]
+        debye_waller_factors = self.coefficients[:, 9]
+        vibrating = debye_waller_factors != 0
+
+        # Fuse the Debye-Waller factors into the Gaussians. The constant term of an
+        # atom with a non-zero Debye-Waller factor becomes a fifth Gaussian.
+        self._amplitudes = np.zeros((len(self.coefficients), 5))
+        self._amplitudes[:, :4] = a
+        self._amplitudes[vibrating, 4] = c[vibrating]
+
+        self._widths = np.zeros((len(self.coefficients), 5))
+        self._widths[:, :4] = b + debye_waller_factors[:, np.newaxis]
+        self._widths[:, 4] = debye_waller_factors
+
+        self._constants = np.where(vibrating, 0, c)
+
+    @classmethod
+    def from_form_factors(
+        cls,
+        form_factors: Mapping[int, XRayFormFactor] | Mapping[int, NeutronFormFactor],
+    ) -> "FormFactorTable":
+        """
+        From form factors
+        =================
+
+        Creates a `FormFactorTable` from a `Mapping` mapping atomic numbers to
+        `XRayFormFactor` instances (e.g. from `file_reading.read_xray_form_factors`),
+        or to `NeutronFormFactor` instances (e.g. from
+        `file_reading.read_neutron_scattering_lengths`).
+        """
+        if isinstance(form_factors, FormFactorTable):
+            return form_factors
+
+        values = list(form_factors.values())
+        neutron = all(isinstance(value, NeutronFormFactor) for value in values)
+
+        # Error handling.
+        if not values:
+            raise ValueError("form_factors must not be empty.")
+        if not (neutron or all(isinstance(value, XRayFormFactor) for value in values)):
+            raise ValueError(
+                "form_factors must only contain XRayFormFactor instances or only "
+                "contain NeutronFormFactor instances."
+            )
+        if min(form_factors) < 0:
+            raise ValueError("Atomic numbers must be non-negative.")
+
+        coefficients = np.full((max(form_factors) + 1, 10), np.nan)
+        for atomic_number, value in form_factors.items():
+            if neutron:
+                coefficients[atomic_number] = 0
+                coefficients[atomic_number, 8] = value.neutron_scattering_length
+                coefficients[atomic_number, 9] = value.debye_waller_factor
+            else:
+                coefficients[atomic_number] = [
+                    value.a1,
+                    value.b1,
+                    value.a2,
+                    value.b2,
+                    value.a3,
+                    value.b3,
+                    value.a4,
+                    value.b4,
+                    value.c,
+                    value.debye_waller_factor,
+                ]
+
+        return cls(coefficients, neutron)
+
+    def _get_rows(self, atomic_numbers: np.ndarray) -> np.ndarray:
+        """
+        Get rows
+        ========
+
+        Returns the rows of the table for a range of atomic numbers, and raises a
+        `KeyError` if any of the atoms are not in the table.
+        """
+        atomic_numbers = np.asarray(atomic_numbers, dtype=int)
+
+        in_table = (atomic_numbers >= 0) & (atomic_numbers < len(self.coefficients))
+        if np.all(in_table):
+            in_table = ~np.isnan(self.coefficients[atomic_numbers, 8])
+        if not np.all(in_table):
+            raise KeyError(int(atomic_numbers[~in_table][0]))
+
+        return atomic_numbers
+
+    def evaluate_form_factor_matrix(
+        self,
+        atomic_numbers: np.ndarray,
+        reciprocal_lattice_vector_magnitudes: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Evaluate form factor matrix
+        ===========================
+
+        Evaluates the form factors of a range of atoms for a range of reciprocal
+        lattice vectors, and returns an array of shape (number of atoms, number of
+        reciprocal lattice vectors). Each Gaussian (including the Debye-Waller
+        factors) is evaluated for every atom at once, only for the atoms whose form
+        factor is not constant, and only if any of these atoms use it.
+        """
+        rows = self._get_rows(atomic_numbers)
+        a = self._amplitudes[rows]
+        b = self._widths[rows]
+        c = self._constants[rows]
+
+        # Initialise every form factor to its constant term.
+        form_factors = np.empty((len(rows), len(reciprocal_lattice_vector_magnitudes)))
+        form_factors[:] = c[:, np.newaxis]
+
+        # Only evaluate the Gaussians for the atoms with a non-constant form factor.
+        varying = np.any(a != 0, axis=1)
+        if not np.any(varying):
+            return form_factors
+
+        all_varying = np.all(varying)
+        varying_form_factors = form_factors if all_varying else form_factors[varying]
+        scaled_magnitudes = reciprocal_lattice_vector_magnitudes / (4 * np.pi)
+        squared_magnitudes = scaled_magnitudes**2
+
+        # Add each Gaussian in place, reusing a single temporary array.
+        gaussians = np.empty_like(varying_form_factors)
+        for i in np.flatnonzero(np.any(a[varying] != 0, axis=0)):
+            np.multiply(-b[varying, i, np.newaxis], squared_magnitudes, out=gaussians)
+            np.exp(gaussians, out=gaussians)
+            gaussians *= a[varying, i, np.newaxis]
+            varying_form_factors += gaussians
+
+        if not all_varying:
+            form_factors[varying] = varying_form_factors
+
+        return form_factors
+
+    def get_constant_form_factors(
+        self, atomic_numbers: np.ndarray
+    ) -> np.ndarray | None:
+        """
+        Get constant form factors
+        =========================
+
+        Returns the form factor of each of a range of atoms as a scalar if every one of
+        them is constant (i.e. a1 = ... = a4 = 0, as for a neutron form factor), and
+        returns None otherwise. Form factors with a non-zero Debye-Waller factor are
+        not constant.
+        """
+        rows = self._get_rows(atomic_numbers)
+
+        if np.any(self._amplitudes[rows] != 0):
+            return None
+        return self._constants[rows]
+
+    def __getitem__(self, atomic_number: int) -> XRayFormFactor | NeutronFormFactor:
+        coefficients = self.coefficients[self._get_rows(np.array([atomic_number]))[0]]
+
+        if self.neutron:
+            return NeutronFormFactor(float(coefficients[8]), float(coefficients[9]))
+        return XRayFormFactor(*(float(x) for x in coefficients))
+
+    def __iter__(self):
+        return iter(np.flatnonzero(~np.isnan(self.coefficients[:, 8])).tolist())
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(~np.isnan(self.coefficients[:, 8])))
+
+
+@dataclass
+class InterpolatedFormFactor:
+    """
+    Interpolated form factor
+    ========================
+
+    A class which approximates the form factor of an atom by interpolating between
+    values of the form factor sampled on a uniform grid of reciprocal lattice vector
+    magnitudes. Once the grid has been built, the form factor can be evaluated without
+    evaluating the original form factor, which avoids repeatedly evaluating the
+    exponentials of an `XRayFormFactor`.
+
+    Instances should be created with `from_form_factor`, which chooses the grid spacing
+    such that the interpolation error is smaller than a specified tolerance. Reciprocal
+    lattice vectors which lie outside of the grid are evaluated using the original form
+    factor.
+
+    Attributes
+    ----------
+    form_factor : FormFactorProtocol
+        The form factor which is interpolated.
+    grid_spacing : float
+        The spacing between the reciprocal lattice vector magnitudes of the grid. The
+        grid starts at zero.
+    values : np.ndarray
+        The form factor evaluated at each point of the grid.
+    derivatives : np.ndarray
+        The derivative of the form factor with respect to the reciprocal lattice vector
+        magnitude at each point of the grid. These are only used for cubic
+        interpolation.
+    method : str
+        The interpolation method, either "linear" or "cubic". The default value is
+        "linear".
+
+    Methods
+    -------
+    from_form_factor
+        Creates an `InterpolatedFormFactor` which approximates a form factor to within
+        a specified tolerance.
+    evaluate_form_factors
+        Evaluates the interpolated form factor of an atom for a range of reciprocal
+        lattice vectors.
+    """
+
+    form_factor: FormFactorProtocol
+    grid_spacing: float
+    values: np.ndarray
+    derivatives: np.ndarray
+    method: str = "linear"
+    _polynomials: np.ndarray = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.method not in ("linear", "cubic"):
+            raise ValueError('method must be either "linear" or "cubic".')
+        if len(self.values) < 2 or len(self.derivatives) != len(self.values):
+            raise ValueError(
+                "values and derivatives must have the same length, which must be at "
+                "least 2."
+            )
+
+        # Calculate the coefficients of the interpolating polynomial of each grid
+        # interval, in terms of the position t (0 <= t <= 1) within the interval.
+        lower_values = self.values[:-1]
+        upper_values = self.values[1:]
+        if self.method == "linear":
+            self._polynomials = np.array([lower_values, upper_values - lower_values])
+        else:
+            # Cubic Hermite interpolation between the values and derivatives at the
+            # ends of each interval.
+            lower_slopes = self.grid_spacing * self.derivatives[:-1]
+            upper_slopes = self.grid_spacing * self.derivatives[1:]
+            self._polynomials = np.array(
+                [
+                    lower_values,
+                    lower_slopes,
+                    3 * (upper_values - lower_values) - 2 * lower_slopes - upper_slopes,
+                    2 * (lower_values - upper_values) + lower_slopes + upper_slopes,
+                ]
+            )
+
+    @property
+    def max_magnitude(self) -> float:
+        """
+        The largest reciprocal lattice vector magnitude of the grid.
+        """
+        return self.grid_spacing * (len(self.values) - 1)
+
+    @classmethod
+    def from_form_factor(
+        cls,
+        form_factor: FormFactorProtocol,
+        max_magnitude: float,
+        tolerance: float = 1e-6,
+        method: str = "linear",
+        max_grid_points: int = 2**20,
+    ) -> "InterpolatedFormFactor":
+        """
+        From form factor
+        ================
+
+        Samples a form factor on a uniform grid of reciprocal lattice vector magnitudes
+        between 0 and `max_magnitude`, and returns an `InterpolatedFormFactor`.
+
+        The number of grid points starts at 64 and is doubled until the interpolation
+        error, measured at the midpoint of every grid interval and relative to the
+        largest absolute value of the form factor on the grid, is smaller than
+        `tolerance`. Raises a `ValueError` if the tolerance cannot be reached with at
+        most `max_grid_points` grid points.
+        """
+        # Error handling.
+        if max_magnitude <= 0:
+            raise ValueError("max_magnitude must be positive.")
+        if tolerance <= 0:
+            raise ValueError("tolerance must be positive.")
+
+        num_intervals = 64
+        while num_intervals + 1 <= max_grid_points:
+            magnitudes = np.linspace(0, max_magnitude, num_intervals + 1)
+            grid_spacing = magnitudes[1]
+
+            # Sample the form factor and its derivative on the grid.
+            values = form_factor.evaluate_form_factors(magnitudes)
+            derivatives = np.gradient(values, grid_spacing, edge_order=2)
+            interpolated_form_factor = cls(
+                form_factor, grid_spacing, values, derivatives, method
+            )
+
+            # Compare the interpolated form factor with the original form factor at
+            # the midpoint of every grid interval.
+            midpoints = magnitudes[:-1] + grid_spacing / 2
+            error = np.max(
+                np.abs(
+                    interpolated_form_factor.evaluate_form_factors(midpoints)
+                    - form_factor.evaluate_form_factors(midpoints)
+                )
+            )
+            scale = max(float(np.max(np.abs(values))), np.finfo(float).tiny)
+
+            if error <= tolerance * scale:
+                return interpolated_form_factor
+
+            num_intervals *= 2
+
+        raise ValueError(
+            f"Could not interpolate the form factor to within a tolerance of "
+            f"{tolerance} with at most {max_grid_points} grid points."
+        )
+
+    def evaluate_form_factors(
+        self, reciprocal_lattice_vector_magnitudes: np.ndarray
+    ) -> np.ndarray:
+        """
+        Evaluate interpolated form factor
+        =================================
+
+        Evaluates the interpolated form factor of an atom for a specified range of
+        reciprocal lattice vectors.
+        """
+        magnitudes = np.asarray(reciprocal_lattice_vector_magnitudes, dtype=float)
+        if len(magnitudes) == 0:
+            return np.zeros(0)
+
+        # Find the grid interval containing each reciprocal lattice vector, and the
+        # position t of the reciprocal lattice vector within the interval.
+        t = magnitudes / self.grid_spacing
+        indices = t.astype(np.intp)
+        np.clip(indices, 0, len(self.values) - 2, out=indices)
+        t -= indices
+
+        # Evaluate the interpolating polynomials using Horner's method, in place.
+        form_factors = self._polynomials[-1][indices]
+        for polynomial in self._polynomials[-2::-1]:
+            form_factors *= t
+            form_factors += polynomial[indices]
+
+        # Evaluate the original form factor outside of the grid.
+        if magnitudes.min() < 0 or magnitudes.max() > self.max_magnitude:
+            outside_grid = (magnitudes < 0) | (magnitudes > self.max_magnitude)
+            form_factors[outside_grid] = self.form_factor.evaluate_form_factors(
+                magnitudes[outside_grid]
+            )
+
+        return form_factors
+
+
+def interpolate_form_factors(
+    form_factors: Mapping[int, FormFactorProtocol],
+    wavelength: float,
+    tolerance: float = 1e-6,
+    method: str = "linear",
+) -> dict[int, InterpolatedFormFactor]:
+    """
+    Interpolate form factors
+    ========================
+
+    Creates an `InterpolatedFormFactor` for every atom in `form_factors`. The grid of
+    each form factor covers every reciprocal lattice vector which can satisfy the
+    Laue condition for the specified wavelength, i.e. magnitudes up to 4π / wavelength.
+    The returned dictionary can be passed to any function which takes a `Mapping` of
+    form factors.
+    """
+    max_magnitude = 4 * np.pi / wavelength
+
+    return {
+        atomic_number: InterpolatedFormFactor.from_form_factor(
+            value, max_magnitude, tolerance, method
+        )
+        for atomic_number, value in form_factors.items()
+    }
+
+
+def evaluate_form_factor_matrix(
+    form_factors: Mapping[int, FormFactorProtocol],
+    atomic_numbers: np.ndarray,
+    reciprocal_lattice_vector_magnitudes: np.ndarray,
+) -> np.ndarray:
+    """
+    Evaluate form factor matrix
+    ===========================
+
+    Evaluates the form factors of a range of atoms for a range of reciprocal lattice
+    vectors, and returns an array of shape (number of atoms, number of reciprocal
+    lattice vectors). If `form_factors` is a `FormFactorTable`, every atom is evaluated
+    in a single call; otherwise the form factor of each atom is evaluated separately.
+    Raises a `KeyError` if any of the atoms are not in `form_factors`.
+    """
+    if isinstance(form_factors, FormFactorTable):
+        return form_factors.evaluate_form_factor_matrix(
+            atomic_numbers, reciprocal_lattice_vector_magnitudes
+        )
+
+    form_factor_values = np.empty(
+        (len(atomic_numbers), len(reciprocal_lattice_vector_magnitudes))
+    )
+    for i, atomic_number in enumerate(atomic_numbers):
+        form_factor_values[i] = form_factors[atomic_number].evaluate_form_factors(
+            reciprocal_lattice_vector_magnitudes
+        )
+
+    return form_factor_values
+
+
+def get_constant_form_factors(
+    form_factors: Mapping[int, FormFactorProtocol], atomic_numbers: np.ndarray
+) -> np.ndarray | None:
+    """
+    Get constant form factors
+    =========================
+
+    Returns the form factor of each of a range of atoms as a scalar, if none of them
+    depend on the reciprocal lattice vector (i.e. if they are all neutron form factors
+    without a Debye-Waller factor), and returns None otherwise. Raises a `KeyError` if
+    any of the atoms are not in `form_factors`.
+
+    Constant form factors can be applied as a weight to the phase of each atom, rather
+    than being evaluated for every reciprocal lattice vector.
+    """
+    if isinstance(form_factors, FormFactorTable):
+        return form_factors.get_constant_form_factors(atomic_numbers)
+
+    values = [form_factors[atomic_number] for atomic_number in atomic_numbers]
+    if not all(
+        isinstance(value, NeutronFormFactor) and value.debye_waller_factor == 0
+        for value in values
+    ):
+        return None
+
+    return np.array([value.neutron_scattering_length for value in values], dtype=float)
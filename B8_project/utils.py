@@ -88,6 +88,77 @@ def gaussian(x, mean, width, amplitude):
     return amplitude * np.exp(-0.5 * ((x - mean) / width) ** 2)
 
 
+def erf(x):
+    """
+    Error function
+    ==============
+
+    Evaluates the error function element-wise, using approximation 7.1.26 from
+    Abramowitz and Stegun. The maximum absolute error of the approximation is 1.5e-7.
+    """
+    x = np.asarray(x, dtype=float)
+
+    # Coefficients of the approximation.
+    p = 0.3275911
+    a1, a2, a3, a4, a5 = (
+        0.254829592,
+        -0.284496736,
+        1.421413741,
+        -1.453152027,
+        1.061405429,
+    )
+
+    abs_x = np.abs(x)
+    t = 1 / (1 + p * abs_x)
+    polynomial = ((((a5 * t + a4) * t + a3) * t + a2) * t + a1) * t
+
+    return np.sign(x) * (1 - polynomial * np.exp(-(abs_x**2)))
+
+
+def laue_interference(
+    miller_indices: np.ndarray, num_cells: tuple[int, ...] | np.ndarray
+) -> np.ndarray:
+    """
+    Laue interference
+    =================
+
+    Calculates the interference function of a finite crystal of N1 * N2 * N3 unit
+    cells, for each of a range of (not necessarily integer) Miller indices
+    (h1, h2, h3). The interference function is |sum over every unit cell of
+    exp(2πi h·n)|^2, which is the separable product
+
+        sin^2(π N1 h1) / sin^2(π h1) * sin^2(π N2 h2) / sin^2(π h2) * ...
+
+    so the cost does not depend on the number of unit cells.
+
+    Each factor is periodic in h with period 1, so h is first reduced to the nearest
+    integer offset x in [-0.5, 0.5]. Each factor is then evaluated as
+    (N sinc(N x) / sinc(x))^2, where sinc(x) = sin(πx) / (πx). The denominator is at
+    least 2 / π, so each factor takes its limiting value N^2 at integer h, and is
+    accurate close to integer h and for large h.
+
+    Parameters
+    ----------
+    miller_indices : np.ndarray
+        An array of shape (..., d) of Miller indices.
+    num_cells : tuple[int, ...] | np.ndarray
+        The number of unit cells along each of the d axes.
+
+    Returns
+    -------
+    np.ndarray
+        An array of shape (...) containing the interference function for each set of
+        Miller indices.
+    """
+    miller_indices = np.asarray(miller_indices, dtype=float)
+    num_cells = np.asarray(num_cells)
+
+    offsets = miller_indices - np.rint(miller_indices)
+    amplitudes = num_cells * np.sinc(num_cells * offsets) / np.sinc(offsets)
+
+    return np.prod(amplitudes**2, axis=-1)
+
+
 def random_uniform_unit_vector(dims: int):
     """
     Random uniform unit vector
@@ -101,20 +172,115 @@ def random_uniform_unit_vector(dims: int):
     return [x / mag for x in vec]
 
 
-def random_uniform_unit_vectors(n: int, dims: int):
+def random_uniform_unit_vectors(
+    n: int, dims: int, rng: np.random.Generator | None = None
+):
     """
     Random uniform unit vectors
     ===========================
 
     Returns a NumPy array of shape `(n, dims)` consisting of `n` unit vectors,
     each uniformly and randomly selected
-    from the unit sphere.
+    from the unit sphere. If `rng` is None (default), the vectors are drawn from the
+    global NumPy random state; otherwise they are drawn from the generator `rng`.
     """
-    vecs = np.random.normal(size=(n, dims))
+    if rng is None:
+        vecs = np.random.normal(size=(n, dims))
+    else:
+        vecs = rng.normal(size=(n, dims))
     mag = np.linalg.norm(vecs, axis=1, keepdims=True)
     return vecs / mag
 
 
+def random_rotation_matrix(rng: np.random.Generator | None = None) -> np.ndarray:
+    """
+    Random rotation matrix
+    ======================
+
+    Returns a 3 * 3 rotation matrix which is uniformly and randomly selected from all
+    rotations, using a random unit quaternion. If `rng` is None (default), the
+    rotation is drawn from the global NumPy random state.
+    """
+    w, x, y, z = random_uniform_unit_vectors(1, 4, rng)[0]
+
+    return np.array(
+        [
+            [1 - 2 * (y**2 + z**2), 2 * (x * y - w * z), 2 * (x * z + w * y)],
+            [2 * (x * y + w * z), 1 - 2 * (x**2 + z**2), 2 * (y * z - w * x)],
+            [2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x**2 + y**2)],
+        ]
+    )
+
+
+def fibonacci_unit_vectors(n: int, rng: np.random.Generator | None = None):
+    """
+    Fibonacci unit vectors
+    ======================
+
+    Returns a NumPy array of shape `(n, 3)` consisting of the `n` points of a Fibonacci
+    lattice on the unit sphere, rotated by a uniformly random rotation (see
+    `random_rotation_matrix`).
+
+    The points of a Fibonacci lattice are evenly spaced in z, and their azimuthal
+    angles increase by the golden angle, so they cover the sphere much more evenly
+    than `n` independent random unit vectors. The random rotation means that each point
+    is still uniformly distributed on the sphere, so averages over the points are
+    unbiased. For smooth functions, the error of these averages decreases much faster
+    than the 1 / sqrt(n) of independent random unit vectors; for functions with sharp
+    edges, such as the indicator function of a cap, it only decreases roughly as
+    n^(-3/4). Functions which vary on scales smaller than the spacing of the points,
+    such as narrow Bragg peaks, see little improvement until `n` is large enough to
+    resolve them.
+    """
+    indices = np.arange(n)
+    z = 1 - (2 * indices + 1) / n
+    azimuthal_angles = np.pi * (3 - np.sqrt(5)) * indices
+    radii = np.sqrt(1 - z**2)
+
+    vecs = np.stack(
+        [radii * np.cos(azimuthal_angles), radii * np.sin(azimuthal_angles), z],
+        axis=1,
+    )
+
+    return vecs @ random_rotation_matrix(rng).T
+
+
+def get_random_number_generator(
+    rng: np.random.Generator | int | None = None,
+) -> np.random.Generator:
+    """
+    Get random number generator
+    ===========================
+
+    Returns a NumPy random number generator. `rng` can be an existing generator (which
+    is returned unchanged), an integer seed, or None, in which case a generator is
+    seeded with fresh entropy from the operating system.
+    """
+    return np.random.default_rng(rng)
+
+
+def spawn_random_number_generators(
+    rng: np.random.Generator | int | None, num_generators: int
+) -> list[np.random.Generator]:
+    """
+    Spawn random number generators
+    ==============================
+
+    Returns a list of `num_generators` statistically independent random number
+    generators, which are spawned from `rng` using `numpy.random.SeedSequence.spawn`.
+    The same `rng` (or seed) always gives the same list of generators, so each child
+    generator can be used by a different process without duplicating or correlating
+    the random streams.
+    """
+    if isinstance(rng, np.random.Generator):
+        return rng.spawn(num_generators)
+
+    return [
+        np.random.default_rng(seed_sequence)
+        for seed_sequence in np.random.SeedSequence(rng).spawn(num_generators)
+    ]
+
+
 def benchmark_function(function, *args, number_of_runs=5, **kwargs):
     """
     Benchmark function
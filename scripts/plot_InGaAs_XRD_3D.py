@@ -7,7 +7,7 @@ range of different concentrations (x), and represents the data as a surface plot
 import numpy as np
 import plotly.graph_objects as go
 
-from B8_project import file_reading, crystal, alloy, diffraction
+from B8_project import file_reading, crystal, diffraction
 
 # Concentration parameters
 NUMBER_OF_CONCENTRATIONS = 2
@@ -32,9 +32,6 @@ GaAs_basis = file_reading.read_basis("data/GaAs_basis.csv")
 GaAs_lattice = file_reading.read_lattice("data/GaAs_lattice.csv")
 GaAs_unit_cell = crystal.UnitCell.new_unit_cell(GaAs_basis, GaAs_lattice)
 
-# Generate a pure GaAs super cell.
-GaAs_super_cell = alloy.SuperCell.new_super_cell(GaAs_unit_cell, (4, 4, 4))
-
 # Read InAs parameters from .csv files.
 InAs_basis = file_reading.read_basis("data/InAs_basis.csv")
 InAs_lattice = file_reading.read_lattice("data/InAs_lattice.csv")
@@ -49,54 +46,24 @@ concentrations = np.linspace(
     MIN_CONCENTRATION, MAX_CONCENTRATION, NUMBER_OF_CONCENTRATIONS
 )
 
-# Calculate the number of deflection angles using the same method as
-# diffraction.get_diffraction_pattern().
-num_deflection_angles = np.round(
-    10 * (MAX_DEFLECTION_ANGLE - MIN_DEFLECTION_ANGLE) / PEAK_WIDTH
-).astype(int)
-
-# Generate an array of deflection angles.
-deflection_angles = np.linspace(
-    MIN_DEFLECTION_ANGLE, MAX_DEFLECTION_ANGLE, num_deflection_angles
-)
-
-# Initialise an array which stores the intensity data.
-intensity_data = np.zeros(
-    (NUMBER_OF_CONCENTRATIONS, num_deflection_angles),
+# Calculate the ND pattern for each concentration.
+deflection_angles, intensity_data = diffraction.get_disordered_diffraction_patterns(
+    unit_cell_no_substitution=GaAs_unit_cell,
+    unit_cell_full_substitution=InAs_unit_cell,
+    target_atomic_number=31,
+    substitute_atomic_number=49,
+    concentrations=list(concentrations),
+    super_cell_side_lengths=(4, 4, 4),
+    diffraction_type="ND",
+    neutron_form_factors=neutron_form_factors,
+    x_ray_form_factors=x_ray_form_factors,
+    wavelength=WAVELENGTH,
+    min_deflection_angle=MIN_DEFLECTION_ANGLE,
+    max_deflection_angle=MAX_DEFLECTION_ANGLE,
+    intensity_cutoff=INTENSITY_CUTOFF,
+    peak_width=PEAK_WIDTH,
 )
 
-for i, conc in enumerate(concentrations):
-    # Name of the alloy.
-    alloy_name = f"In({conc:.3f})Ga({1-conc:.3f})As"
-
-    # Generate an InGaAs super cell.
-    disordered_GaAs_super_cell = alloy.SuperCell.apply_disorder(
-        super_cell=GaAs_super_cell,
-        target_atomic_number=31,
-        substitute_atomic_number=49,
-        concentration=conc,
-        lattice_constants_no_substitution=GaAs_unit_cell.lattice_constants,
-        lattice_constants_full_substitution=InAs_unit_cell.lattice_constants,
-        material_name=alloy_name,
-    )
-
-    # Get the diffraction pattern for the InGaAs cell.
-    diffraction_pattern = diffraction.get_diffraction_pattern(
-        unit_cell=disordered_GaAs_super_cell,
-        diffraction_type="ND",
-        neutron_form_factors=neutron_form_factors,
-        x_ray_form_factors=x_ray_form_factors,
-        wavelength=WAVELENGTH,
-        min_deflection_angle=MIN_DEFLECTION_ANGLE,
-        max_deflection_angle=MAX_DEFLECTION_ANGLE,
-        peak_width=PEAK_WIDTH,
-        intensity_cutoff=INTENSITY_CUTOFF,
-    )
-
-    intensity_data[i] = diffraction_pattern["intensities"]
-
-    print(f"Computed intensities for x = {conc}")
-
 # Create the figure.
 fig = go.Figure()
 
@@ -59,6 +59,8 @@ class TestSuperCell:
         assert super_cell.material == unit_cell.material
         assert np.array_equal(unit_cell.lattice_constants, super_cell.lattice_constants)
         assert np.array_equal(unit_cell.atoms, super_cell.atoms)
+        assert super_cell.unit_cell is unit_cell
+        assert super_cell.side_lengths == (1, 1, 1)
 
         # 2*2*2 Na super cell.
         basis = file_reading.read_basis("tests/data/Na_basis.csv")
@@ -97,3 +99,64 @@ class TestSuperCell:
             super_cell.atoms["positions"][np.lexsort(super_cell.atoms["positions"].T)],
             expected_atomic_positions[np.lexsort(expected_atomic_positions.T)],
         )
+
+    @staticmethod
+    def test_apply_disorder_normal_operation():
+        """
+        A unit test that tests the apply_disorder method of the SuperCell class. This
+        unit test tests that the correct number of atoms are substituted, and that the
+        atomic positions are unchanged.
+        """
+        basis = file_reading.read_basis("tests/data/NaCl_basis.csv")
+        lattice = file_reading.read_lattice("tests/data/NaCl_lattice.csv")
+        unit_cell = crystal.UnitCell.new_unit_cell(basis, lattice)
+        super_cell = alloy.SuperCell.new_super_cell(unit_cell, (2, 2, 2))
+
+        disordered_cell = alloy.SuperCell.apply_disorder(
+            super_cell,
+            11,
+            19,
+            0.25,
+            unit_cell.lattice_constants,
+            unit_cell.lattice_constants + 1,
+            "NaKCl",
+        )
+
+        atomic_numbers = disordered_cell.atoms["atomic_numbers"]
+        assert np.sum(atomic_numbers == 19) == 8
+        assert np.sum(atomic_numbers == 11) == 24
+        assert np.array_equal(
+            disordered_cell.atoms["positions"], super_cell.atoms["positions"]
+        )
+        assert np.allclose(
+            disordered_cell.lattice_constants, super_cell.lattice_constants + 0.5
+        )
+
+    @staticmethod
+    def test_apply_disorder_reproducible():
+        """
+        A unit test that tests the apply_disorder method of the SuperCell class. This
+        unit test tests that the same seed always gives the same disordered super cell.
+        """
+        basis = file_reading.read_basis("tests/data/NaCl_basis.csv")
+        lattice = file_reading.read_lattice("tests/data/NaCl_lattice.csv")
+        unit_cell = crystal.UnitCell.new_unit_cell(basis, lattice)
+        super_cell = alloy.SuperCell.new_super_cell(unit_cell, (2, 2, 2))
+
+        disordered_cells = [
+            alloy.SuperCell.apply_disorder(
+                super_cell,
+                11,
+                19,
+                0.5,
+                unit_cell.lattice_constants,
+                unit_cell.lattice_constants + 1,
+                "NaKCl",
+                rng=rng,
+            )
+            for rng in [1, 1, np.random.default_rng(1), 2]
+        ]
+
+        assert np.array_equal(disordered_cells[0].atoms, disordered_cells[1].atoms)
+        assert np.array_equal(disordered_cells[0].atoms, disordered_cells[2].atoms)
+        assert not np.array_equal(disordered_cells[0].atoms, disordered_cells[3].atoms)
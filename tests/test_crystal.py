@@ -180,6 +180,33 @@ class TestUnitCell:
             ),
         )
 
+    @staticmethod
+    def test_new_unit_cell_keep_primitive_basis():
+        """
+        A unit test for the new_unit_cell function. This unit test tests that the
+        primitive basis and centering translations are stored when
+        `keep_primitive_basis` is True.
+        """
+        NaCl_basis = file_reading.read_basis(  # pylint: disable=C0103
+            "tests/data/NaCl_basis.csv"
+        )
+        NaCl_lattice = file_reading.read_lattice(  # pylint: disable=C0103
+            "tests/data/NaCl_lattice.csv"
+        )
+        unit_cell = crystal.UnitCell.new_unit_cell(
+            NaCl_basis, NaCl_lattice, keep_primitive_basis=True
+        )
+        assert np.array_equal(unit_cell.atoms["atomic_numbers"], np.array([11, 17]))
+        assert np.array_equal(
+            unit_cell.centering_translations,
+            np.array([[0, 0, 0], [0.5, 0.5, 0], [0.5, 0, 0.5], [0, 0.5, 0.5]]),
+        )
+
+        expanded_unit_cell = crystal.UnitCell.new_unit_cell(NaCl_basis, NaCl_lattice)
+        assert np.array_equal(
+            unit_cell.get_conventional_atoms(), expanded_unit_cell.atoms
+        )
+
 
 class TestReciprocalSpace:
     """
@@ -221,6 +248,139 @@ class TestReciprocalSpace:
             expected_components[np.lexsort(expected_components.T)],
         )
 
+    @staticmethod
+    def test_generate_shell_miller_indices_normal_operation():
+        """
+        A unit test for the generate_shell_miller_indices function. This unit test
+        tests that the generated Miller indices agree with a brute force search.
+        """
+        lattice_constants = np.array([3.0, 4.0, 5.0])
+        min_magnitude, max_magnitude = 10, 20
+
+        miller_indices = np.concatenate(
+            list(
+                crystal.ReciprocalSpace.generate_shell_miller_indices(
+                    min_magnitude, max_magnitude, lattice_constants
+                )
+            )
+        )
+
+        # Brute force search over a cube of Miller indices.
+        max_hkl = np.ceil(lattice_constants * max_magnitude / (2 * np.pi)).astype(int)
+        cube = np.stack(
+            np.meshgrid(
+                *[np.arange(-n, n + 1) for n in max_hkl],
+                indexing="ij",
+            ),
+            axis=-1,
+        ).reshape(-1, 3)
+        magnitudes = np.linalg.norm(2 * np.pi * cube / lattice_constants, axis=1)
+        expected_miller_indices = cube[
+            (magnitudes >= min_magnitude) & (magnitudes <= max_magnitude)
+        ]
+
+        # Every valid Miller index should be generated exactly once.
+        assert len(np.unique(miller_indices, axis=0)) == len(miller_indices)
+        generated = {tuple(index) for index in miller_indices}
+        assert {tuple(index) for index in expected_miller_indices} <= generated
+
+    @staticmethod
+    def test_generate_reciprocal_lattice_vectors_normal_operation():
+        """
+        A unit test for the generate_reciprocal_lattice_vectors function. This unit
+        test tests that the chunks of reciprocal lattice vectors together agree with
+        get_reciprocal_lattice_vectors.
+        """
+        lattice_constants = np.array([3.0, 4.0, 5.0])
+        min_magnitude, max_magnitude = 10, 20
+
+        chunks = list(
+            crystal.ReciprocalSpace.generate_reciprocal_lattice_vectors(
+                min_magnitude, max_magnitude, lattice_constants, rlvs_per_chunk=100
+            )
+        )
+        expected_reciprocal_lattice_vectors = (
+            crystal.ReciprocalSpace.get_reciprocal_lattice_vectors(
+                min_magnitude, max_magnitude, lattice_constants
+            )
+        )
+
+        assert len(chunks) > 1
+        assert np.array_equal(
+            np.concatenate(chunks), expected_reciprocal_lattice_vectors
+        )
+
+    @staticmethod
+    def test_get_shell_keys_normal_operation():
+        """
+        A unit test for the get_shell_keys function. This unit test tests that
+        reciprocal lattice vectors have the same shell key if and only if they have the
+        same magnitude.
+        """
+        miller_indices = np.array(
+            [[1, 0, 0], [0, 1, 0], [0, 0, 2], [0, 0, 1], [1, 1, 0], [2, 2, 1]]
+        )
+
+        # Cubic unit cell.
+        shell_keys = crystal.ReciprocalSpace.get_shell_keys(
+            miller_indices, np.array([2.0, 2.0, 2.0])
+        )
+        assert np.array_equal(shell_keys, np.array([1, 1, 4, 1, 2, 9]))
+
+        # Tetragonal unit cell where (1, 0, 0) and (0, 0, 2) have the same magnitude.
+        shell_keys = crystal.ReciprocalSpace.get_shell_keys(
+            miller_indices, np.array([1.0, 1.0, 2.0])
+        )
+        assert shell_keys[0] == shell_keys[1] == shell_keys[2]
+        assert len(np.unique(shell_keys)) == 4
+
+        # Orthorhombic unit cell with incommensurate lattice constants.
+        lattice_constants = np.array([1.0, np.sqrt(2), np.pi])
+        shell_keys = crystal.ReciprocalSpace.get_shell_keys(
+            miller_indices, lattice_constants
+        )
+        assert len(np.unique(shell_keys)) == len(miller_indices)
+
+    @staticmethod
+    def test_get_shell_keys_incommensurate_chunks():
+        """
+        A unit test for the get_shell_keys function with incommensurate lattice
+        constants. This unit test tests that the shell keys of reciprocal lattice
+        vectors from different chunks of generate_reciprocal_lattice_vectors are
+        comparable, i.e. that two reciprocal lattice vectors have the same shell key if
+        and only if they have the same magnitude.
+        """
+        min_magnitude = 1
+        max_magnitude = 12
+        lattice_constants = np.array([1.0, np.sqrt(2), np.sqrt(2)])
+
+        chunks = list(
+            crystal.ReciprocalSpace.generate_reciprocal_lattice_vectors(
+                min_magnitude, max_magnitude, lattice_constants, rlvs_per_chunk=20
+            )
+        )
+        reciprocal_lattice_vectors = np.concatenate(chunks)
+        shell_keys = reciprocal_lattice_vectors["shell_keys"]
+        magnitudes = reciprocal_lattice_vectors["magnitudes"]
+
+        assert len(chunks) > 1
+        assert np.array_equal(
+            shell_keys[:, np.newaxis] == shell_keys,
+            np.isclose(magnitudes[:, np.newaxis], magnitudes, rtol=1e-12),
+        )
+
+        # The shell key of a reciprocal lattice vector does not depend on the other
+        # Miller indices if max_magnitude is specified.
+        miller_indices = np.array([[1, 1, 0], [1, 0, 1], [0, 2, 1]])
+        shell_keys = crystal.ReciprocalSpace.get_shell_keys(
+            miller_indices, lattice_constants, max_magnitude
+        )
+        first_shell_keys = crystal.ReciprocalSpace.get_shell_keys(
+            miller_indices[:2], lattice_constants, max_magnitude
+        )
+        assert np.array_equal(shell_keys[:2], first_shell_keys)
+        assert shell_keys[0] == shell_keys[1] != shell_keys[2]
+
     @staticmethod
     def test_rlv_magnitudes_from_deflection_angles_normal_operation():
         """
@@ -4,8 +4,28 @@ This module contains unit tests for the diffraction module.
 TODO: add unit tests for the functions in the diffraction.py module.
 """
 
+import pytest
 import numpy as np
-from B8_project import diffraction, file_reading, crystal
+from B8_project import diffraction, file_reading, crystal, alloy, form_factor
+
+
+@pytest.fixture
+def nacl_unit_cell():
+    """
+    Returns a `UnitCell` instance containing data for NaCl.
+    """
+    basis = file_reading.read_basis("tests/data/NaCl_basis.csv")
+    lattice = file_reading.read_lattice("tests/data/NaCl_lattice.csv")
+
+    yield crystal.UnitCell.new_unit_cell(basis, lattice)
+
+
+@pytest.fixture
+def nacl_super_cell(nacl_unit_cell):
+    """
+    Returns a 2x2x2 `SuperCell` instance of the NaCl unit cell.
+    """
+    yield alloy.SuperCell.new_super_cell(nacl_unit_cell, (2, 2, 2))
 
 
 def test_calculate_structure_factors_normal_operation():
@@ -38,6 +58,381 @@ def test_calculate_structure_factors_normal_operation():
     assert len(structure_factors) == len(reciprocal_lattice_vectors)
 
 
+def test_calculate_structure_factors_memory_budget(nacl_super_cell):
+    """
+    A unit test for the _calculate_structure_factors function. This unit test tests
+    that evaluating the structure factors of every atom in a super cell in tiles gives
+    the same result as evaluating them analytically in a single step.
+    """
+    x_ray_form_factors = file_reading.read_xray_form_factors(
+        "tests/data/x_ray_form_factors.csv"
+    )
+
+    # A plain unit cell with the same atoms as the super cell, so that the structure
+    # factors are summed over every atom rather than calculated analytically.
+    expanded_cell = crystal.UnitCell(
+        nacl_super_cell.material,
+        nacl_super_cell.lattice_constants,
+        nacl_super_cell.atoms,
+    )
+
+    rlv_magnitudes = crystal.ReciprocalSpace.rlv_magnitudes_from_deflection_angles(
+        np.array([20, 60]), 0.1
+    )
+
+    reciprocal_lattice_vectors = crystal.ReciprocalSpace.get_reciprocal_lattice_vectors(
+        rlv_magnitudes[0], rlv_magnitudes[1], nacl_super_cell.lattice_constants
+    )
+
+    # pylint: disable=protected-access
+    structure_factors = diffraction._calculate_structure_factors(
+        nacl_super_cell, x_ray_form_factors, reciprocal_lattice_vectors
+    )
+
+    # The phases of each species are summed separately, so a budget of 1000 bytes
+    # tiles over both the reciprocal lattice vectors and the atoms of each species.
+    num_species_atoms = np.min(
+        np.unique(expanded_cell.atoms["atomic_numbers"], return_counts=True)[1]
+    )
+    rlvs_per_chunk, atoms_per_chunk = diffraction._get_chunk_shape(
+        len(reciprocal_lattice_vectors), num_species_atoms, 1000
+    )
+    assert rlvs_per_chunk < len(reciprocal_lattice_vectors)
+    assert atoms_per_chunk < num_species_atoms
+
+    for memory_budget in [1000, 100_000]:
+        chunked_structure_factors = diffraction._calculate_structure_factors(
+            expanded_cell,
+            x_ray_form_factors,
+            reciprocal_lattice_vectors,
+            memory_budget,
+        )
+        assert np.allclose(
+            chunked_structure_factors, structure_factors, rtol=1e-10, atol=1e-8
+        )
+    # pylint: enable=protected-access
+
+
+def test_calculate_phases_axis_phase_table(nacl_unit_cell):
+    """
+    A unit test for the _calculate_phases function. This unit test tests that the
+    phases of the atoms in a super cell agree with the phases evaluated directly, both
+    for a tile which is large enough to be factorised into the phases along each axis,
+    and for tiles which are too small.
+    """
+    super_cell = alloy.SuperCell.new_super_cell(nacl_unit_cell, (2, 3, 5))
+
+    # Shift the positions by an irrational offset, so that the phases of each axis are
+    # not simply roots of unity.
+    positions = super_cell.atoms["positions"] + np.sqrt(2) / 10
+
+    miller_indices = np.random.default_rng(0).integers(-20, 20, (100, 3))
+
+    # pylint: disable=protected-access
+    axis_phase_table = diffraction._get_axis_phase_table(positions)
+    assert axis_phase_table is not None
+
+    # The full tile is factorised by axis, but a tile with few reciprocal lattice
+    # vectors, or with fewer atoms than distinct coordinates, is not.
+    assert diffraction._use_axis_phase_table(len(miller_indices), axis_phase_table)
+    assert not diffraction._use_axis_phase_table(2, axis_phase_table)
+    assert not diffraction._use_axis_phase_table(
+        len(miller_indices),
+        diffraction._slice_axis_phase_table(axis_phase_table, 0, 8),
+    )
+
+    for num_rlvs, num_atoms in [(100, len(positions)), (2, len(positions)), (100, 8)]:
+        phases = diffraction._calculate_phases(
+            miller_indices[:num_rlvs],
+            positions[:num_atoms],
+            diffraction._slice_axis_phase_table(axis_phase_table, 0, num_atoms),
+        )
+        expected_phases = np.exp(
+            2j * np.pi * miller_indices[:num_rlvs] @ positions[:num_atoms].T
+        )
+
+        assert np.allclose(phases, expected_phases, atol=1e-10)
+    # pylint: enable=protected-access
+
+
+def test_calculate_structure_factors_super_cell(nacl_unit_cell):
+    """
+    A unit test for the _calculate_structure_factors function. This unit test tests
+    that the analytic structure factors of an ordered super cell agree with the
+    structure factors obtained by summing over every atom in the super cell.
+    """
+    super_cell = alloy.SuperCell.new_super_cell(nacl_unit_cell, (2, 3, 1))
+
+    # A plain unit cell with the same atoms as the super cell.
+    expanded_cell = crystal.UnitCell(
+        super_cell.material, super_cell.lattice_constants, super_cell.atoms
+    )
+
+    x_ray_form_factors = file_reading.read_xray_form_factors(
+        "tests/data/x_ray_form_factors.csv"
+    )
+
+    rlv_magnitudes = crystal.ReciprocalSpace.rlv_magnitudes_from_deflection_angles(
+        np.array([20, 60]), 0.1
+    )
+
+    reciprocal_lattice_vectors = crystal.ReciprocalSpace.get_reciprocal_lattice_vectors(
+        rlv_magnitudes[0], rlv_magnitudes[1], super_cell.lattice_constants
+    )
+
+    # pylint: disable=protected-access
+    structure_factors = diffraction._calculate_structure_factors(
+        super_cell, x_ray_form_factors, reciprocal_lattice_vectors
+    )
+    expected_structure_factors = diffraction._calculate_structure_factors(
+        expanded_cell, x_ray_form_factors, reciprocal_lattice_vectors
+    )
+    # pylint: enable=protected-access
+
+    assert np.allclose(structure_factors, expected_structure_factors, atol=1e-8)
+
+
+def test_calculate_structure_factors_primitive_basis(nacl_unit_cell):
+    """
+    A unit test for the _calculate_structure_factors function. This unit test tests
+    that the structure factors of a unit cell with a primitive basis and centering
+    translations agree with the structure factors of the conventional unit cell.
+    """
+    basis = file_reading.read_basis("tests/data/NaCl_basis.csv")
+    lattice = file_reading.read_lattice("tests/data/NaCl_lattice.csv")
+    primitive_unit_cell = crystal.UnitCell.new_unit_cell(
+        basis, lattice, keep_primitive_basis=True
+    )
+
+    x_ray_form_factors = file_reading.read_xray_form_factors(
+        "tests/data/x_ray_form_factors.csv"
+    )
+
+    rlv_magnitudes = crystal.ReciprocalSpace.rlv_magnitudes_from_deflection_angles(
+        np.array([20, 60]), 0.1
+    )
+
+    reciprocal_lattice_vectors = crystal.ReciprocalSpace.get_reciprocal_lattice_vectors(
+        rlv_magnitudes[0], rlv_magnitudes[1], nacl_unit_cell.lattice_constants
+    )
+
+    # pylint: disable=protected-access
+    structure_factors = diffraction._calculate_structure_factors(
+        primitive_unit_cell, x_ray_form_factors, reciprocal_lattice_vectors
+    )
+    expected_structure_factors = diffraction._calculate_structure_factors(
+        nacl_unit_cell, x_ray_form_factors, reciprocal_lattice_vectors
+    )
+    # pylint: enable=protected-access
+
+    assert np.allclose(structure_factors, expected_structure_factors, atol=1e-8)
+
+
+def test_calculate_structure_factors_phase_cache(nacl_unit_cell, nacl_super_cell):
+    """
+    A unit test for the _calculate_structure_factors function. This unit test tests
+    that the structure factors of a disordered super cell calculated using a PhaseCache
+    agree with the structure factors calculated by summing over every atom, when the
+    cache is reused for disordered super cells with different lattice constants and
+    species, and that the phases are stored in the cache.
+    """
+    neutron_form_factors = file_reading.read_neutron_scattering_lengths(
+        "tests/data/neutron_scattering_lengths.csv"
+    )
+    x_ray_form_factors = file_reading.read_xray_form_factors(
+        "tests/data/x_ray_form_factors.csv"
+    )
+
+    for form_factors in [neutron_form_factors, x_ray_form_factors]:
+        phase_cache = diffraction.PhaseCache()
+
+        for concentration in [0.25, 0.75]:
+            disordered_super_cell = alloy.SuperCell.apply_disorder(
+                nacl_super_cell,
+                11,
+                17,
+                concentration,
+                nacl_unit_cell.lattice_constants,
+                nacl_unit_cell.lattice_constants * 1.1,
+                "NaCl",
+            )
+
+            # A plain unit cell with the same atoms as the disordered super cell.
+            expanded_cell = crystal.UnitCell(
+                disordered_super_cell.material,
+                disordered_super_cell.lattice_constants,
+                disordered_super_cell.atoms,
+            )
+
+            rlv_magnitudes = (
+                crystal.ReciprocalSpace.rlv_magnitudes_from_deflection_angles(
+                    np.array([20, 60]), 0.5
+                )
+            )
+
+            reciprocal_lattice_vectors = (
+                crystal.ReciprocalSpace.get_reciprocal_lattice_vectors(
+                    rlv_magnitudes[0],
+                    rlv_magnitudes[1],
+                    disordered_super_cell.lattice_constants,
+                )
+            )
+
+            # pylint: disable=protected-access
+            structure_factors = diffraction._calculate_structure_factors(
+                disordered_super_cell,
+                form_factors,
+                reciprocal_lattice_vectors,
+                phase_cache=phase_cache,
+            )
+            expected_structure_factors = diffraction._calculate_structure_factors(
+                expanded_cell, form_factors, reciprocal_lattice_vectors
+            )
+
+            assert len(phase_cache._keys) == len(reciprocal_lattice_vectors)
+            # pylint: enable=protected-access
+
+            assert np.allclose(structure_factors, expected_structure_factors, atol=1e-8)
+
+
+def test_phase_cache_memory_budget(nacl_super_cell):
+    """
+    A unit test for the PhaseCache class. This unit test tests that the phase sums
+    calculated in tiles within a memory budget agree with the phase sums calculated
+    without a cache, and that the cache is bounded by default.
+    """
+    positions = nacl_super_cell.atoms["positions"]
+    weights = np.random.default_rng(0).random((len(positions), 2)).astype(np.complex128)
+    miller_indices = np.random.default_rng(1).integers(-10, 10, (200, 3))
+
+    # pylint: disable=protected-access
+    expected_phase_sums = diffraction._calculate_phase_sums(
+        miller_indices, positions, weights=weights
+    )
+    # pylint: enable=protected-access
+
+    assert diffraction.PhaseCache().max_bytes is not None
+
+    # A budget smaller than a single row of phases forces tiling over both reciprocal
+    # lattice vectors and atoms.
+    for memory_budget in [1000, 100_000, None]:
+        phase_sums = diffraction.PhaseCache().get_phase_sums(
+            miller_indices, positions, weights, memory_budget
+        )
+        assert np.allclose(phase_sums, expected_phase_sums, atol=1e-8)
+
+
+def test_calculate_structure_factors_disordered_super_cell(
+    nacl_unit_cell, nacl_super_cell
+):
+    """
+    A unit test for the _calculate_structure_factors function. This unit test tests
+    that the structure factors of a disordered super cell, which are calculated by
+    updating the structure factors of the ordered super cell, agree with the structure
+    factors obtained by summing over every atom in the super cell.
+    """
+    disordered_super_cell = alloy.SuperCell.apply_disorder(
+        nacl_super_cell,
+        11,
+        17,
+        0.25,
+        nacl_unit_cell.lattice_constants,
+        nacl_unit_cell.lattice_constants * 1.1,
+        "NaCl",
+    )
+
+    # A plain unit cell with the same atoms as the disordered super cell.
+    expanded_cell = crystal.UnitCell(
+        disordered_super_cell.material,
+        disordered_super_cell.lattice_constants,
+        disordered_super_cell.atoms,
+    )
+
+    x_ray_form_factors = file_reading.read_xray_form_factors(
+        "tests/data/x_ray_form_factors.csv"
+    )
+
+    rlv_magnitudes = crystal.ReciprocalSpace.rlv_magnitudes_from_deflection_angles(
+        np.array([20, 60]), 0.5
+    )
+
+    reciprocal_lattice_vectors = crystal.ReciprocalSpace.get_reciprocal_lattice_vectors(
+        rlv_magnitudes[0],
+        rlv_magnitudes[1],
+        disordered_super_cell.lattice_constants,
+    )
+
+    # pylint: disable=protected-access
+    structure_factors = diffraction._calculate_structure_factors(
+        disordered_super_cell, x_ray_form_factors, reciprocal_lattice_vectors
+    )
+    expected_structure_factors = diffraction._calculate_structure_factors(
+        expanded_cell, x_ray_form_factors, reciprocal_lattice_vectors
+    )
+    # pylint: enable=protected-access
+
+    assert np.allclose(structure_factors, expected_structure_factors, atol=1e-8)
+
+
+def test_calculate_structure_factors_constant_form_factors(
+    nacl_unit_cell, nacl_super_cell
+):
+    """
+    A unit test for the _calculate_structure_factors function. This unit test tests
+    that the structure factors calculated with constant (neutron) form factors, which
+    are applied as a weight to each atom, agree with the structure factors calculated
+    by evaluating the same form factors for every reciprocal lattice vector.
+    """
+    disordered_super_cell = alloy.SuperCell.apply_disorder(
+        nacl_super_cell,
+        11,
+        19,
+        0.25,
+        nacl_unit_cell.lattice_constants,
+        nacl_unit_cell.lattice_constants,
+        "NaKCl",
+    )
+    expanded_cell = crystal.UnitCell(
+        disordered_super_cell.material,
+        disordered_super_cell.lattice_constants,
+        disordered_super_cell.atoms,
+    )
+
+    neutron_form_factors = file_reading.read_neutron_scattering_lengths(
+        "tests/data/neutron_scattering_lengths.csv"
+    )
+
+    # Interpolated form factors are evaluated for every reciprocal lattice vector.
+    interpolated_form_factors = form_factor.interpolate_form_factors(
+        neutron_form_factors, 0.5
+    )
+
+    rlv_magnitudes = crystal.ReciprocalSpace.rlv_magnitudes_from_deflection_angles(
+        np.array([20, 60]), 0.5
+    )
+
+    reciprocal_lattice_vectors = crystal.ReciprocalSpace.get_reciprocal_lattice_vectors(
+        rlv_magnitudes[0],
+        rlv_magnitudes[1],
+        disordered_super_cell.lattice_constants,
+    )
+
+    for cell in [disordered_super_cell, expanded_cell]:
+        # pylint: disable=protected-access
+        structure_factors = diffraction._calculate_structure_factors(
+            cell,
+            neutron_form_factors,
+            reciprocal_lattice_vectors,
+            phase_cache=diffraction.PhaseCache(),
+        )
+        expected_structure_factors = diffraction._calculate_structure_factors(
+            cell, interpolated_form_factors, reciprocal_lattice_vectors
+        )
+        # pylint: enable=protected-access
+
+        assert np.allclose(structure_factors, expected_structure_factors, atol=1e-8)
+
+
 def test_calculate_diffraction_peaks_normal_operation():
     """
     A unit test for the _calculate_diffraction_peaks function. This unit test tests
@@ -63,6 +458,53 @@ def test_calculate_diffraction_peaks_normal_operation():
     assert set(diffraction_peaks.dtype.names) == required_fields
 
 
+def test_merge_peaks_normal_operation():
+    """
+    A unit test for the _merge_peaks function. This unit test tests that peaks at the
+    same deflection angle are merged, and that the Miller indices are sorted.
+    """
+    dtype = np.dtype(
+        [
+            ("miller_indices", "3i4"),
+            ("deflection_angles", "f8"),
+            ("intensities", "f8"),
+            ("multiplicities", "i4"),
+        ]
+    )
+    diffraction_peaks = np.empty(5, dtype=dtype)
+    diffraction_peaks["miller_indices"] = [
+        [0, 0, 2],
+        [1, 0, 0],
+        [0, -1, 0],
+        [0, 2, 0],
+        [0, 0, 1],
+    ]
+    diffraction_peaks["deflection_angles"] = [40, 20, 20, 40 * (1 + 1e-12), 20]
+    diffraction_peaks["intensities"] = [1, 2, 2, 1, 2]
+    diffraction_peaks["multiplicities"] = 1
+
+    # pylint: disable=protected-access
+    merged_peaks = diffraction._merge_peaks(diffraction_peaks)
+    # pylint: enable=protected-access
+
+    assert np.allclose(merged_peaks["deflection_angles"], [20, 40])
+    assert np.allclose(merged_peaks["intensities"], [1, 1 / 3])
+    assert np.array_equal(merged_peaks["multiplicities"], [3, 2])
+    assert np.all(merged_peaks["miller_indices"] >= 0)
+    assert np.all(np.diff(merged_peaks["miller_indices"], axis=1) <= 0)
+
+    # Merge the peaks using integer shell keys.
+    shell_keys = np.array([4, 1, 1, 4, 1])
+
+    # pylint: disable=protected-access
+    merged_peaks = diffraction._merge_peaks(diffraction_peaks, shell_keys=shell_keys)
+    # pylint: enable=protected-access
+
+    assert np.allclose(merged_peaks["deflection_angles"], [20, 40])
+    assert np.allclose(merged_peaks["intensities"], [1, 1 / 3])
+    assert np.array_equal(merged_peaks["multiplicities"], [3, 2])
+
+
 def test_get_miller_peaks_normal_operation():
     """
     A unit test for the get_miller_peaks function. This unit test tests normal
@@ -133,6 +575,414 @@ def test_get_diffraction_pattern_normal_operation():
     assert set(diffraction_pattern.dtype.names) == required_fields
 
 
+def test_get_diffraction_pattern_windowed(nacl_unit_cell):
+    """
+    A unit test for the get_diffraction_pattern function. This unit test tests that the
+    windowed pattern mode agrees with the dense pattern mode.
+    """
+    neutron_form_factors = file_reading.read_neutron_scattering_lengths(
+        "tests/data/neutron_scattering_lengths.csv"
+    )
+    x_ray_form_factors = file_reading.read_xray_form_factors(
+        "tests/data/x_ray_form_factors.csv"
+    )
+
+    patterns = [
+        diffraction.get_diffraction_pattern(
+            nacl_unit_cell,
+            "XRD",
+            neutron_form_factors,
+            x_ray_form_factors,
+            wavelength=0.1,
+            min_deflection_angle=20,
+            max_deflection_angle=60,
+            peak_width=0.1,
+            pattern_mode=pattern_mode,
+        )
+        for pattern_mode in ["dense", "windowed"]
+    ]
+
+    assert np.array_equal(
+        patterns[0]["deflection_angles"], patterns[1]["deflection_angles"]
+    )
+    assert np.allclose(
+        patterns[0]["intensities"], patterns[1]["intensities"], atol=1e-5
+    )
+
+
+def test_get_diffraction_pattern_binned(nacl_unit_cell):
+    """
+    A unit test for the get_diffraction_pattern function. This unit test tests that the
+    binned pattern mode agrees with the dense pattern mode.
+    """
+    neutron_form_factors = file_reading.read_neutron_scattering_lengths(
+        "tests/data/neutron_scattering_lengths.csv"
+    )
+    x_ray_form_factors = file_reading.read_xray_form_factors(
+        "tests/data/x_ray_form_factors.csv"
+    )
+
+    patterns = [
+        diffraction.get_diffraction_pattern(
+            nacl_unit_cell,
+            "ND",
+            neutron_form_factors,
+            x_ray_form_factors,
+            wavelength=0.1,
+            min_deflection_angle=20,
+            max_deflection_angle=60,
+            peak_width=0.1,
+            pattern_mode=pattern_mode,
+        )
+        for pattern_mode in ["dense", "binned"]
+    ]
+
+    assert np.array_equal(
+        patterns[0]["deflection_angles"], patterns[1]["deflection_angles"]
+    )
+
+    # Both patterns are normalized so that their maximum intensity is (close to) 1.
+    assert np.isclose(patterns[0]["intensities"].max(), 1, atol=1e-3)
+    assert np.isclose(patterns[1]["intensities"].max(), 1)
+
+    # The binned pattern includes the tails of peaks centred outside of the range of
+    # deflection angles, so only compare the patterns away from the edges of the range.
+    mask = (patterns[0]["deflection_angles"] > 20.5) & (
+        patterns[0]["deflection_angles"] < 59.5
+    )
+    assert np.allclose(
+        patterns[0]["intensities"][mask], patterns[1]["intensities"][mask], atol=1e-3
+    )
+
+
+def test_calculate_binned_pattern_peak_tails(nacl_unit_cell):
+    """
+    A unit test for the _calculate_binned_pattern function. This unit test tests that
+    the tail of a peak centred just outside of the bins is deposited into the bins, so
+    that the bins of a narrower range of deflection angles have the same (absolute)
+    intensities as the same bins of a wider range.
+    """
+    neutron_form_factors = file_reading.read_neutron_scattering_lengths(
+        "tests/data/neutron_scattering_lengths.csv"
+    )
+    deflection_angles = np.arange(20, 60, 0.01)
+
+    # pylint: disable=protected-access
+    intensities = diffraction._calculate_binned_pattern(
+        nacl_unit_cell, neutron_form_factors, 0.1, deflection_angles, 0.1
+    )
+
+    # Start the narrower range 0.2° (two peak widths) after the largest peak.
+    start = np.argmax(intensities) + 20
+    narrow_intensities = diffraction._calculate_binned_pattern(
+        nacl_unit_cell, neutron_form_factors, 0.1, deflection_angles[start:], 0.1
+    )
+    # pylint: enable=protected-access
+
+    assert narrow_intensities[0] > 0
+    assert np.allclose(narrow_intensities, intensities[start:], rtol=1e-10, atol=0)
+
+
+def test_get_disordered_diffraction_patterns_nested_substitutions(
+    nacl_unit_cell, nacl_super_cell
+):
+    """
+    A unit test for the get_disordered_diffraction_patterns function. This unit test
+    tests that each diffraction pattern calculated with nested substitutions agrees
+    with the diffraction pattern of a super cell with the same substituted atoms, which
+    is calculated independently.
+    """
+    substituted_unit_cell = crystal.UnitCell(
+        nacl_unit_cell.material,
+        nacl_unit_cell.lattice_constants * 1.1,
+        nacl_unit_cell.atoms,
+        nacl_unit_cell.centering_translations,
+    )
+
+    neutron_form_factors = file_reading.read_neutron_scattering_lengths(
+        "tests/data/neutron_scattering_lengths.csv"
+    )
+    x_ray_form_factors = file_reading.read_xray_form_factors(
+        "tests/data/x_ray_form_factors.csv"
+    )
+
+    concentrations = [0.75, 0.25]
+
+    # The substituted atoms are determined by a single permutation of the target atoms,
+    # which only depends on the seed.
+    _, intensity_data = diffraction.get_disordered_diffraction_patterns(
+        nacl_unit_cell,
+        substituted_unit_cell,
+        11,
+        17,
+        concentrations,
+        (2, 2, 2),
+        "XRD",
+        neutron_form_factors,
+        x_ray_form_factors,
+        wavelength=0.5,
+        min_deflection_angle=20,
+        max_deflection_angle=60,
+        nested_substitutions=True,
+        rng=0,
+    )
+
+    for i, concentration in enumerate(concentrations):
+        disordered_super_cell = alloy.SuperCell.apply_disorder(
+            nacl_super_cell,
+            11,
+            17,
+            concentration,
+            nacl_unit_cell.lattice_constants,
+            substituted_unit_cell.lattice_constants,
+            "NaCl",
+            rng=0,
+        )
+
+        expected_pattern = diffraction.get_diffraction_pattern(
+            disordered_super_cell,
+            "XRD",
+            neutron_form_factors,
+            x_ray_form_factors,
+            wavelength=0.5,
+            min_deflection_angle=20,
+            max_deflection_angle=60,
+        )
+
+        assert np.allclose(
+            intensity_data[i], expected_pattern["intensities"], atol=1e-8
+        )
+
+
+def test_get_disordered_diffraction_patterns_parallel(nacl_unit_cell):
+    """
+    A unit test for the get_disordered_diffraction_patterns function. This unit test
+    tests that calculating independently substituted diffraction patterns in parallel
+    gives the same intensity data as calculating them in the current process, and that
+    a phase cache is rejected in parallel mode.
+    """
+    substituted_unit_cell = crystal.UnitCell(
+        nacl_unit_cell.material,
+        nacl_unit_cell.lattice_constants * 1.1,
+        nacl_unit_cell.atoms,
+        nacl_unit_cell.centering_translations,
+    )
+
+    neutron_form_factors = file_reading.read_neutron_scattering_lengths(
+        "tests/data/neutron_scattering_lengths.csv"
+    )
+    x_ray_form_factors = file_reading.read_xray_form_factors(
+        "tests/data/x_ray_form_factors.csv"
+    )
+
+    intensity_data = [
+        diffraction.get_disordered_diffraction_patterns(
+            nacl_unit_cell,
+            substituted_unit_cell,
+            11,
+            17,
+            [0.25, 0.5, 0.75],
+            (2, 2, 2),
+            "XRD",
+            neutron_form_factors,
+            x_ray_form_factors,
+            wavelength=0.5,
+            min_deflection_angle=20,
+            max_deflection_angle=60,
+            nested_substitutions=False,
+            rng=0,
+            num_processes=num_processes,
+        )[1]
+        for num_processes in [None, 2]
+    ]
+
+    assert np.allclose(intensity_data[0], intensity_data[1], atol=1e-8)
+
+    # A phase cache cannot be shared between the worker processes.
+    with pytest.raises(ValueError):
+        diffraction.get_disordered_diffraction_patterns(
+            nacl_unit_cell,
+            substituted_unit_cell,
+            11,
+            17,
+            [0.25, 0.5, 0.75],
+            (2, 2, 2),
+            "XRD",
+            neutron_form_factors,
+            x_ray_form_factors,
+            phase_cache=diffraction.PhaseCache(),
+            num_processes=2,
+        )
+
+
+def test_get_disordered_diffraction_patterns_phase_cache(nacl_unit_cell):
+    """
+    A unit test for the get_disordered_diffraction_patterns function. This unit test
+    tests that sharing a PhaseCache between the concentrations of the sweep gives the
+    same intensity data as calculating the diffraction patterns without a cache, and
+    that the phases are stored in the cache.
+    """
+    substituted_unit_cell = crystal.UnitCell(
+        nacl_unit_cell.material,
+        nacl_unit_cell.lattice_constants * 1.1,
+        nacl_unit_cell.atoms,
+        nacl_unit_cell.centering_translations,
+    )
+
+    neutron_form_factors = file_reading.read_neutron_scattering_lengths(
+        "tests/data/neutron_scattering_lengths.csv"
+    )
+    x_ray_form_factors = file_reading.read_xray_form_factors(
+        "tests/data/x_ray_form_factors.csv"
+    )
+
+    phase_cache = diffraction.PhaseCache()
+
+    intensity_data = [
+        diffraction.get_disordered_diffraction_patterns(
+            nacl_unit_cell,
+            substituted_unit_cell,
+            11,
+            17,
+            [0.25, 0.5, 0.75],
+            (2, 2, 2),
+            "XRD",
+            neutron_form_factors,
+            x_ray_form_factors,
+            wavelength=0.5,
+            min_deflection_angle=20,
+            max_deflection_angle=60,
+            phase_cache=cache,
+            nested_substitutions=False,
+            rng=0,
+        )[1]
+        for cache in [None, phase_cache]
+    ]
+
+    # pylint: disable=protected-access
+    assert len(phase_cache._keys) > 0
+    # pylint: enable=protected-access
+
+    assert np.allclose(intensity_data[0], intensity_data[1], atol=1e-8)
+
+
+def test_get_disorder_ensemble_diffraction_pattern_full_substitution(
+    nacl_unit_cell, nacl_super_cell
+):
+    """
+    A unit test for the get_disorder_ensemble_diffraction_pattern function. This unit
+    test tests that, when every target atom is substituted, every realisation has the
+    same diffraction pattern as the fully substituted super cell.
+    """
+    substituted_unit_cell = crystal.UnitCell(
+        nacl_unit_cell.material,
+        nacl_unit_cell.lattice_constants * 1.1,
+        nacl_unit_cell.atoms,
+        nacl_unit_cell.centering_translations,
+    )
+
+    neutron_form_factors = file_reading.read_neutron_scattering_lengths(
+        "tests/data/neutron_scattering_lengths.csv"
+    )
+    x_ray_form_factors = file_reading.read_xray_form_factors(
+        "tests/data/x_ray_form_factors.csv"
+    )
+
+    ensemble_pattern = diffraction.get_disorder_ensemble_diffraction_pattern(
+        nacl_unit_cell,
+        substituted_unit_cell,
+        11,
+        17,
+        1,
+        (2, 2, 2),
+        "XRD",
+        neutron_form_factors,
+        x_ray_form_factors,
+        wavelength=0.2,
+        min_deflection_angle=20,
+        max_deflection_angle=60,
+        realisations_per_batch=2,
+        max_realisations=4,
+    )
+
+    substituted_super_cell = alloy.SuperCell.apply_disorder(
+        nacl_super_cell,
+        11,
+        17,
+        1,
+        nacl_unit_cell.lattice_constants,
+        substituted_unit_cell.lattice_constants,
+        "NaCl",
+    )
+    expected_pattern = diffraction.get_diffraction_pattern(
+        substituted_super_cell,
+        "XRD",
+        neutron_form_factors,
+        x_ray_form_factors,
+        wavelength=0.2,
+        min_deflection_angle=20,
+        max_deflection_angle=60,
+        intensity_cutoff=0,
+        pattern_mode="windowed",
+    )
+
+    assert np.array_equal(
+        ensemble_pattern["deflection_angles"], expected_pattern["deflection_angles"]
+    )
+    assert np.allclose(
+        ensemble_pattern["intensities"],
+        expected_pattern["intensities"] / expected_pattern["intensities"].max(),
+        atol=1e-8,
+    )
+    assert np.allclose(ensemble_pattern["variances"], 0, atol=1e-12)
+
+
+def test_get_disorder_ensemble_diffraction_pattern_early_stopping(nacl_unit_cell):
+    """
+    A unit test for the get_disorder_ensemble_diffraction_pattern function. This unit
+    test tests that no more batches are generated once the target standard error is
+    reached.
+    """
+    neutron_form_factors = file_reading.read_neutron_scattering_lengths(
+        "tests/data/neutron_scattering_lengths.csv"
+    )
+    x_ray_form_factors = file_reading.read_xray_form_factors(
+        "tests/data/x_ray_form_factors.csv"
+    )
+
+    ensemble_pattern = diffraction.get_disorder_ensemble_diffraction_pattern(
+        nacl_unit_cell,
+        nacl_unit_cell,
+        11,
+        17,
+        0.5,
+        (2, 2, 2),
+        "XRD",
+        neutron_form_factors,
+        x_ray_form_factors,
+        wavelength=0.5,
+        min_deflection_angle=20,
+        max_deflection_angle=60,
+        realisations_per_batch=4,
+        max_realisations=1000,
+        target_standard_error=0.05,
+        phase_cache=diffraction.PhaseCache(),
+    )
+
+    assert np.isclose(ensemble_pattern["intensities"].max(), 1)
+    assert np.any(ensemble_pattern["variances"] > 0)
+    assert ensemble_pattern["standard_errors"].max() <= 0.05
+
+    # The standard errors are only consistent with the variances if the number of
+    # realisations is a multiple of the batch size smaller than the maximum.
+    num_realisations = np.round(
+        np.max(ensemble_pattern["variances"])
+        / np.max(ensemble_pattern["standard_errors"]) ** 2
+    )
+    assert num_realisations % 4 == 0
+    assert num_realisations < 1000
+
+
 def test_plot_diffraction_pattern_normal_operation():
     """
     A unit test for the plot_diffraction_pattern function. This unit test tests normal
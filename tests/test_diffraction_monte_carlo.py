@@ -5,7 +5,12 @@ This module contains unit tests for the diffraction_monte_carlo.py module.
 import pytest
 import numpy as np
 import numpy.testing as nptest
-from B8_project.file_reading import read_lattice, read_basis
+from B8_project.file_reading import (
+    read_lattice,
+    read_basis,
+    read_neutron_scattering_lengths,
+)
+from B8_project.form_factor import interpolate_form_factors
 from B8_project.crystal import UnitCell
 from B8_project.diffraction_monte_carlo import NeutronDiffractionMonteCarlo
 
@@ -78,10 +83,131 @@ def test_monte_carlo_calculate_diffraction_pattern(nd_monte_carlo, mocker):
 
     expected_two_thetas = np.array([0., 20., 40., 60., 80., 100., 120., 140., 160.,
                                     180.])
-    expected_intensities = np.array([0.000000e+00, 8.349908e-05, 0.000000e+00,
-                                     2.231075e-04, 7.179199e-06, 6.286620e-06,
+    # Trials which land in the same bin are summed: bin 1 contains two trials, and
+    # bins 4 and 5 contain two and three trials respectively.
+    expected_intensities = np.array([0.000000e+00, 7.818204e-02, 0.000000e+00,
+                                     2.231075e-04, 3.136731e-02, 3.447274e-02,
                                      0.000000e+00, 0.000000e+00, 1.000000e+00,
                                      2.489788e-05])
 
     nptest.assert_allclose(two_thetas, expected_two_thetas, rtol=1e-6)
     nptest.assert_allclose(intensities, expected_intensities, rtol=1e-6)
+
+
+def test_monte_carlo_calculate_diffraction_pattern_parallel(nd_monte_carlo):
+    """
+    A unit test for the Monte Carlo calculate_diffraction_pattern function. This unit
+    test tests that the diffraction pattern for a given seed does not depend on the
+    number of worker processes.
+    """
+    patterns = [
+        nd_monte_carlo.calculate_diffraction_pattern(
+            target_accepted_trials=500,
+            trials_per_batch=100,
+            min_angle_deg=20,
+            max_angle_deg=100,
+            angle_bins=20,
+            num_processes=num_processes,
+            rng=0,
+        )
+        for num_processes in [None, 1, 3]
+    ]
+
+    for two_thetas, intensities in patterns[1:]:
+        nptest.assert_array_equal(two_thetas, patterns[0][0])
+        nptest.assert_array_equal(intensities, patterns[0][1])
+
+
+def test_monte_carlo_interpolated_form_factors(nd_monte_carlo):
+    """
+    A unit test for the NeutronDiffractionMonteCarlo class. This unit test tests that
+    a Mapping of interpolated form factors, which cannot be stored in a
+    FormFactorTable, gives the same diffraction pattern as the tabulated form factors.
+    """
+    neutron_form_factors = read_neutron_scattering_lengths(
+        "tests/data/neutron_scattering_lengths.csv"
+    )
+    interpolated_monte_carlo = NeutronDiffractionMonteCarlo(
+        nd_monte_carlo.unit_cell,
+        nd_monte_carlo.wavelength,
+        interpolate_form_factors(neutron_form_factors, nd_monte_carlo.wavelength),
+    )
+
+    patterns = [
+        monte_carlo.calculate_diffraction_pattern(
+            target_accepted_trials=500,
+            trials_per_batch=100,
+            min_angle_deg=20,
+            max_angle_deg=100,
+            angle_bins=20,
+            rng=0,
+        )
+        for monte_carlo in [nd_monte_carlo, interpolated_monte_carlo]
+    ]
+
+    nptest.assert_array_equal(patterns[0][0], patterns[1][0])
+    nptest.assert_allclose(patterns[0][1], patterns[1][1], atol=1e-8)
+
+
+def test_monte_carlo_calculate_diffraction_pattern_fibonacci(nd_monte_carlo):
+    """
+    A unit test for the Monte Carlo calculate_diffraction_pattern function. This unit
+    test tests that the Fibonacci direction sampler agrees with the random direction
+    sampler.
+    """
+    intensities = [
+        nd_monte_carlo.calculate_diffraction_pattern(
+            target_accepted_trials=100000,
+            trials_per_batch=20000,
+            unit_cells_in_crystal=(2, 2, 2),
+            min_angle_deg=10,
+            max_angle_deg=60,
+            angle_bins=10,
+            rng=0,
+            direction_sampler=direction_sampler,
+        )[1]
+        for direction_sampler in ["random", "fibonacci"]
+    ]
+
+    nptest.assert_allclose(intensities[0], intensities[1], atol=0.08)
+
+
+def test_monte_carlo_calculate_diffraction_pattern_importance_sampling(nd_monte_carlo):
+    """
+    A unit test for the Monte Carlo calculate_diffraction_pattern function. This unit
+    test tests that importance sampling near the reciprocal lattice vectors converges
+    to the same pattern as uniform sampling, and that it has a smaller error than
+    uniform sampling with four times as many trials.
+    """
+    kwargs = {
+        "trials_per_batch": 20000,
+        "unit_cells_in_crystal": (4, 4, 4),
+        "min_angle_deg": 10,
+        "max_angle_deg": 60,
+        "angle_bins": 10,
+    }
+
+    _, reference_intensities = nd_monte_carlo.calculate_diffraction_pattern(
+        target_accepted_trials=200000, rng=100, importance_sampling=True, **kwargs
+    )
+
+    # Calculate the root mean square error of each sampler for several seeds.
+    uniform_errors = []
+    importance_errors = []
+    for seed in range(5):
+        _, uniform_intensities = nd_monte_carlo.calculate_diffraction_pattern(
+            target_accepted_trials=80000, rng=seed, **kwargs
+        )
+        _, importance_intensities = nd_monte_carlo.calculate_diffraction_pattern(
+            target_accepted_trials=20000, rng=seed, importance_sampling=True, **kwargs
+        )
+
+        uniform_errors.append(
+            np.sqrt(np.mean((uniform_intensities - reference_intensities) ** 2))
+        )
+        importance_errors.append(
+            np.sqrt(np.mean((importance_intensities - reference_intensities) ** 2))
+        )
+
+    assert np.mean(uniform_errors) < 0.1
+    assert np.mean(importance_errors) < np.mean(uniform_errors)
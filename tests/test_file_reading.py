@@ -102,3 +102,25 @@ def test_read_x_ray_form_factors_normal_operation():
     assert isinstance(x_ray_form_factors, Mapping) and all(
         isinstance(v, form_factor.XRayFormFactor) for v in x_ray_form_factors.values()
     )
+
+
+def test_read_form_factors_debye_waller_factors():
+    """
+    A unit test for the read_neutron_scattering_lengths and read_xray_form_factors
+    functions. This unit test tests that the optional Debye-Waller factors are read.
+    """
+    neutron_scattering_lengths = file_reading.read_neutron_scattering_lengths(
+        "tests/data/neutron_scattering_lengths_debye_waller.csv"
+    )
+    x_ray_form_factors = file_reading.read_xray_form_factors(
+        "tests/data/x_ray_form_factors_debye_waller.csv"
+    )
+
+    assert neutron_scattering_lengths[11] == form_factor.NeutronFormFactor(3.63, 1.65)
+    assert neutron_scattering_lengths[17] == form_factor.NeutronFormFactor(9.5792, 1.22)
+    assert x_ray_form_factors[11] == form_factor.XRayFormFactor(
+        4.7626, 3.285, 3.1736, 8.8422, 1.2674, 0.3136, 1.1128, 129.424, 0.676, 1.65
+    )
+    assert x_ray_form_factors[17] == form_factor.XRayFormFactor(
+        11.4604, 0.0104, 7.1964, 1.1662, 6.2556, 18.5194, 1.6455, 47.7784, -9.5574, 1.22
+    )
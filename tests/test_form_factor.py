@@ -3,7 +3,8 @@ This module contains unit tests for the form_factor module.
 """
 
 import numpy as np
-from B8_project import form_factor
+import pytest
+from B8_project import form_factor, file_reading
 
 
 class TestFormFactorProtocol:
@@ -105,3 +106,201 @@ class TestXRayFormFactor:
         expected_result += c
 
         assert np.isclose(result, expected_result, rtol=1e-6)
+
+
+class TestFormFactorTable:
+    """
+    Unit tests for the `FormFactorTable` class.
+    """
+
+    @staticmethod
+    def test_evaluate_form_factor_matrix_normal_operation():
+        """
+        A unit test for the evaluate_form_factor_matrix method. This unit test tests
+        that a table gives the same form factors as the X-ray and neutron form factors
+        it was created from.
+        """
+        x_ray_form_factors = file_reading.read_xray_form_factors(
+            "tests/data/x_ray_form_factors.csv"
+        )
+        neutron_form_factors = file_reading.read_neutron_scattering_lengths(
+            "tests/data/neutron_scattering_lengths.csv"
+        )
+        rlv_magnitudes = np.linspace(0, 20, 50)
+
+        for form_factors in [x_ray_form_factors, neutron_form_factors]:
+            table = form_factor.FormFactorTable.from_form_factors(form_factors)
+            atomic_numbers = np.array(list(form_factors))
+
+            expected_form_factors = np.array(
+                [
+                    form_factors[atomic_number].evaluate_form_factors(rlv_magnitudes)
+                    for atomic_number in atomic_numbers
+                ]
+            )
+
+            assert np.allclose(
+                table.evaluate_form_factor_matrix(atomic_numbers, rlv_magnitudes),
+                expected_form_factors,
+            )
+            assert set(table) == set(form_factors)
+            assert table[11] == form_factors[11]
+
+    @staticmethod
+    def test_evaluate_form_factor_matrix_debye_waller_factors():
+        """
+        A unit test for the evaluate_form_factor_matrix method. This unit test tests
+        that the Debye-Waller factors fused into the table agree with multiplying the
+        form factors at rest by exp(-B |G|^2 / 16π^2).
+
+        The Debye-Waller factors in the test data are in Å^2, like the widths of the
+        X-ray form factors, so |G| is in Å^-1. They are not consistent with the NaCl
+        test lattice, whose lattice constants are in nm, and are not used with it.
+        """
+        rlv_magnitudes = np.linspace(0, 20, 50)
+        atomic_numbers = np.array([11, 17])
+        debye_waller_factors = np.array([[1.65], [1.22]])
+        expected_debye_waller_factors = np.exp(
+            -debye_waller_factors * rlv_magnitudes**2 / (16 * np.pi**2)
+        )
+
+        for read_form_factors, filename in [
+            (file_reading.read_xray_form_factors, "tests/data/x_ray_form_factors"),
+            (
+                file_reading.read_neutron_scattering_lengths,
+                "tests/data/neutron_scattering_lengths",
+            ),
+        ]:
+            expected_form_factors = (
+                form_factor.evaluate_form_factor_matrix(
+                    read_form_factors(f"{filename}.csv"), atomic_numbers, rlv_magnitudes
+                )
+                * expected_debye_waller_factors
+            )
+
+            form_factors = read_form_factors(f"{filename}_debye_waller.csv")
+            table = form_factor.FormFactorTable.from_form_factors(form_factors)
+
+            assert np.allclose(
+                form_factor.evaluate_form_factor_matrix(
+                    form_factors, atomic_numbers, rlv_magnitudes
+                ),
+                expected_form_factors,
+            )
+            assert np.allclose(
+                table.evaluate_form_factor_matrix(atomic_numbers, rlv_magnitudes),
+                expected_form_factors,
+            )
+            assert table.get_constant_form_factors(atomic_numbers) is None
+
+    @staticmethod
+    def test_evaluate_form_factor_matrix_missing_atom():
+        """
+        A unit test for the evaluate_form_factor_matrix method. This unit test tests
+        that a KeyError is raised for an atom which is not in the table.
+        """
+        table = form_factor.FormFactorTable.from_form_factors(
+            {11: form_factor.NeutronFormFactor(3.63)}
+        )
+
+        with pytest.raises(KeyError):
+            table.evaluate_form_factor_matrix(np.array([11, 10]), np.ones(3))
+        with pytest.raises(KeyError):
+            table.evaluate_form_factor_matrix(np.array([12]), np.ones(3))
+
+
+def test_get_constant_form_factors_normal_operation():
+    """
+    A unit test for the get_constant_form_factors function. This unit test tests that
+    neutron form factors are returned as scalars, and that None is returned for X-ray
+    form factors.
+    """
+    x_ray_form_factors = file_reading.read_xray_form_factors(
+        "tests/data/x_ray_form_factors.csv"
+    )
+    neutron_form_factors = file_reading.read_neutron_scattering_lengths(
+        "tests/data/neutron_scattering_lengths.csv"
+    )
+    atomic_numbers = np.array([11, 17, 11])
+
+    for form_factors in [
+        neutron_form_factors,
+        form_factor.FormFactorTable.from_form_factors(neutron_form_factors),
+    ]:
+        assert np.array_equal(
+            form_factor.get_constant_form_factors(form_factors, atomic_numbers),
+            [
+                neutron_form_factors[11].neutron_scattering_length,
+                neutron_form_factors[17].neutron_scattering_length,
+                neutron_form_factors[11].neutron_scattering_length,
+            ],
+        )
+
+    for form_factors in [
+        x_ray_form_factors,
+        form_factor.FormFactorTable.from_form_factors(x_ray_form_factors),
+    ]:
+        assert (
+            form_factor.get_constant_form_factors(form_factors, atomic_numbers) is None
+        )
+
+
+class TestInterpolatedFormFactor:
+    """
+    Unit tests for the `InterpolatedFormFactor` class.
+    """
+
+    @staticmethod
+    def test_evaluate_form_factors_normal_operation():
+        """
+        A unit test for the evaluate_form_factors method. This unit test tests that the
+        interpolated form factors agree with the original form factors to within the
+        tolerance, and that the original form factors are used outside of the grid.
+        """
+        x_ray_form_factors = file_reading.read_xray_form_factors(
+            "tests/data/x_ray_form_factors.csv"
+        )
+        tolerance = 1e-6
+
+        for method in ["linear", "cubic"]:
+            interpolated_form_factors = form_factor.interpolate_form_factors(
+                x_ray_form_factors, 1, tolerance, method
+            )
+            assert set(interpolated_form_factors) == set(x_ray_form_factors)
+
+            for atomic_number, interpolated in interpolated_form_factors.items():
+                assert isinstance(interpolated, form_factor.FormFactorProtocol)
+                assert np.isclose(interpolated.max_magnitude, 4 * np.pi)
+
+                exact = x_ray_form_factors[atomic_number]
+                rlv_magnitudes = np.linspace(0, 6 * np.pi, 10001)
+                scale = np.max(np.abs(interpolated.values))
+                inside_grid = rlv_magnitudes <= 4 * np.pi
+
+                assert np.allclose(
+                    interpolated.evaluate_form_factors(rlv_magnitudes)[inside_grid],
+                    exact.evaluate_form_factors(rlv_magnitudes[inside_grid]),
+                    rtol=0,
+                    atol=2 * tolerance * scale,
+                )
+                assert np.array_equal(
+                    interpolated.evaluate_form_factors(rlv_magnitudes)[~inside_grid],
+                    exact.evaluate_form_factors(rlv_magnitudes[~inside_grid]),
+                )
+
+    @staticmethod
+    def test_from_form_factor_unreachable_tolerance():
+        """
+        A unit test for the from_form_factor method. This unit test tests that a
+        ValueError is raised if the tolerance cannot be reached.
+        """
+        x_ray_form_factor = form_factor.XRayFormFactor(1, 1, 1, 1, 1, 1, 1, 1, 1)
+
+        with pytest.raises(ValueError):
+            form_factor.InterpolatedFormFactor.from_form_factor(
+                x_ray_form_factor, 4 * np.pi, 1e-12, "linear", max_grid_points=1000
+            )
+        with pytest.raises(ValueError):
+            form_factor.InterpolatedFormFactor.from_form_factor(
+                x_ray_form_factor, 4 * np.pi, method="quadratic"
+            )
@@ -2,6 +2,7 @@
 This module contains unit tests for the utils.py module.
 """
 
+import math
 from typing import cast
 import numpy as np
 import numpy.testing as nptest
@@ -49,6 +50,33 @@ def test_gaussian_normal_operation():
     )
 
 
+def test_erf_normal_operation():
+    """
+    A unit test for the erf function. This unit test tests that the function agrees
+    with math.erf.
+    """
+    x = np.linspace(-5, 5, 101)
+
+    assert np.allclose(utils.erf(x), [math.erf(value) for value in x], atol=2e-7)
+
+
+def test_spawn_random_number_generators_normal_operation():
+    """
+    A unit test for the spawn_random_number_generators function. This unit test tests
+    that the same seed gives the same child generators, and that different child
+    generators give different random numbers.
+    """
+    first_rngs = utils.spawn_random_number_generators(0, 3)
+    second_rngs = utils.spawn_random_number_generators(0, 3)
+
+    first_values = [rng.random(4) for rng in first_rngs]
+    second_values = [rng.random(4) for rng in second_rngs]
+
+    assert len(first_rngs) == 3
+    nptest.assert_array_equal(first_values, second_values)
+    assert not np.array_equal(first_values[0], first_values[1])
+
+
 def test_random_uniform_unit_vector_is_unit_vector():
     """
     Add test docstring here.
@@ -79,6 +107,87 @@ def test_random_uniform_unit_vectors_are_unit_vectors():
             nptest.assert_allclose(mag_squared, 1.0)
 
 
+def test_random_uniform_unit_vectors_reproducible():
+    """
+    A unit test for the random_uniform_unit_vectors function. This unit test tests
+    that generators with the same seed give the same unit vectors.
+    """
+    first_vectors = utils.random_uniform_unit_vectors(10, 3, np.random.default_rng(0))
+    second_vectors = utils.random_uniform_unit_vectors(10, 3, np.random.default_rng(0))
+
+    nptest.assert_array_equal(first_vectors, second_vectors)
+    nptest.assert_allclose(np.linalg.norm(first_vectors, axis=1), 1.0)
+
+
+def test_fibonacci_unit_vectors_normal_operation():
+    """
+    A unit test for the fibonacci_unit_vectors function. This unit test tests that the
+    vectors are unit vectors, and that they are evenly spread over the sphere.
+    """
+    vectors = utils.fibonacci_unit_vectors(1000, np.random.default_rng(0))
+
+    nptest.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    nptest.assert_allclose(np.mean(vectors, axis=0), 0, atol=1e-3)
+    nptest.assert_allclose(vectors.T @ vectors / 1000, np.eye(3) / 3, atol=1e-3)
+
+
+def test_fibonacci_unit_vectors_seed_spread():
+    """
+    A unit test for the fibonacci_unit_vectors function. This unit test tests that the
+    spread across seeds of the average of a smooth function over the vectors is much
+    smaller than for the same number of independent random unit vectors.
+    """
+    n = 1000
+
+    fibonacci_averages = []
+    random_averages = []
+    for seed in range(20):
+        fibonacci_vectors = utils.fibonacci_unit_vectors(n, np.random.default_rng(seed))
+        random_vectors = utils.random_uniform_unit_vectors(
+            n, 3, np.random.default_rng(seed)
+        )
+
+        fibonacci_averages.append(
+            np.mean(fibonacci_vectors[:, 0] ** 2 + fibonacci_vectors[:, 2] ** 4)
+        )
+        random_averages.append(
+            np.mean(random_vectors[:, 0] ** 2 + random_vectors[:, 2] ** 4)
+        )
+
+    # The exact average of x^2 + z^4 over the unit sphere is 1 / 3 + 1 / 5.
+    nptest.assert_allclose(fibonacci_averages, 8 / 15, atol=1e-4)
+    assert np.std(fibonacci_averages) < np.std(random_averages) / 10
+
+
+def test_laue_interference_normal_operation():
+    """
+    A unit test for the laue_interference function. This unit test tests that the
+    function agrees with a direct sum over the unit cells of a finite crystal, and that
+    it takes the limiting value N^2 at integer Miller indices.
+    """
+    num_cells = (3, 4, 5)
+    miller_indices = np.random.default_rng(0).uniform(-3, 3, size=(50, 3))
+
+    cells = np.stack(
+        np.meshgrid(*[np.arange(n) for n in num_cells], indexing="ij"), axis=-1
+    ).reshape(-1, 3)
+    expected = np.abs(np.exp(2j * np.pi * miller_indices @ cells.T).sum(axis=1)) ** 2
+
+    nptest.assert_allclose(
+        utils.laue_interference(miller_indices, num_cells), expected, rtol=1e-9
+    )
+
+    integer_miller_indices = np.array([[0, 0, 0], [1, -2, 3], [1e6, 2e6, -1e6]])
+    nptest.assert_allclose(
+        utils.laue_interference(integer_miller_indices, num_cells), 3600
+    )
+    nptest.assert_allclose(
+        utils.laue_interference(integer_miller_indices + 1e-12, num_cells),
+        3600,
+        rtol=1e-9,
+    )
+
+
 def plot_3d_unit_vectors(vectors, title):
     """
     Plots 3D unit vectors using matplotlib.